@@ -10,9 +10,19 @@ import json
 from datetime import datetime
 import base64
 from io import BytesIO
+from scipy import sparse
+
+def iter_similar_pairs(similarity_matrix):
+    """Yield (i, j, score) for every similar pair with i < j of a sparse similarity matrix."""
+    upper = sparse.triu(similarity_matrix, k=1).tocoo()
+    for i, j, score in zip(upper.row, upper.col, upper.data):
+        if score > 0:
+            yield int(i), int(j), float(score)
 
 def create_similarity_heatmap(similarity_matrix, submission_ids):
     """Create a heatmap of similarity scores."""
+    if sparse.issparse(similarity_matrix):
+        similarity_matrix = similarity_matrix.toarray()
     df = pd.DataFrame(similarity_matrix, index=submission_ids, columns=submission_ids)
     fig, ax = plt.subplots(figsize=(10, 8))
     im = ax.imshow(df, cmap='YlOrRd')
@@ -45,11 +55,8 @@ def create_cluster_graph(clusters, similarity_matrix, submission_ids):
         G.add_node(submission_id)
     
     # Add edges for similar submissions
-    for i in range(len(submission_ids)):
-        for j in range(i + 1, len(submission_ids)):
-            if similarity_matrix[i][j] > 0:
-                G.add_edge(submission_ids[i], submission_ids[j], 
-                          weight=similarity_matrix[i][j])
+    for i, j, score in iter_similar_pairs(similarity_matrix):
+        G.add_edge(submission_ids[i], submission_ids[j], weight=score)
     
     # Create the plot
     plt.figure(figsize=(12, 8))
@@ -179,14 +186,12 @@ def generate_html_report(clusters, similarity_matrix, submission_ids, similarity
                 </tr>
     """
     
-    for i, id1 in enumerate(submission_ids):
-        for j, id2 in enumerate(submission_ids):
-            if i < j and similarity_matrix[i][j] > 0:
-                html += f"""
+    for i, j, score in iter_similar_pairs(similarity_matrix):
+        html += f"""
                     <tr>
-                        <td>{id1}</td>
-                        <td>{id2}</td>
-                        <td>{similarity_matrix[i][j]:.2f}</td>
+                        <td>{submission_ids[i]}</td>
+                        <td>{submission_ids[j]}</td>
+                        <td>{score:.2f}</td>
                     </tr>
                 """
     
@@ -271,7 +276,7 @@ def main():
             
             # Show similarity matrix
             st.subheader("Similarity Matrix")
-            submission_ids, similarity_matrix = detector.get_similarity_matrix()
+            submission_ids, similarity_matrix = detector.get_similarity_matrix(output='sparse')
             fig = create_similarity_heatmap(similarity_matrix, submission_ids)
             st.pyplot(fig)
             
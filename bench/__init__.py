@@ -0,0 +1 @@
+"""Benchmarks and synthetic corpora for the plagiarism detector; run the modules with python -m bench.<name>."""
@@ -0,0 +1,381 @@
+"""
+Synthetic submission corpus generator.
+
+Generates random but syntactically plausible programs in every supported
+language and copies a controlled fraction of them as clones of earlier
+submissions. The corpus only depends on the seed and the options, so
+benchmark runs on different machines and commits use identical input.
+
+Usage:
+    python -m bench.corpus DIRECTORY [--files N] [--clone-rate R]
+        [--mean-functions N] [--languages py=2,java=1,...] [--seed N]
+"""
+from typing import Dict, List, Optional, Tuple
+import argparse
+import json
+import math
+import os
+import random
+
+# Corpus sizes of the pipeline benchmark
+SCALES = (100, 1000, 10000, 50000)
+
+LANGUAGES = ('.py', '.java', '.cpp', '.c', '.js', '.ts', '.rb')
+
+# How a clone is derived from its source: an identical program with other
+# comments, the program with functions appended, the program with its
+# functions shuffled and one appended, or the program with consistently
+# renamed identifiers
+CLONE_KINDS = ('exact', 'extended', 'reordered', 'renamed')
+
+MANIFEST_NAME = 'manifest.json'
+
+_VERBS = ('compute', 'update', 'merge', 'scan', 'count', 'load', 'check', 'build',
+          'reduce', 'split', 'apply', 'resolve', 'sort', 'find', 'sum', 'scale')
+_NOUNS = ('total', 'count', 'index', 'value', 'buffer', 'score', 'node', 'item',
+          'offset', 'limit', 'weight', 'range', 'delta', 'result', 'level', 'size')
+_WORDS = ('the', 'value', 'is', 'checked', 'before', 'use', 'keep', 'in', 'sync',
+          'with', 'caller', 'fast', 'path', 'for', 'small', 'inputs', 'see', 'notes')
+_OPERATORS = ('+', '-', '*', '%')
+_COMPARISONS = ('>', '<', '>=', '<=', '==', '!=')
+
+# A statement is one of
+#   ('assign', name, expression)    ('if', condition, body)
+#   ('loop', name, bound, body)     ('return', expression)
+#   ('comment', text)               ('string', name, text)
+# Expressions and conditions use syntax shared by all languages.
+Statement = Tuple
+Function = Tuple[str, List[str], List[Statement]]
+
+class _ProgramGenerator:
+    """Draws random functions from a seeded random number generator."""
+    
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+    
+    def identifier(self) -> str:
+        return f"{self.rng.choice(_NOUNS)}_{self.rng.randrange(100)}"
+    
+    def text(self) -> str:
+        return ' '.join(self.rng.choice(_WORDS) for _ in range(self.rng.randint(2, 6)))
+    
+    def expression(self, names: List[str]) -> str:
+        operands = [self.rng.choice(names) if names and self.rng.random() < 0.7
+                    else str(self.rng.randint(1, 99))
+                    for _ in range(self.rng.randint(1, 3))]
+        expression = operands[0]
+        for operand in operands[1:]:
+            expression += f" {self.rng.choice(_OPERATORS)} {operand}"
+        return expression
+    
+    def condition(self, names: List[str]) -> str:
+        return f"{self.rng.choice(names)} {self.rng.choice(_COMPARISONS)} {self.rng.randint(0, 50)}"
+    
+    def block(self, names: List[str], depth: int) -> List[Statement]:
+        body = []
+        for _ in range(self.rng.randint(2, 6)):
+            roll = self.rng.random()
+            if roll < 0.12:
+                body.append(('comment', self.text()))
+            elif roll < 0.2:
+                body.append(('string', self.identifier(), self.text()))
+            elif roll < 0.35 and depth < 2:
+                body.append(('if', self.condition(names), self.block(names, depth + 1)))
+            elif roll < 0.5 and depth < 2:
+                counter = self.rng.choice('ijk')
+                body.append(('loop', counter, self.rng.choice(names),
+                             self.block(names + [counter], depth + 1)))
+            else:
+                name = self.identifier()
+                body.append(('assign', name, self.expression(names)))
+                names = names + [name]
+        return body
+    
+    def function(self) -> Function:
+        name = f"{self.rng.choice(_VERBS)}_{self.rng.choice(_NOUNS)}_{self.rng.randrange(1000)}"
+        params = sorted({self.identifier() for _ in range(self.rng.randint(1, 3))})
+        body = self.block(list(params), 0)
+        body.append(('return', self.expression(params)))
+        return name, params, body
+
+def _camel_case(name: str) -> str:
+    first, *rest = name.split('_')
+    return first + ''.join(part.capitalize() for part in rest)
+
+def _rename(statements: List[Statement], names: Dict[str, str]) -> List[Statement]:
+    """Rename identifiers (and words of comments and strings) in statements."""
+    def words(text: str) -> str:
+        return ' '.join(names.get(word, word) for word in text.split(' '))
+    
+    renamed = []
+    for statement in statements:
+        kind = statement[0]
+        if kind in ('if', 'loop'):
+            renamed.append(statement[:-1][:1] + tuple(words(part) for part in statement[1:-1]) +
+                           (_rename(statement[-1], names),))
+        else:
+            renamed.append((kind,) + tuple(words(part) for part in statement[1:]))
+    return renamed
+
+def _rename_functions(functions: List[Function]) -> List[Function]:
+    """Consistently rename the functions, parameters and local variables of a program."""
+    names: Dict[str, str] = {}
+    
+    def collect(statements):
+        for statement in statements:
+            if statement[0] in ('assign', 'string'):
+                names.setdefault(statement[1], f"var_{len(names)}")
+            elif statement[0] == 'if':
+                collect(statement[2])
+            elif statement[0] == 'loop':
+                collect(statement[3])
+    
+    for name, params, body in functions:
+        names[name] = f"fn_{len(names)}"
+        for param in params:
+            names.setdefault(param, f"var_{len(names)}")
+        collect(body)
+    return [(names[name], [names[param] for param in params], _rename(body, names))
+            for name, params, body in functions]
+
+def _render_python(functions: List[Function]) -> List[str]:
+    lines = []
+    
+    def block(statements, indent):
+        pad = '    ' * indent
+        for statement in statements:
+            kind = statement[0]
+            if kind == 'assign':
+                lines.append(f"{pad}{statement[1]} = {statement[2]}")
+            elif kind == 'string':
+                lines.append(f'{pad}{statement[1]} = "{statement[2]}"')
+            elif kind == 'comment':
+                lines.append(f"{pad}# {statement[1]}")
+            elif kind == 'if':
+                lines.append(f"{pad}if {statement[1]}:")
+                block(statement[2], indent + 1)
+            elif kind == 'loop':
+                lines.append(f"{pad}for {statement[1]} in range({statement[2]}):")
+                block(statement[3], indent + 1)
+            else:
+                lines.append(f"{pad}return {statement[1]}")
+    
+    for name, params, body in functions:
+        lines.append(f"def {name}({', '.join(params)}):")
+        lines.append(f'    """{_camel_case(name)} helper."""')
+        block(body, 1)
+        lines.append('')
+    return lines
+
+def _render_ruby(functions: List[Function]) -> List[str]:
+    lines = []
+    
+    def block(statements, indent):
+        pad = '  ' * indent
+        for statement in statements:
+            kind = statement[0]
+            if kind == 'assign':
+                lines.append(f"{pad}{statement[1]} = {statement[2]}")
+            elif kind == 'string':
+                lines.append(f"{pad}{statement[1]} = '{statement[2]}'")
+            elif kind == 'comment':
+                lines.append(f"{pad}# {statement[1]}")
+            elif kind == 'if':
+                lines.append(f"{pad}if {statement[1]}")
+                block(statement[2], indent + 1)
+                lines.append(f"{pad}end")
+            elif kind == 'loop':
+                lines.append(f"{pad}{statement[2]}.times do |{statement[1]}|")
+                block(statement[3], indent + 1)
+                lines.append(f"{pad}end")
+            else:
+                lines.append(f"{pad}return {statement[1]}")
+    
+    for name, params, body in functions:
+        lines.append(f"def {name}({', '.join(params)})")
+        block(body, 1)
+        lines.append('end')
+        lines.append('')
+    return lines
+
+# C-family syntax: (function header, local declaration, loop header, string declaration)
+_C_FAMILY = {
+    '.java': ('public static int {name}({params}) {{', 'int ', 'for (int {i} = 0; {i} < {n}; {i}++) {{',
+              'String {name} = "{text}";', 'int {param}'),
+    '.cpp': ('int {name}({params}) {{', 'int ', 'for (int {i} = 0; {i} < {n}; {i}++) {{',
+             'std::string {name} = "{text}";', 'int {param}'),
+    '.c': ('int {name}({params}) {{', 'int ', 'for (int {i} = 0; {i} < {n}; {i}++) {{',
+           'const char *{name} = "{text}";', 'int {param}'),
+    '.js': ('function {name}({params}) {{', 'let ', 'for (let {i} = 0; {i} < {n}; {i}++) {{',
+            'const {name} = "{text}";', '{param}'),
+    '.ts': ('function {name}({params}): number {{', 'let ', 'for (let {i} = 0; {i} < {n}; {i}++) {{',
+            'const {name}: string = "{text}";', '{param}: number')
+}
+
+def _render_c_family(functions: List[Function], ext: str) -> List[str]:
+    header, declaration, loop, string, param = _C_FAMILY[ext]
+    camel = ext in ('.java', '.js', '.ts')
+    lines = []
+    indent_base = 1 if ext == '.java' else 0
+    
+    def block(statements, indent, declared):
+        pad = '    ' * indent
+        declared = set(declared)
+        for statement in statements:
+            kind = statement[0]
+            if kind == 'assign':
+                prefix = '' if statement[1] in declared else declaration
+                declared.add(statement[1])
+                lines.append(f"{pad}{prefix}{statement[1]} = {statement[2]};")
+            elif kind == 'string':
+                lines.append(pad + string.format(name=statement[1] + '_text', text=statement[2]))
+            elif kind == 'comment':
+                if len(statement[1]) % 2:
+                    lines.append(f"{pad}// {statement[1]}")
+                else:
+                    lines.append(f"{pad}/* {statement[1]} */")
+            elif kind == 'if':
+                lines.append(f"{pad}if ({statement[1]}) {{")
+                block(statement[2], indent + 1, declared)
+                lines.append(f"{pad}}}")
+            elif kind == 'loop':
+                lines.append(pad + loop.format(i=statement[1], n=statement[2]))
+                block(statement[3], indent + 1, declared | {statement[1]})
+                lines.append(f"{pad}}}")
+            else:
+                lines.append(f"{pad}return {statement[1]};")
+    
+    if ext == '.java':
+        lines.append('public class Submission {')
+    for name, params, body in functions:
+        pad = '    ' * indent_base
+        lines.append(f"{pad}/**")
+        lines.append(f"{pad} * {_camel_case(name)} helper.")
+        lines.append(f"{pad} */")
+        lines.append(pad + header.format(name=_camel_case(name) if camel else name,
+                                         params=', '.join(param.format(param=p) for p in params)))
+        block(body, indent_base + 1, params)
+        lines.append(f"{pad}}}")
+        lines.append('')
+    if ext == '.java':
+        lines.append('}')
+    return lines
+
+def render(functions: List[Function], ext: str) -> str:
+    """Render functions as the source code of one file."""
+    if ext == '.py':
+        lines = _render_python(functions)
+    elif ext == '.rb':
+        lines = _render_ruby(functions)
+    else:
+        lines = _render_c_family(functions, ext)
+    return '\n'.join(lines) + '\n'
+
+def parse_weights(spec: str, choices: Tuple[str, ...]) -> Dict[str, float]:
+    """Parse 'py=2,java=1' (or 'py,java') into weights keyed by choice."""
+    weights = {}
+    for item in spec.split(','):
+        name, _, weight = item.strip().partition('=')
+        key = name if name in choices else '.' + name
+        if key not in choices:
+            raise ValueError(f"Unknown choice: {name}")
+        weights[key] = float(weight) if weight else 1.0
+    return weights
+
+def generate_corpus(directory: str, files: int = 100, clone_rate: float = 0.3,
+                    mean_functions: float = 4.0, languages: Optional[Dict[str, float]] = None,
+                    clone_kinds: Optional[Dict[str, float]] = None, seed: int = 0) -> List[Dict]:
+    """
+    Write a synthetic corpus of submissions to a directory.
+    
+    Files are generated in order; a clone is always derived from an earlier
+    original of the same language, so every prefix of the corpus is itself a
+    valid corpus with the same clone rate.
+    
+    Args:
+        directory: Output directory (created if missing)
+        files: Number of files
+        clone_rate: Fraction of files that are clones of an earlier original
+        mean_functions: Mean number of functions per original; the counts
+            are log-normally distributed
+        languages: Weights per file extension (default: all languages equally)
+        clone_kinds: Weights per clone kind from CLONE_KINDS (default: equal)
+        seed: Seed of the generator
+    
+    Returns:
+        Manifest in file order, one dictionary per file with its 'file'
+        name, 'language' extension, clone 'kind' ('original' for originals)
+        and 'source' file name (None for originals); also written to
+        manifest.json
+    """
+    if not 0.0 <= clone_rate <= 1.0:
+        raise ValueError("clone_rate must be between 0 and 1")
+    
+    rng = random.Random(seed)
+    generator = _ProgramGenerator(rng)
+    languages = languages or dict.fromkeys(LANGUAGES, 1.0)
+    clone_kinds = clone_kinds or dict.fromkeys(CLONE_KINDS, 1.0)
+    language_list, language_weights = zip(*sorted(languages.items()))
+    kind_list, kind_weights = zip(*sorted(clone_kinds.items()))
+    width = len(str(max(files - 1, 0)))
+    
+    os.makedirs(directory, exist_ok=True)
+    originals: Dict[str, List[Tuple[str, List[Function]]]] = {ext: [] for ext in language_list}
+    manifest = []
+    for index in range(files):
+        ext = rng.choices(language_list, language_weights)[0]
+        file_name = f"submission_{index:0{width}d}{ext}"
+        kind, source = 'original', None
+        if originals[ext] and rng.random() < clone_rate:
+            kind = rng.choices(kind_list, kind_weights)[0]
+            source, functions = rng.choice(originals[ext])
+            if kind == 'exact':
+                functions = [(name, params, [(s[0], generator.text()) if s[0] == 'comment' else s
+                                             for s in body])
+                             for name, params, body in functions]
+            elif kind == 'extended':
+                functions = functions + [generator.function() for _ in range(rng.randint(1, 3))]
+            elif kind == 'reordered':
+                functions = functions + [generator.function()]
+                rng.shuffle(functions)
+            else:
+                functions = _rename_functions(functions)
+        else:
+            count = max(1, round(rng.lognormvariate(math.log(mean_functions), 0.5)))
+            functions = [generator.function() for _ in range(count)]
+            originals[ext].append((file_name, functions))
+        
+        with open(os.path.join(directory, file_name), 'w', encoding='utf-8') as f:
+            f.write(render(functions, ext))
+        manifest.append({'file': file_name, 'language': ext, 'kind': kind, 'source': source})
+    
+    with open(os.path.join(directory, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1)
+    return manifest
+
+def load_manifest(directory: str) -> List[Dict]:
+    """Read the manifest of a generated corpus."""
+    with open(os.path.join(directory, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def main(argv: List[str] = None):
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    arg_parser.add_argument('directory', help='Output directory')
+    arg_parser.add_argument('--files', type=int, default=SCALES[0], help='Number of files')
+    arg_parser.add_argument('--clone-rate', type=float, default=0.3,
+                            help='Fraction of files cloned from an earlier file')
+    arg_parser.add_argument('--mean-functions', type=float, default=4.0,
+                            help='Mean number of functions per original file')
+    arg_parser.add_argument('--languages', default=None,
+                            help='Language weights, e.g. py=2,java=1 (default: all equally)')
+    arg_parser.add_argument('--seed', type=int, default=0, help='Generator seed')
+    args = arg_parser.parse_args(argv)
+    
+    languages = parse_weights(args.languages, LANGUAGES) if args.languages else None
+    manifest = generate_corpus(args.directory, args.files, args.clone_rate,
+                               args.mean_functions, languages, seed=args.seed)
+    clones = sum(entry['kind'] != 'original' for entry in manifest)
+    print(f"{len(manifest)} files ({clones} clones) written to {args.directory}")
+
+if __name__ == '__main__':
+    main()
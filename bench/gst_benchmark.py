@@ -0,0 +1,102 @@
+"""
+Greedy String Tiling scaling benchmark.
+
+Times GreedyStringTiling.tiles on pairs of token sequences where the second
+is the first cut into chunks and shuffled, which yields many tiles of many
+different lengths. The growth of the time per pair is fitted as n^exponent
+over the sizes; an exponent above the threshold is reported as a regression
+and the exit status is 1.
+
+Usage:
+    python -m bench.gst_benchmark [--tokens N ...] [--chunk N] [--repeat N]
+        [--max-exponent X] [--seed N]
+"""
+from typing import Dict, List, Tuple
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from greedy_string_tiling import GreedyStringTiling
+
+# Tokens per sequence of the benchmarked pairs
+SIZES = (2000, 8000, 32000)
+
+def shuffled_pair(tokens: int, chunk: int = 50, vocabulary: int = 200,
+                  seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Build a random token sequence and a copy with its chunks (cut at random points) shuffled."""
+    rng = np.random.default_rng(seed)
+    first = rng.integers(0, vocabulary, tokens)
+    cuts = np.sort(rng.choice(np.arange(1, tokens), max(0, tokens // chunk - 1), replace=False))
+    chunks = np.split(first, cuts)
+    order = rng.permutation(len(chunks))
+    return first, np.concatenate([chunks[i] for i in order])
+
+def benchmark_gst(sizes: List[int] = SIZES, chunk: int = 50, repeat: int = 3,
+                  min_match_length: int = 8, seed: int = 0) -> Dict:
+    """
+    Time the tiling of one shuffled pair per size.
+    
+    Args:
+        sizes: Tokens per sequence
+        chunk: Mean tokens per shuffled chunk
+        repeat: Runs per size; the fastest one is reported
+        min_match_length: Minimum tile length
+        seed: Seed of the token sequences
+    
+    Returns:
+        Dictionary with one run per size (seconds, tiles, distinct tile
+        lengths and covered fraction) and the fitted scaling exponent
+    """
+    runs = []
+    for tokens in sorted(sizes):
+        first, second = shuffled_pair(tokens, chunk, seed=seed)
+        best = float('inf')
+        for _ in range(repeat):
+            tiling = GreedyStringTiling(min_match_length)
+            start_time = time.perf_counter()
+            tiles = tiling.tiles(first, second)
+            best = min(best, time.perf_counter() - start_time)
+        runs.append({
+            'tokens': tokens,
+            'seconds': best,
+            'tiles': len(tiles),
+            'tile_lengths': len({length for _, _, length in tiles}),
+            'coverage': sum(length for _, _, length in tiles) / tokens
+        })
+    
+    exponent = None
+    if len(runs) > 1:
+        sizes_log = np.log([run['tokens'] for run in runs])
+        seconds_log = np.log([max(run['seconds'], 1e-9) for run in runs])
+        exponent = float(np.polyfit(sizes_log, seconds_log, 1)[0])
+    return {'runs': runs, 'exponent': exponent}
+
+def main(argv: List[str] = None) -> int:
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    arg_parser.add_argument('--tokens', type=int, nargs='+', default=list(SIZES),
+                            help='Tokens per sequence (default: 2000 8000 32000)')
+    arg_parser.add_argument('--chunk', type=int, default=50, help='Mean tokens per shuffled chunk')
+    arg_parser.add_argument('--repeat', type=int, default=3,
+                            help='Runs per size; the fastest one is kept')
+    arg_parser.add_argument('--max-exponent', type=float, default=1.5,
+                            help='Largest allowed fitted exponent of the time per pair')
+    arg_parser.add_argument('--seed', type=int, default=0, help='Token sequence seed')
+    args = arg_parser.parse_args(argv)
+    
+    report = benchmark_gst(args.tokens, args.chunk, args.repeat, seed=args.seed)
+    for run in report['runs']:
+        print(f"{run['tokens']:>8} tokens: {run['seconds']:.3f}s  {run['tiles']:>5} tiles  "
+              f"{run['tile_lengths']:>3} lengths  {run['coverage']:.1%} covered")
+    
+    if report['exponent'] is None:
+        return 0
+    print(f"time per pair grows as n^{report['exponent']:.2f}")
+    if report['exponent'] > args.max_exponent:
+        print(f"REGRESSION: exponent above {args.max_exponent}")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,335 @@
+"""
+Detection pipeline benchmark.
+
+Generates synthetic corpora (see bench.corpus) and times every stage of the
+pipeline separately: parsing, fingerprinting, ingestion (storage and
+indexing), candidate comparison, clustering, the similarity matrix and the
+HTML report. Results are written as JSON; given a baseline result file,
+stages that got slower by more than a threshold are flagged as regressions
+and the exit status is 1.
+
+Usage:
+    python -m bench.pipeline_benchmark [--files N ...] [--output FILE]
+        [--baseline FILE] [--max-regression PERCENT] [--repeat N]
+        [--clone-rate R] [--mean-functions N] [--languages py=2,java=1,...]
+        [--seed N] [--corpus-dir DIR]
+"""
+from typing import Dict, List, Optional
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+from bench.corpus import LANGUAGES, MANIFEST_NAME, SCALES, generate_corpus, load_manifest, parse_weights
+from plagiarism_detector import PlagiarismDetector, _fingerprint_tokens
+
+# Timed stages, in pipeline order
+STAGES = ('parse', 'fingerprint', 'ingest', 'compare', 'find_clusters',
+          'similarity_matrix', 'report')
+
+# Version of the result file layout
+RESULT_VERSION = 1
+
+def benchmark_pipeline(corpus_dir: str, manifest: List[Dict], report_max_files: int = 200,
+                       detector_options: Optional[Dict] = None) -> Dict:
+    """
+    Run the detection pipeline over a corpus and time each stage.
+    
+    Files are ingested one by one in manifest order, so every clone is
+    compared with its already stored source.
+    
+    Args:
+        corpus_dir: Directory holding the corpus files
+        manifest: Manifest entries of the files to ingest (see generate_corpus)
+        report_max_files: The HTML report draws an n x n heatmap, so it is
+            skipped for larger corpora
+        detector_options: Keyword arguments for PlagiarismDetector
+    
+    Returns:
+        Dictionary with the corpus size, the seconds spent in every stage
+        ('ingest' excludes 'compare'; None for a skipped stage), the reasons
+        stages were skipped and the recall of the clone pairs per clone kind
+    """
+    detector = PlagiarismDetector(**(detector_options or {}))
+    stages = dict.fromkeys(STAGES, 0.0)
+    skipped = {}
+    
+    compare_with_existing = detector._compare_with_existing
+    
+    def timed_compare(*args, **kwargs):
+        start_time = time.perf_counter()
+        try:
+            return compare_with_existing(*args, **kwargs)
+        finally:
+            stages['compare'] += time.perf_counter() - start_time
+    
+    detector._compare_with_existing = timed_compare
+    
+    tokens_total = 0
+    bytes_total = 0
+    start_time = time.perf_counter()
+    with detector.batch_ingest():
+        for entry in manifest:
+            file_path = os.path.join(corpus_dir, entry['file'])
+            parse_start = time.perf_counter()
+            tokens = detector.parser.parse_file(file_path)
+            fingerprint_start = time.perf_counter()
+            tokens, fingerprints, kgram_hashes = _fingerprint_tokens(
+                detector.rabin_karp, tokens, detector.window_size, detector.winnow_window)
+            fingerprint_end = time.perf_counter()
+            metadata = detector.parser.get_metadata(file_path)
+            detector._ingest_submission(entry['file'], tokens, metadata, fingerprints, kgram_hashes)
+            
+            stages['parse'] += fingerprint_start - parse_start
+            stages['fingerprint'] += fingerprint_end - fingerprint_start
+            tokens_total += len(tokens)
+            bytes_total += metadata.get('file_size', 0)
+    stages['ingest'] = (time.perf_counter() - start_time - stages['parse'] -
+                        stages['fingerprint'] - stages['compare'])
+    
+    start_time = time.perf_counter()
+    clusters = detector.find_plagiarism_clusters()
+    stages['find_clusters'] = time.perf_counter() - start_time
+    
+    start_time = time.perf_counter()
+    submission_ids, matrix = detector.get_similarity_matrix(output='sparse')
+    stages['similarity_matrix'] = time.perf_counter() - start_time
+    
+    if len(submission_ids) > report_max_files:
+        skipped['report'] = f"more than {report_max_files} files"
+    else:
+        try:
+            from app import generate_html_report
+        except ImportError as e:
+            skipped['report'] = f"report dependencies missing ({e})"
+        else:
+            start_time = time.perf_counter()
+            generate_html_report(clusters, matrix, submission_ids,
+                                 detector.similarity_graph.similarity_threshold, detector.window_size)
+            stages['report'] = time.perf_counter() - start_time
+    for stage in skipped:
+        stages[stage] = None
+    
+    # Recall of the generated clone pairs per clone kind
+    graph = detector.similarity_graph.graph
+    detection = {}
+    for entry in manifest:
+        if entry['source'] is None:
+            continue
+        kind = detection.setdefault(entry['kind'], {'pairs': 0, 'found': 0})
+        kind['pairs'] += 1
+        kind['found'] += graph.has_edge(entry['file'], entry['source'])
+    for kind in detection.values():
+        kind['recall'] = kind['found'] / kind['pairs']
+    
+    return {
+        'files': len(manifest),
+        'tokens': tokens_total,
+        'bytes': bytes_total,
+        'clusters': len(clusters),
+        'stages': stages,
+        'skipped': skipped,
+        'detection': detection
+    }
+
+def _best_of(runs: List[Dict]) -> Dict:
+    """Merge repeated runs of the same corpus, keeping the fastest time of every stage."""
+    best = dict(runs[0])
+    best['stages'] = {
+        stage: None if runs[0]['stages'][stage] is None
+        else min(run['stages'][stage] for run in runs)
+        for stage in STAGES
+    }
+    best['total'] = sum(seconds for seconds in best['stages'].values() if seconds is not None)
+    return best
+
+def compare_with_baseline(results: Dict, baseline: Dict, max_regression: float = 10.0,
+                          min_seconds: float = 0.005) -> List[Dict]:
+    """
+    Compare stage timings with a baseline result file.
+    
+    Runs are matched by corpus size. A stage regressed when it is more than
+    max_regression percent and more than min_seconds slower than in the
+    baseline; the absolute floor keeps timer noise of very fast stages from
+    being flagged.
+    
+    Args:
+        results: Result of run_benchmarks
+        baseline: Earlier result of run_benchmarks
+        max_regression: Allowed slowdown in percent
+        min_seconds: Slowdowns below this many seconds are never flagged
+    
+    Returns:
+        One dictionary per stage timed in both, with the corpus 'files',
+        'stage', 'baseline' and 'current' seconds, 'change_percent' and
+        whether it is a 'regression'
+    """
+    baseline_runs = {run['files']: run for run in baseline.get('runs', [])}
+    comparisons = []
+    for run in results['runs']:
+        baseline_run = baseline_runs.get(run['files'])
+        if baseline_run is None:
+            continue
+        for stage in STAGES:
+            current = run['stages'].get(stage)
+            previous = baseline_run['stages'].get(stage)
+            if current is None or previous is None:
+                continue
+            change = (current - previous) / previous * 100 if previous > 0 else 0.0
+            comparisons.append({
+                'files': run['files'],
+                'stage': stage,
+                'baseline': previous,
+                'current': current,
+                'change_percent': change,
+                'regression': change > max_regression and current - previous > min_seconds
+            })
+    return comparisons
+
+def run_benchmarks(scales: List[int] = SCALES[:2], repeat: int = 1, clone_rate: float = 0.3,
+                   mean_functions: float = 4.0, languages: Optional[Dict[str, float]] = None,
+                   seed: int = 0, corpus_dir: Optional[str] = None,
+                   report_max_files: int = 200, detector_options: Optional[Dict] = None) -> Dict:
+    """
+    Benchmark the pipeline on synthetic corpora of several sizes.
+    
+    One corpus of the largest size is generated, and every smaller size is
+    benchmarked on its prefix.
+    
+    Args:
+        scales: Corpus sizes (number of files)
+        repeat: Runs per size; the fastest time of every stage is reported
+        clone_rate: Fraction of files cloned from an earlier file
+        mean_functions: Mean number of functions per original file
+        languages: Weights per file extension (default: all languages equally)
+        seed: Corpus generator seed
+        corpus_dir: Directory to generate the corpus in (or to reuse a
+            corpus from, if it holds a manifest); a temporary directory that
+            is removed afterwards if omitted
+        report_max_files: Largest corpus to generate the HTML report for
+        detector_options: Keyword arguments for PlagiarismDetector
+    
+    Returns:
+        Result dictionary with the environment, configuration and one run
+        per corpus size
+    """
+    config = {
+        'scales': sorted(scales),
+        'repeat': repeat,
+        'clone_rate': clone_rate,
+        'mean_functions': mean_functions,
+        'languages': languages or dict.fromkeys(LANGUAGES, 1.0),
+        'seed': seed,
+        'detector_options': detector_options or {}
+    }
+    
+    directory = corpus_dir or tempfile.mkdtemp(prefix='plagiarism_bench_')
+    try:
+        manifest = None
+        if corpus_dir is not None and os.path.exists(os.path.join(corpus_dir, MANIFEST_NAME)):
+            manifest = load_manifest(corpus_dir)
+            if len(manifest) < max(scales):
+                manifest = None
+        if manifest is None:
+            manifest = generate_corpus(directory, max(scales), clone_rate, mean_functions,
+                                       languages, seed=seed)
+        
+        runs = []
+        for files in config['scales']:
+            runs.append(_best_of([
+                benchmark_pipeline(directory, manifest[:files], report_max_files, detector_options)
+                for _ in range(repeat)
+            ]))
+    finally:
+        if corpus_dir is None:
+            shutil.rmtree(directory, ignore_errors=True)
+    
+    return {
+        'version': RESULT_VERSION,
+        'created': datetime.now().isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'processor': platform.processor()
+        },
+        'config': config,
+        'runs': runs
+    }
+
+def main(argv: List[str] = None) -> int:
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    arg_parser.add_argument('--files', type=int, nargs='+', default=list(SCALES[:2]),
+                            help=f"Corpus sizes (default: 100 1000; full suite: "
+                                 f"{' '.join(map(str, SCALES))})")
+    arg_parser.add_argument('--output', help='Write the results as JSON to this file')
+    arg_parser.add_argument('--baseline', help='Earlier result file to compare with')
+    arg_parser.add_argument('--max-regression', type=float, default=10.0,
+                            help='Allowed slowdown of a stage in percent')
+    arg_parser.add_argument('--repeat', type=int, default=1,
+                            help='Runs per size; the fastest time of every stage is kept')
+    arg_parser.add_argument('--clone-rate', type=float, default=0.3,
+                            help='Fraction of files cloned from an earlier file')
+    arg_parser.add_argument('--mean-functions', type=float, default=4.0,
+                            help='Mean number of functions per original file')
+    arg_parser.add_argument('--languages', default=None,
+                            help='Language weights, e.g. py=2,java=1 (default: all equally)')
+    arg_parser.add_argument('--seed', type=int, default=0, help='Corpus generator seed')
+    arg_parser.add_argument('--corpus-dir', help='Keep (or reuse) the generated corpus here')
+    arg_parser.add_argument('--engine', choices=PlagiarismDetector.ENGINES, default='rabin_karp',
+                            help='Comparison engine of the detector')
+    arg_parser.add_argument('--use-lsh', action='store_true',
+                            help='Select comparison candidates with MinHash LSH')
+    args = arg_parser.parse_args(argv)
+    
+    # Per-file log messages of the detector would dominate the output
+    logging.disable(logging.WARNING)
+    
+    languages = parse_weights(args.languages, LANGUAGES) if args.languages else None
+    results = run_benchmarks(args.files, args.repeat, args.clone_rate, args.mean_functions,
+                             languages, args.seed, args.corpus_dir,
+                             detector_options={'engine': args.engine, 'use_lsh': args.use_lsh})
+    
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        comparisons = compare_with_baseline(results, baseline, args.max_regression)
+        regressions = [comparison for comparison in comparisons if comparison['regression']]
+        results['baseline'] = {
+            'path': args.baseline,
+            'max_regression_percent': args.max_regression,
+            'comparisons': comparisons,
+            'regressions': len(regressions)
+        }
+    
+    for run in results['runs']:
+        print(f"{run['files']} files, {run['tokens']} tokens, {run['clusters']} clusters, "
+              f"{run['total']:.3f}s")
+        for stage in STAGES:
+            seconds = run['stages'][stage]
+            timing = f"{seconds:.4f}s" if seconds is not None else f"skipped ({run['skipped'][stage]})"
+            print(f"  {stage:>17}: {timing}")
+        recall = ', '.join(f"{kind} {counts['recall']:.2f}"
+                           for kind, counts in sorted(run['detection'].items()))
+        print(f"  {'clone recall':>17}: {recall}")
+    for regression in regressions:
+        print(f"REGRESSION {regression['files']} files {regression['stage']}: "
+              f"{regression['baseline']:.4f}s -> {regression['current']:.4f}s "
+              f"(+{regression['change_percent']:.1f}%)")
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
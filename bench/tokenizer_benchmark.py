@@ -0,0 +1,129 @@
+"""
+Tokenizer micro-benchmark.
+
+Compares the single-pass scanner of CodeParser with the previous three-pass
+implementation (multi-line comment removal, single-line comment removal and
+tokenization with re.findall) and reports tokens per second of both.
+
+Usage:
+    python -m bench.tokenizer_benchmark [paths ...] [--repeat N] [--scale N]
+"""
+from typing import Dict, List, Tuple
+import argparse
+import os
+import re
+import time
+
+from code_parser import CodeParser
+from token_vocabulary import TokenVocabulary
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'test_files')
+
+# Comment patterns of the previous implementation (CodeParser.PARSER_VERSION 1)
+_LEGACY_COMMENT_PATTERNS = {
+    '.py': (r'#.*?$', r'""".*?"""|\'\'\'.*?\'\'\''),
+    '.java': (r'//.*?$', r'/\*.*?\*/'),
+    '.cpp': (r'//.*?$', r'/\*.*?\*/'),
+    '.c': (r'//.*?$', r'/\*.*?\*/'),
+    '.h': (r'//.*?$', r'/\*.*?\*/'),
+    '.js': (r'//.*?$', r'/\*.*?\*/'),
+    '.ts': (r'//.*?$', r'/\*.*?\*/'),
+    '.rb': (r'#.*?$', r'=begin.*?=end')
+}
+
+def legacy_parse_source(content: str, file_ext: str, vocabulary: TokenVocabulary):
+    """Tokenize source code the way CodeParser did before the single-pass scanner."""
+    single_line, multi_line = _LEGACY_COMMENT_PATTERNS[file_ext]
+    content = re.sub(multi_line, '', content, flags=re.DOTALL)
+    content = re.sub(single_line, '', content, flags=re.MULTILINE)
+    tokens = re.findall(r'\b\w+\b|[^\w\s]', content)
+    return vocabulary.encode(t.lower() for t in tokens if t.strip())
+
+def load_sources(paths: List[str]) -> List[Tuple[str, str]]:
+    """Read the supported source files under the given files and directories."""
+    sources = []
+    for path in paths:
+        if os.path.isdir(path):
+            file_paths = sorted(os.path.join(root, name) for root, _, names in os.walk(path) for name in names)
+        else:
+            file_paths = [path]
+        for file_path in file_paths:
+            ext = os.path.splitext(file_path)[1].lower()
+            if ext in _LEGACY_COMMENT_PATTERNS:
+                with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+                    sources.append((ext, f.read()))
+    return sources
+
+def benchmark_tokenizer(sources: List[Tuple[str, str]], repeat: int = 5) -> Dict:
+    """
+    Time both tokenizers on the same sources.
+    
+    Args:
+        sources: (file extension, source text) pairs
+        repeat: Number of runs; the fastest one is reported
+    
+    Returns:
+        Dictionary with the token count, best time and tokens per second of
+        each implementation, the speedup and the number of files whose
+        token streams are identical
+    """
+    parser = CodeParser()
+    vocabulary = TokenVocabulary()
+    implementations = {
+        'legacy': lambda ext, text: legacy_parse_source(text, ext, vocabulary),
+        'scanner': lambda ext, text: parser.parse_source(text, ext)
+    }
+    
+    results = {}
+    for name, parse in implementations.items():
+        best = float('inf')
+        for _ in range(repeat):
+            start_time = time.perf_counter()
+            tokens = sum(len(parse(ext, text)) for ext, text in sources)
+            best = min(best, time.perf_counter() - start_time)
+        results[name] = {
+            'tokens': tokens,
+            'seconds': best,
+            'tokens_per_second': tokens / best if best > 0 else 0.0
+        }
+    
+    identical = sum(
+        vocabulary.decode(legacy_parse_source(text, ext, vocabulary)) ==
+        parser.vocabulary.decode(parser.parse_source(text, ext))
+        for ext, text in sources
+    )
+    
+    return {
+        'files': len(sources),
+        'bytes': sum(len(text) for _, text in sources),
+        'legacy': results['legacy'],
+        'scanner': results['scanner'],
+        'speedup': results['legacy']['seconds'] / results['scanner']['seconds']
+                   if results['scanner']['seconds'] > 0 else 0.0,
+        'identical_files': identical
+    }
+
+def main(argv: List[str] = None):
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    arg_parser.add_argument('paths', nargs='*', default=[DEFAULT_CORPUS],
+                            help='Source files or directories (default: test_files)')
+    arg_parser.add_argument('--repeat', type=int, default=5, help='Runs per implementation')
+    arg_parser.add_argument('--scale', type=int, default=50,
+                            help='Times each file is repeated to get measurable timings')
+    args = arg_parser.parse_args(argv)
+    
+    sources = load_sources(args.paths)
+    if not sources:
+        arg_parser.error('no supported source files found')
+    report = benchmark_tokenizer(sources * args.scale, args.repeat)
+    
+    print(f"{report['files']} files, {report['bytes'] / 1e6:.2f} MB")
+    for name in ('legacy', 'scanner'):
+        result = report[name]
+        print(f"{name:>8}: {result['tokens']:>10} tokens  {result['seconds']:.3f}s  "
+              f"{result['tokens_per_second'] / 1e6:.2f}M tokens/s")
+    print(f" speedup: {report['speedup']:.2f}x")
+    print(f"identical token streams: {report['identical_files']}/{report['files']} files")
+
+if __name__ == '__main__':
+    main()
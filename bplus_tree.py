@@ -1,7 +1,10 @@
-from typing import List, Dict, Optional, Tuple, Any
+from typing import List, Dict, Optional, Tuple, Any, Iterable, Iterator
 import math
 import logging
+from bisect import bisect_left, bisect_right
 import json
+import struct
+import numpy as np
 from pathlib import Path
 import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
@@ -10,7 +13,20 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Snapshot layout: header (magic, format version, number of pairs), then
+# one record per pair in key order. A record header holds the byte lengths
+# of the JSON key and value and the number of array blocks that follow;
+# every array block is prefixed with its name length, the lengths of its
+# stored and original dtype strings and its size
+_SNAPSHOT_MAGIC = b'PDBS'
+_SNAPSHOT_HEADER = struct.Struct('<4sIQ')
+_RECORD_HEADER = struct.Struct('<IIH')
+_ARRAY_HEADER = struct.Struct('<HBBQ')
+SNAPSHOT_FORMAT_VERSION = 1
+
 class BPlusTreeNode:
+    __slots__ = ('keys', 'values', 'children', 'is_leaf', 'next', 'parent')
+    
     def __init__(self, is_leaf: bool = True):
         self.keys: List[str] = []
         self.values: List[Dict] = []
@@ -20,17 +36,24 @@ class BPlusTreeNode:
         self.parent = None
 
 class BPlusTree:
-    def __init__(self, order: int = 4):
+    def __init__(self, order: int = 128):
         """
         Initialize B+ Tree with configurable order.
         
+        Keys within a node are located by binary search, so a high fanout
+        keeps the tree shallow without making per-node work linear.
+        
         Args:
-            order: Maximum number of children per node
+            order: Maximum number of children per node (at least 3)
         """
+        if order < 3:
+            raise ValueError("B+ Tree order must be at least 3")
+        
         self.root = None
         self.order = order
         self.min_keys = math.ceil(order / 2) - 1
         self.max_keys = order - 1
+        self._size = 0
         self._performance_metrics = {
             'insertions': 0,
             'deletions': 0,
@@ -58,6 +81,7 @@ class BPlusTree:
                 self.root = BPlusTreeNode(is_leaf=True)
                 self.root.keys = [key]
                 self.root.values = [value]
+                self._size += 1
                 self._performance_metrics['insertions'] += 1
                 return True
             
@@ -65,15 +89,15 @@ class BPlusTree:
             leaf = self._find_leaf(key)
             
             # Insert the key-value pair
-            if key in leaf.keys:
+            idx = bisect_left(leaf.keys, key)
+            if idx < len(leaf.keys) and leaf.keys[idx] == key:
                 # Update existing value
-                idx = leaf.keys.index(key)
                 leaf.values[idx] = value
             else:
                 # Insert new key-value pair
-                idx = self._find_insertion_index(leaf.keys, key)
                 leaf.keys.insert(idx, key)
                 leaf.values.insert(idx, value)
+                self._size += 1
                 self._performance_metrics['insertions'] += 1
             
             # Check if the node needs to be split
@@ -105,8 +129,8 @@ class BPlusTree:
                 return None
             
             leaf = self._find_leaf(key)
-            if key in leaf.keys:
-                idx = leaf.keys.index(key)
+            idx = bisect_left(leaf.keys, key)
+            if idx < len(leaf.keys) and leaf.keys[idx] == key:
                 self._performance_metrics['processing_time'] += time.time() - start_time
                 return leaf.values[idx]
             
@@ -134,18 +158,19 @@ class BPlusTree:
                 return False
             
             leaf = self._find_leaf(key)
-            if key not in leaf.keys:
+            idx = bisect_left(leaf.keys, key)
+            if idx == len(leaf.keys) or leaf.keys[idx] != key:
                 return False
             
             # Remove the key-value pair
-            idx = leaf.keys.index(key)
             leaf.keys.pop(idx)
             leaf.values.pop(idx)
+            self._size -= 1
             self._performance_metrics['deletions'] += 1
             
             # Check if the node needs to be merged or redistributed
             if len(leaf.keys) < self.min_keys and leaf != self.root:
-                self._handle_underflow(leaf)
+                self._handle_underflow(leaf, key)
             
             self._performance_metrics['processing_time'] += time.time() - start_time
             return True
@@ -154,6 +179,88 @@ class BPlusTree:
             logger.error(f"Error deleting key {key}: {str(e)}")
             return False
     
+    @classmethod
+    def bulk_load(cls, items: Iterable[Tuple[Any, Any]], order: int = 128) -> 'BPlusTree':
+        """
+        Build a tree bottom-up from key-value pairs sorted by key.
+        
+        Leaves are packed full and linked, then each internal level is built
+        from the level below, so loading n pairs takes O(n) time and yields
+        the shallowest tree for the order.
+        
+        Args:
+            items: (key, value) pairs in strictly increasing key order
+            order: Maximum number of children per node
+        
+        Returns:
+            BPlusTree: The loaded tree
+        
+        Raises:
+            ValueError: If the keys are not strictly increasing
+        """
+        start_time = time.time()
+        tree = cls(order=order)
+        
+        keys = []
+        values = []
+        for key, value in items:
+            if keys and not keys[-1] < key:
+                raise ValueError(f"Bulk load keys must be strictly increasing, got {key!r} after {keys[-1]!r}")
+            keys.append(key)
+            values.append(value)
+        
+        if not keys:
+            return tree
+        
+        # Build the linked leaf level
+        level = []
+        for start, end in tree._pack_ranges(len(keys), tree.max_keys, tree.min_keys):
+            leaf = BPlusTreeNode(is_leaf=True)
+            leaf.keys = keys[start:end]
+            leaf.values = values[start:end]
+            if level:
+                level[-1].next = leaf
+            level.append(leaf)
+        
+        # Smallest key of every subtree, used as the separator in its parent
+        first_keys = [node.keys[0] for node in level]
+        
+        # Build internal levels until a single root remains
+        while len(level) > 1:
+            parents = []
+            parent_first_keys = []
+            for start, end in tree._pack_ranges(len(level), tree.order, tree.min_keys + 1):
+                parent = BPlusTreeNode(is_leaf=False)
+                parent.children = level[start:end]
+                parent.keys = first_keys[start + 1:end]
+                for child in parent.children:
+                    child.parent = parent
+                parents.append(parent)
+                parent_first_keys.append(first_keys[start])
+            level = parents
+            first_keys = parent_first_keys
+        
+        tree.root = level[0]
+        tree._size = len(keys)
+        tree._performance_metrics['insertions'] = len(keys)
+        tree._performance_metrics['processing_time'] = time.time() - start_time
+        return tree
+    
+    @staticmethod
+    def _pack_ranges(count: int, capacity: int, minimum: int) -> List[Tuple[int, int]]:
+        """
+        Split count entries into full groups of at most capacity entries.
+        
+        If the last group would hold fewer than minimum entries, it is
+        balanced with the previous group so every group is valid.
+        """
+        ranges = [(start, min(start + capacity, count)) for start in range(0, count, capacity)]
+        if len(ranges) > 1 and ranges[-1][1] - ranges[-1][0] < minimum:
+            start = ranges[-2][0]
+            middle = start + (count - start) // 2
+            ranges[-2:] = [(start, middle), (middle, count)]
+        return ranges
+    
     def range_search(self, start_key: Any, end_key: Any) -> List[Tuple[Any, Any]]:
         """
         Search for all keys in the range [start_key, end_key].
@@ -167,41 +274,88 @@ class BPlusTree:
         """
         results = []
         try:
-            if self.root is None:
-                return results
-            
-            # Find the leaf node containing start_key
-            leaf = self._find_leaf(start_key)
-            
-            # Traverse leaf nodes until we find a key greater than end_key
-            while leaf is not None:
-                for i, key in enumerate(leaf.keys):
-                    if start_key <= key <= end_key:
-                        results.append((key, leaf.values[i]))
-                    elif key > end_key:
-                        return results
-                leaf = leaf.next
-            
+            results.extend(self.iter_range(start_key, end_key))
             return results
             
         except Exception as e:
             logger.error(f"Error in range search: {str(e)}")
             return results
     
+    def iter_range(self, start_key: Any = None, end_key: Any = None) -> Iterator[Tuple[Any, Any]]:
+        """
+        Lazily iterate over the keys in the range [start_key, end_key].
+        
+        The leaf chain is walked in place, so no list of results is built.
+        The tree must not be modified while the iterator is in use.
+        
+        Args:
+            start_key: The lower bound of the range (None for no bound)
+            end_key: The upper bound of the range (None for no bound)
+        
+        Yields:
+            (key, value) tuples in key order
+        """
+        if self.root is None:
+            return
+        
+        if start_key is None:
+            leaf = self._first_leaf()
+            idx = 0
+        else:
+            leaf = self._find_leaf(start_key)
+            idx = bisect_left(leaf.keys, start_key)
+        
+        while leaf is not None:
+            keys = leaf.keys
+            end = len(keys) if end_key is None else bisect_right(keys, end_key)
+            values = leaf.values
+            for i in range(idx, end):
+                yield keys[i], values[i]
+            if end < len(keys):
+                return
+            leaf = leaf.next
+            idx = 0
+    
+    def iter_prefix(self, prefix: str) -> Iterator[Tuple[str, Any]]:
+        """
+        Lazily iterate over the string keys starting with a prefix.
+        
+        Args:
+            prefix: Key prefix to match
+        
+        Yields:
+            (key, value) tuples in key order
+        """
+        for key, value in self.iter_range(prefix):
+            if not key.startswith(prefix):
+                return
+            yield key, value
+    
+    def iter_all(self) -> Iterator[Tuple[Any, Any]]:
+        """Lazily iterate over all (key, value) pairs in key order."""
+        return self.iter_range()
+    
+    def items(self) -> List[Tuple[Any, Any]]:
+        """Get all (key, value) pairs in key order."""
+        return list(self.iter_all())
+    
+    def _first_leaf(self) -> BPlusTreeNode:
+        """Find the leftmost leaf node."""
+        node = self.root
+        while not node.is_leaf:
+            node = node.children[0]
+        return node
+    
     def _find_leaf(self, key: Any) -> BPlusTreeNode:
         """Find the leaf node where a key should be inserted."""
         node = self.root
         while not node.is_leaf:
-            idx = self._find_insertion_index(node.keys, key)
-            node = node.children[idx]
+            node = node.children[bisect_right(node.keys, key)]
         return node
     
     def _find_insertion_index(self, keys: List[Any], key: Any) -> int:
         """Find the index where a key should be inserted in a sorted list."""
-        for i, k in enumerate(keys):
-            if key < k:
-                return i
-        return len(keys)
+        return bisect_right(keys, key)
     
     def _split_node(self, node: BPlusTreeNode):
         """Split a node that has exceeded the maximum number of keys."""
@@ -211,43 +365,55 @@ class BPlusTree:
         new_node = BPlusTreeNode(is_leaf=node.is_leaf)
         
         # Split keys and values/children
-        new_node.keys = node.keys[mid:]
-        node.keys = node.keys[:mid]
-        
         if node.is_leaf:
+            new_node.keys = node.keys[mid:]
+            node.keys = node.keys[:mid]
             new_node.values = node.values[mid:]
             node.values = node.values[:mid]
             new_node.next = node.next
             node.next = new_node
+            separator = new_node.keys[0]
         else:
-            new_node.children = node.children[mid:]
-            node.children = node.children[:mid]
+            # The middle key moves up to the parent and keeps one more child
+            # than keys on each side
+            separator = node.keys[mid]
+            new_node.keys = node.keys[mid + 1:]
+            node.keys = node.keys[:mid]
+            new_node.children = node.children[mid + 1:]
+            node.children = node.children[:mid + 1]
             for child in new_node.children:
                 child.parent = new_node
         
         # Update parent
         if node == self.root:
             self.root = BPlusTreeNode(is_leaf=False)
-            self.root.keys = [new_node.keys[0]]
+            self.root.keys = [separator]
             self.root.children = [node, new_node]
             node.parent = self.root
             new_node.parent = self.root
         else:
             parent = node.parent
-            idx = parent.children.index(node)
-            parent.keys.insert(idx, new_node.keys[0])
+            # The node is non-empty, so its first key locates it in the parent
+            idx = bisect_right(parent.keys, node.keys[0])
+            parent.keys.insert(idx, separator)
             parent.children.insert(idx + 1, new_node)
             new_node.parent = parent
             
             if len(parent.keys) > self.max_keys:
                 self._split_node(parent)
     
-    def _handle_underflow(self, node: BPlusTreeNode):
-        """Handle a node that has fallen below the minimum number of keys."""
+    def _handle_underflow(self, node: BPlusTreeNode, key: Any):
+        """
+        Handle a node that has fallen below the minimum number of keys.
+        
+        The node lies on the search path of the deleted key, whose
+        separators in the ancestors are left unchanged, so the key locates
+        the node in its parent even when the node is empty.
+        """
         self._performance_metrics['merges'] += 1
         
         parent = node.parent
-        idx = parent.children.index(node)
+        idx = bisect_right(parent.keys, key)
         
         # Try to borrow from left sibling
         if idx > 0:
@@ -265,9 +431,9 @@ class BPlusTree:
         
         # Merge with sibling
         if idx > 0:
-            self._merge_nodes(parent.children[idx - 1], node, parent, idx)
+            self._merge_nodes(parent.children[idx - 1], node, parent, idx, key)
         else:
-            self._merge_nodes(node, parent.children[idx + 1], parent, idx + 1)
+            self._merge_nodes(node, parent.children[idx + 1], parent, idx + 1, key)
     
     def _borrow_from_left(self, node: BPlusTreeNode, left_sibling: BPlusTreeNode, 
                          parent: BPlusTreeNode, idx: int):
@@ -295,9 +461,12 @@ class BPlusTree:
             node.children.append(right_sibling.children.pop(0))
             node.children[-1].parent = node
     
-    def _merge_nodes(self, left: BPlusTreeNode, right: BPlusTreeNode, parent: BPlusTreeNode, idx: int):
-        """Merge two nodes."""
+    def _merge_nodes(self, left: BPlusTreeNode, right: BPlusTreeNode, parent: BPlusTreeNode,
+                     idx: int, key: Any):
+        """Merge two nodes; key is the deleted key that caused the underflow."""
         if left.is_leaf:
+            # The separator of a leaf is a copy of a key and is dropped
+            parent.keys.pop(idx - 1)
             left.keys.extend(right.keys)
             left.values.extend(right.values)
             left.next = right.next
@@ -314,7 +483,10 @@ class BPlusTree:
             self.root = left
             left.parent = None
         elif len(parent.keys) < self.min_keys and parent != self.root:
-            self._handle_underflow(parent)
+            self._handle_underflow(parent, key)
+    
+    def __len__(self) -> int:
+        return self._size
     
     def get_performance_metrics(self) -> Dict:
         """Get current performance metrics."""
@@ -328,57 +500,124 @@ class BPlusTree:
         }
     
     def save_tree(self, filepath: str):
-        """Save the tree to a file."""
+        """
+        Save the tree to a binary snapshot file.
+        
+        The snapshot lists the pairs in key order, written iteratively along
+        the leaf chain. Keys and values are length-prefixed JSON records;
+        NumPy arrays in dictionary values (such as token arrays) are stored
+        as raw little-endian blocks after their record.
+        """
         try:
-            data = self._serialize_node(self.root)
-            with open(filepath, 'w') as f:
-                json.dump(data, f)
+            with open(filepath, 'wb') as f:
+                f.write(_SNAPSHOT_HEADER.pack(_SNAPSHOT_MAGIC, SNAPSHOT_FORMAT_VERSION, self._size))
+                for key, value in self.iter_all():
+                    f.write(self._encode_record(key, value))
             logger.info(f"Tree saved to {filepath}")
         except Exception as e:
             logger.error(f"Error saving tree: {str(e)}")
     
     def load_tree(self, filepath: str):
-        """Load the tree from a file."""
+        """
+        Load the tree from a file written by save_tree.
+        
+        The tree is rebuilt with bulk_load. Snapshots of the older nested
+        JSON format are still accepted.
+        """
         try:
-            with open(filepath, 'r') as f:
-                data = json.load(f)
-            self.root = self._deserialize_node(data)
+            with open(filepath, 'rb') as f:
+                data = f.read()
+            
+            if data[:len(_SNAPSHOT_MAGIC)] == _SNAPSHOT_MAGIC:
+                items = self._decode_snapshot(data)
+            else:
+                items = self._iter_json_leaves(json.loads(data))
+            
+            loaded = BPlusTree.bulk_load(items, order=self.order)
+            self.root = loaded.root
+            self._size = loaded._size
             logger.info(f"Tree loaded from {filepath}")
         except Exception as e:
             logger.error(f"Error loading tree: {str(e)}")
     
-    def _serialize_node(self, node: Optional[BPlusTreeNode]) -> Dict:
-        """Serialize a node to a dictionary."""
-        if node is None:
-            return None
+    @staticmethod
+    def _encode_record(key: Any, value: Any) -> bytes:
+        """Encode a (key, value) pair as a snapshot record."""
+        arrays = []
+        if isinstance(value, dict):
+            arrays = [(name, array) for name, array in value.items() if isinstance(array, np.ndarray)]
+            if arrays:
+                value = {name: item for name, item in value.items() if not isinstance(item, np.ndarray)}
         
-        return {
-            'keys': node.keys,
-            'values': node.values if node.is_leaf else None,
-            'is_leaf': node.is_leaf,
-            'children': [self._serialize_node(child) for child in node.children] 
-                       if not node.is_leaf else None
-        }
-    
-    def _deserialize_node(self, data: Dict) -> Optional[BPlusTreeNode]:
-        """Deserialize a dictionary to a node."""
-        if data is None:
-            return None
+        key_data = json.dumps(key).encode('utf-8')
+        value_data = json.dumps(value).encode('utf-8')
+        parts = [_RECORD_HEADER.pack(len(key_data), len(value_data), len(arrays)), key_data, value_data]
         
-        node = BPlusTreeNode(is_leaf=data['is_leaf'])
-        node.keys = data['keys']
-        node.values = data['values']
+        for name, array in arrays:
+            name_data = name.encode('utf-8')
+            stored_dtype = array.dtype
+            if array.dtype.kind in 'iu' and array.size:
+                # Token IDs are small, so integer arrays are stored in the
+                # narrowest type holding their values
+                stored_dtype = np.promote_types(np.min_scalar_type(array.min()),
+                                                np.min_scalar_type(array.max()))
+            stored_dtype = stored_dtype.newbyteorder('<') if stored_dtype.byteorder != '|' else stored_dtype
+            stored_data = stored_dtype.str.encode('ascii')
+            original_data = array.dtype.str.encode('ascii')
+            parts.append(_ARRAY_HEADER.pack(len(name_data), len(stored_data), len(original_data), array.size))
+            parts.append(name_data)
+            parts.append(stored_data)
+            parts.append(original_data)
+            parts.append(np.ascontiguousarray(array, dtype=stored_dtype).tobytes())
         
-        if not node.is_leaf:
-            node.children = [self._deserialize_node(child) for child in data['children']]
-            for child in node.children:
-                child.parent = node
+        return b''.join(parts)
+    
+    @staticmethod
+    def _decode_snapshot(data: bytes) -> Iterator[Tuple[Any, Any]]:
+        """Decode the (key, value) pairs of a binary snapshot."""
+        _, version, count = _SNAPSHOT_HEADER.unpack_from(data)
+        if version != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot format version {version}")
         
-        return node
+        offset = _SNAPSHOT_HEADER.size
+        for _ in range(count):
+            key_length, value_length, n_arrays = _RECORD_HEADER.unpack_from(data, offset)
+            offset += _RECORD_HEADER.size
+            key = json.loads(data[offset:offset + key_length])
+            offset += key_length
+            value = json.loads(data[offset:offset + value_length])
+            offset += value_length
+            
+            for _ in range(n_arrays):
+                name_length, stored_length, original_length, size = _ARRAY_HEADER.unpack_from(data, offset)
+                offset += _ARRAY_HEADER.size
+                name = data[offset:offset + name_length].decode('utf-8')
+                offset += name_length
+                stored_dtype = np.dtype(data[offset:offset + stored_length].decode('ascii'))
+                offset += stored_length
+                original_dtype = np.dtype(data[offset:offset + original_length].decode('ascii'))
+                offset += original_length
+                array = np.frombuffer(data, dtype=stored_dtype, count=size, offset=offset)
+                offset += size * stored_dtype.itemsize
+                value[name] = array.astype(original_dtype)
+            
+            yield key, value
+    
+    @staticmethod
+    def _iter_json_leaves(data: Optional[Dict]) -> Iterator[Tuple[Any, Any]]:
+        """Yield the (key, value) pairs of a nested JSON snapshot in key order."""
+        stack = [data] if data is not None else []
+        while stack:
+            node = stack.pop()
+            if node['is_leaf']:
+                yield from zip(node['keys'], node['values'])
+            else:
+                stack.extend(reversed(node['children']))
     
     def clear(self):
         """Clear the tree and reset metrics."""
         self.root = None
+        self._size = 0
         self._performance_metrics = {
             'insertions': 0,
             'deletions': 0,
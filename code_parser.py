@@ -1,16 +1,110 @@
 import re
-from typing import List, Dict, Optional
+from typing import Dict, Iterable, Iterator, List, Optional
 import os
 from pathlib import Path
 import logging
 from datetime import datetime
+import numpy as np
+from token_vocabulary import TokenVocabulary
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Words and single punctuation characters
+_TOKEN_PATTERN = re.compile(r'\w+|[^\w\s]')
+
+# Characters opening a string literal
+_QUOTES = '"\'`'
+
+_C_COMMENTS = [r'//[^\n]*', r'/\*[\s\S]*?\*/']
+_QUOTED_STRINGS = [r'"(?:[^"\\\n]|\\[\s\S])*"', r"'(?:[^'\\\n]|\\[\s\S])*'"]
+_PYTHON_TRIPLE_QUOTED = [r'"""[\s\S]*?"""', r"'''[\s\S]*?'''"]
+_TEMPLATE_STRING = r'`(?:[^`\\]|\\[\s\S])*`'
+
+# Comment and string syntax per language: comments that must start a line,
+# comments anywhere, and string literals. A Python triple-quoted string
+# starting a line is a docstring (or another unused expression) and skipped
+# like a comment; elsewhere it is a string literal.
+_LANGUAGE_SYNTAX = {
+    '.py': (_PYTHON_TRIPLE_QUOTED, [r'#[^\n]*'], _PYTHON_TRIPLE_QUOTED + _QUOTED_STRINGS),
+    '.java': ([], _C_COMMENTS, _QUOTED_STRINGS),
+    '.cpp': ([], _C_COMMENTS, _QUOTED_STRINGS),
+    '.c': ([], _C_COMMENTS, _QUOTED_STRINGS),
+    '.h': ([], _C_COMMENTS, _QUOTED_STRINGS),
+    '.js': ([], _C_COMMENTS, _QUOTED_STRINGS + [_TEMPLATE_STRING]),
+    '.ts': ([], _C_COMMENTS, _QUOTED_STRINGS + [_TEMPLATE_STRING]),
+    '.rb': ([r'=begin\b[\s\S]*?\n=end\b[^\n]*'], [r'#[^\n]*'], _QUOTED_STRINGS)
+}
+
+# Unterminated form of every comment or string that can continue past the
+# end of a line: it runs to the end of the text. The streaming scanner
+# matches it as a token right after the complete form, so a construct that
+# is closed in a later chunk is recognized and carried over.
+_UNTERMINATED = {
+    _C_COMMENTS[1]: r'/\*[\s\S]*\Z',
+    _PYTHON_TRIPLE_QUOTED[0]: r'"""[\s\S]*\Z',
+    _PYTHON_TRIPLE_QUOTED[1]: r"'''[\s\S]*\Z",
+    _QUOTED_STRINGS[0]: r'"(?:[^"\\\n]|\\[\s\S])*\Z',
+    _QUOTED_STRINGS[1]: r"'(?:[^'\\\n]|\\[\s\S])*\Z",
+    _TEMPLATE_STRING: r'`(?:[^`\\]|\\[\s\S])*\Z'
+}
+
+# Line-start comments whose end is not in the text; they cannot be matched
+# as tokens because the scanner skips indentation before tokens
+_UNTERMINATED_LINE_START = {
+    '.rb': re.compile(r'(?:\A|(?<=\n))[ \t]*=begin\b(?![\s\S]*?\n=end\b)')
+}
+
+# Characters of text read per chunk when streaming a file
+STREAM_CHUNK_SIZE = 1 << 20
+
+def _build_scanner(line_start_comments: List[str], comments: List[str],
+                   strings: List[str], streaming: bool = False) -> 're.Pattern':
+    """
+    Compile the single-pass scanner of a language.
+    
+    Every match skips the whitespace before it and is a comment (no group)
+    or a token (group 1): a word, a whole string literal or a punctuation
+    character. Line-start comments are tried first, at the beginning of the
+    text or after a newline.
+    
+    The streaming scanner additionally matches unterminated multi-line
+    comments and strings as tokens, each after its complete form.
+    """
+    if streaming:
+        strings = [form for string in strings for form in (string, _UNTERMINATED.get(string)) if form]
+        strings += [_UNTERMINATED[comment] for comment in comments if comment in _UNTERMINATED]
+    token = '|'.join([r'\w+'] + strings + [r'[^\w\s]'])
+    pattern = r'\s*(?:' + '|'.join(comments + [f'({token})']) + ')'
+    if line_start_comments:
+        pattern = r'(?:\A|\s*(?<=\n))[ \t]*(?:' + '|'.join(line_start_comments) + ')|' + pattern
+    return re.compile(pattern)
+
+_SCANNERS = {ext: _build_scanner(*syntax) for ext, syntax in _LANGUAGE_SYNTAX.items()}
+_STREAMING_SCANNERS = {ext: _build_scanner(*syntax, streaming=True)
+                       for ext, syntax in _LANGUAGE_SYNTAX.items()}
+
 class CodeParser:
-    def __init__(self):
+    # Bump whenever tokenization changes so cached token arrays are invalidated
+    PARSER_VERSION = 2
+    
+    def __init__(self, vocabulary: Optional[TokenVocabulary] = None,
+                 stream_threshold: int = 8 << 20, max_pending: int = 16 << 20):
+        """
+        Initialize the parser.
+        
+        Args:
+            vocabulary: Shared token vocabulary; a new one is created if omitted
+            stream_threshold: Files larger than this many bytes are tokenized
+                chunk by chunk by parse_file instead of being read whole
+            max_pending: Most characters held back while streaming, waiting
+                for the end of a comment, string or line
+        """
+        self.vocabulary = vocabulary if vocabulary is not None else TokenVocabulary()
+        self.stream_threshold = stream_threshold
+        self.max_pending = max_pending
+        
         # Common programming language keywords to preserve
         self.keywords = {
             # Python
@@ -29,58 +123,17 @@ class CodeParser:
             'default', 'extends', 'implements', 'interface', 'type', 'enum'
         }
         
-        # Language-specific comment patterns
-        self.comment_patterns = {
-            '.py': {
-                'single_line': r'#.*?$',
-                'multi_line': r'""".*?"""|\'\'\'.*?\'\'\''
-            },
-            '.java': {
-                'single_line': r'//.*?$',
-                'multi_line': r'/\*.*?\*/'
-            },
-            '.cpp': {
-                'single_line': r'//.*?$',
-                'multi_line': r'/\*.*?\*/'
-            },
-            '.c': {
-                'single_line': r'//.*?$',
-                'multi_line': r'/\*.*?\*/'
-            },
-            '.h': {
-                'single_line': r'//.*?$',
-                'multi_line': r'/\*.*?\*/'
-            },
-            '.js': {
-                'single_line': r'//.*?$',
-                'multi_line': r'/\*.*?\*/'
-            },
-            '.ts': {
-                'single_line': r'//.*?$',
-                'multi_line': r'/\*.*?\*/'
-            },
-            '.rb': {
-                'single_line': r'#.*?$',
-                'multi_line': r'=begin.*?=end'
-            }
-        }
-        
-        # Language-specific token patterns
-        self.token_patterns = {
-            '.py': r'\b\w+\b|[^\w\s]',
-            '.java': r'\b\w+\b|[^\w\s]',
-            '.cpp': r'\b\w+\b|[^\w\s]',
-            '.c': r'\b\w+\b|[^\w\s]',
-            '.h': r'\b\w+\b|[^\w\s]',
-            '.js': r'\b\w+\b|[^\w\s]',
-            '.ts': r'\b\w+\b|[^\w\s]',
-            '.rb': r'\b\w+\b|[^\w\s]'
-        }
+        # Precompiled single-pass scanner of every supported language
+        self.scanners = _SCANNERS
     
-    def parse_file(self, file_path: str) -> Optional[List[str]]:
+    def parse_file(self, file_path: str) -> Optional[np.ndarray]:
         """
-        Parse a code file and return a list of tokens.
+        Parse a code file and return its tokens as a uint32 array of token IDs.
         Handles comments, whitespace, and preserves important keywords.
+        Use vocabulary.decode() to turn the IDs back into tokens.
+        Files above stream_threshold are tokenized chunk by chunk, but the
+        returned array still holds every token; use stream_file() to
+        consume the token blocks lazily.
         """
         try:
             # Validate file exists and is readable
@@ -94,45 +147,161 @@ class CodeParser:
             
             # Get file extension
             ext = os.path.splitext(file_path)[1].lower()
-            if ext not in self.comment_patterns:
+            if ext not in self.scanners:
                 logger.warning(f"Unsupported file type: {ext}")
                 return None
             
+            # Large files are tokenized chunk by chunk, so neither their
+            # whole text nor its list of token strings is held in memory
+            if os.path.getsize(file_path) > self.stream_threshold:
+                blocks = list(self.stream_file(file_path))
+                return np.concatenate(blocks) if blocks else self.vocabulary.encode([])
+            
             # Read file content
             with open(file_path, 'r', encoding='utf-8') as f:
                 content = f.read()
             
-            # Remove comments based on file type
-            content = self._remove_comments(content, ext)
-            
-            # Tokenize the code
-            tokens = self._tokenize(content, ext)
-            
-            return tokens
+            return self.parse_source(content, ext)
             
         except Exception as e:
             logger.error(f"Error parsing file {file_path}: {str(e)}")
             return None
     
-    def _remove_comments(self, content: str, file_ext: str) -> str:
-        """Remove both single-line and multi-line comments based on file type."""
-        patterns = self.comment_patterns[file_ext]
-        
-        # Remove multi-line comments
-        content = re.sub(patterns['multi_line'], '', content, flags=re.DOTALL)
-        # Remove single-line comments
-        content = re.sub(patterns['single_line'], '', content, flags=re.MULTILINE)
-        return content
+    def parse_source(self, content: str, file_ext: str) -> Optional[np.ndarray]:
+        """
+        Parse source code text and return its tokens as a uint32 array of token IDs.
+        
+        Args:
+            content: Source code text
+            file_ext: File extension selecting the language, e.g. '.py'
+        
+        Returns:
+            Array of token IDs, or None if the language is not supported
+        """
+        ext = file_ext.lower()
+        if ext not in self.scanners:
+            logger.warning(f"Unsupported file type: {ext}")
+            return None
+        
+        return self._scan(content, ext)
     
-    def _tokenize(self, content: str, file_ext: str) -> List[str]:
-        """Convert code into a list of tokens based on file type."""
-        pattern = self.token_patterns[file_ext]
-        tokens = re.findall(pattern, content)
+    def stream_file(self, file_path: str, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[np.ndarray]:
+        """
+        Tokenize a code file lazily, reading it in chunks.
         
-        # Filter out empty tokens and normalize
-        tokens = [t.lower() for t in tokens if t.strip()]
+        Args:
+            file_path: Path of the source file
+            chunk_size: Number of characters read at a time
+        
+        Yields:
+            uint32 arrays of token IDs; concatenated they equal parse_file()
+        """
+        ext = os.path.splitext(file_path)[1].lower()
+        if ext not in self.scanners:
+            logger.warning(f"Unsupported file type: {ext}")
+            return
         
-        return tokens
+        with open(file_path, 'r', encoding='utf-8') as f:
+            yield from self.stream_source(iter(lambda: f.read(chunk_size), ''), ext)
+    
+    def stream_source(self, chunks: Iterable[str], file_ext: str) -> Iterator[np.ndarray]:
+        """
+        Tokenize source code text lazily, one chunk of text at a time.
+        
+        Every chunk is scanned up to its last newline, so no word or line
+        comment is cut. A comment or string still open at that point is
+        matched by its unterminated form and carried over with the rest of
+        the line, to be scanned again together with the next chunk. Memory
+        therefore stays bounded by the chunk size plus the longest comment,
+        string or line, and the tokens equal those of parse_source(). Only
+        if one of those grows beyond max_pending characters is it tokenized
+        as code at the point it was cut.
+        
+        Args:
+            chunks: Consecutive pieces of the source text
+            file_ext: File extension selecting the language, e.g. '.py'
+        
+        Yields:
+            uint32 arrays of token IDs, one per scanned chunk
+        """
+        ext = file_ext.lower()
+        if ext not in self.scanners:
+            logger.warning(f"Unsupported file type: {ext}")
+            return
+        
+        scanner = _STREAMING_SCANNERS[ext]
+        line_start = _UNTERMINATED_LINE_START.get(ext)
+        # Unscanned text starts at buffer[start]; the character before it is
+        # kept so that the scanner can tell whether it starts a line
+        buffer = ''
+        start = 0
+        for chunk in chunks:
+            buffer += chunk.lower()
+            end = buffer.rfind('\n') + 1
+            if end > start:
+                stop = end
+                if line_start is not None:
+                    match = line_start.search(buffer, start, end)
+                    if match:
+                        stop = match.start()
+                
+                matches = scanner.findall(buffer, start, stop)
+                if matches and matches[-1].endswith('\n'):
+                    # An open comment or string: carry it over, with its
+                    # indentation, which decides about line-start comments
+                    stop -= len(matches.pop())
+                    while stop > start and buffer[stop - 1] in ' \t':
+                        stop -= 1
+                if len(buffer) - stop >= self.max_pending:
+                    matches = self.scanners[ext].findall(buffer, start, end)
+                    stop = end
+            elif len(buffer) - start >= self.max_pending:
+                # A line too long to wait for its end is cut after a blank
+                stop = max(buffer.rfind(' '), buffer.rfind('\t')) + 1
+                if stop <= start:
+                    stop = len(buffer)
+                matches = self.scanners[ext].findall(buffer, start, stop)
+            else:
+                continue
+            
+            if stop > start:
+                tokens = self._encode(matches)
+                if len(tokens):
+                    yield tokens
+                buffer = buffer[stop - 1:]
+                start = 1
+        
+        if len(buffer) > start:
+            tokens = self._encode(self.scanners[ext].findall(buffer, start))
+            if len(tokens):
+                yield tokens
+    
+    def _scan(self, content: str, file_ext: str) -> np.ndarray:
+        """Tokenize code in one pass of the language's scanner."""
+        return self._encode(self.scanners[file_ext].findall(content.lower()))
+    
+    def _encode(self, matches: List[str]) -> np.ndarray:
+        """
+        Turn the matches of a scanner into token IDs.
+        
+        Comments match the scanner without a token and are dropped. String
+        literals are matched whole, so comment markers inside them are kept,
+        and are then split into the same word and punctuation tokens as code.
+        The text is lowercased once up front instead of token by token.
+        """
+        split_string = _TOKEN_PATTERN.findall
+        tokens = []
+        append = tokens.append
+        
+        for token in matches:
+            if not token:
+                continue
+            if len(token) > 1 and token[0] in _QUOTES:
+                tokens.extend(split_string(token))
+            else:
+                append(token)
+        
+        return self.vocabulary.encode(tokens)
     
     def get_metadata(self, file_path: str) -> Dict:
         """Extract metadata from the file path."""
@@ -154,6 +323,18 @@ class CodeParser:
                 'error': str(e)
             }
     
+    def get_content_metadata(self, file_name: str, content: bytes) -> Dict:
+        """Build metadata for source received as bytes rather than read from disk."""
+        now = datetime.now().isoformat()
+        return {
+            'file_name': os.path.basename(file_name),
+            'file_path': None,
+            'file_size': len(content),
+            'created_time': now,
+            'modified_time': now,
+            'language': self._detect_language(file_name)
+        }
+    
     def _detect_language(self, file_path: str) -> str:
         """Detect programming language based on file extension."""
         ext = os.path.splitext(file_path)[1].lower()
@@ -0,0 +1,135 @@
+from typing import Dict, Iterable, List, Set
+import logging
+import time
+from collections import defaultdict
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class FingerprintIndex:
+    def __init__(self):
+        """
+        Initialize an inverted index from k-gram fingerprints to submissions.
+        
+        Each stored submission contributes its winnowed fingerprints to the
+        posting lists. A query probes the index with the hashes of a new
+        submission and only the submissions that share at least one
+        fingerprint are returned as candidates.
+        """
+        self.postings: Dict[int, Set[str]] = defaultdict(set)
+        self._fingerprints: Dict[str, Set[int]] = {}
+        self._performance_metrics = {
+            'documents': 0,
+            'queries': 0,
+            'postings_scanned': 0,
+            'candidates_returned': 0,
+            'processing_time': 0
+        }
+    
+    def add(self, doc_id: str, fingerprints: Iterable[int]):
+        """
+        Add a submission's fingerprints to the index.
+        
+        Args:
+            doc_id: Unique identifier of the submission
+            fingerprints: Winnowed fingerprint hashes of the submission
+        """
+        if doc_id in self._fingerprints:
+            self.remove(doc_id)
+        
+        fingerprint_set = set(fingerprints)
+        for value in fingerprint_set:
+            self.postings[value].add(doc_id)
+        
+        self._fingerprints[doc_id] = fingerprint_set
+        self._performance_metrics['documents'] += 1
+    
+    def remove(self, doc_id: str) -> bool:
+        """
+        Remove a submission and its posting list entries from the index.
+        
+        Args:
+            doc_id: Identifier of the submission to remove
+        
+        Returns:
+            bool: True if the submission was indexed
+        """
+        fingerprint_set = self._fingerprints.pop(doc_id, None)
+        if fingerprint_set is None:
+            return False
+        
+        for value in fingerprint_set:
+            posting = self.postings.get(value)
+            if posting is not None:
+                posting.discard(doc_id)
+                if not posting:
+                    del self.postings[value]
+        
+        self._performance_metrics['documents'] -= 1
+        return True
+    
+    def candidates(self, hashes: Iterable[int]) -> Dict[str, int]:
+        """
+        Find indexed submissions that share fingerprints with a query.
+        
+        Args:
+            hashes: k-gram hashes of the query submission
+        
+        Returns:
+            Dictionary mapping candidate submission IDs to the number of
+            their fingerprints found in the query
+        """
+        start_time = time.time()
+        counts: Dict[str, int] = defaultdict(int)
+        scanned = 0
+        
+        for value in set(hashes):
+            posting = self.postings.get(value)
+            if posting:
+                scanned += len(posting)
+                for doc_id in posting:
+                    counts[doc_id] += 1
+        
+        self._performance_metrics['queries'] += 1
+        self._performance_metrics['postings_scanned'] += scanned
+        self._performance_metrics['candidates_returned'] += len(counts)
+        self._performance_metrics['processing_time'] += time.time() - start_time
+        return dict(counts)
+    
+    def get_fingerprints(self, doc_id: str) -> Set[int]:
+        """Get the fingerprint set stored for a submission."""
+        return self._fingerprints.get(doc_id, set())
+    
+    def document_ids(self) -> List[str]:
+        """Get the IDs of all indexed submissions."""
+        return list(self._fingerprints)
+    
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._fingerprints
+    
+    def __len__(self) -> int:
+        return len(self._fingerprints)
+    
+    def get_performance_metrics(self) -> Dict:
+        """Get current performance metrics."""
+        return {
+            'documents': self._performance_metrics['documents'],
+            'distinct_fingerprints': len(self.postings),
+            'queries': self._performance_metrics['queries'],
+            'postings_scanned': self._performance_metrics['postings_scanned'],
+            'candidates_returned': self._performance_metrics['candidates_returned'],
+            'processing_time': self._performance_metrics['processing_time']
+        }
+    
+    def clear(self):
+        """Clear the index and reset metrics."""
+        self.postings.clear()
+        self._fingerprints.clear()
+        self._performance_metrics = {
+            'documents': 0,
+            'queries': 0,
+            'postings_scanned': 0,
+            'candidates_returned': 0,
+            'processing_time': 0
+        }
@@ -0,0 +1,193 @@
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import logging
+import time
+import numpy as np
+from suffix_array import SuffixArray
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# A shared fragment: (token IDs, sorted owner IDs, (owner ID, start) occurrences)
+Fragment = Tuple[np.ndarray, List[str], List[Tuple[str, int]]]
+
+class FragmentIndex:
+    def __init__(self, documents: Iterable[Tuple[str, np.ndarray]], window_size: int = 5):
+        """
+        Build a generalized suffix array over the token streams of many submissions.
+        
+        All token arrays are concatenated with a distinct separator after
+        each one, so no common prefix of two suffixes runs from one
+        submission into the next. Shared fragments and pairwise shared
+        k-gram counts of the whole corpus are then read from the suffix
+        array and LCP array in one pass, instead of comparing every pair.
+        
+        Args:
+            documents: (submission ID, token ID array) pairs
+            window_size: k-gram length counted by shared_kgram_counts and
+                default minimum fragment length
+        """
+        start_time = time.time()
+        self.window_size = window_size
+        self.doc_ids: List[str] = []
+        arrays = []
+        for doc_id, tokens in documents:
+            self.doc_ids.append(doc_id)
+            arrays.append(np.asarray(tokens, dtype=np.int64))
+        
+        n_docs = len(arrays)
+        lengths = np.array([len(array) for array in arrays], dtype=np.int64)
+        total = int(lengths.sum()) + n_docs
+        
+        # Token values are shifted above the document count so that the
+        # separator after document d can be the value d, which occurs once
+        values = np.empty(total, dtype=np.int64)
+        self._doc_of = np.empty(total, dtype=np.int64)
+        self._remaining = np.empty(total, dtype=np.int64)  # tokens left in the document
+        self._starts = np.empty(n_docs, dtype=np.int64)
+        position = 0
+        for doc, array in enumerate(arrays):
+            end = position + len(array)
+            self._starts[doc] = position
+            values[position:end] = array + n_docs
+            values[end] = doc
+            self._doc_of[position:end + 1] = doc
+            self._remaining[position:end + 1] = np.arange(len(array), -1, -1)
+            position = end + 1
+        
+        self._lengths = lengths
+        self._doc_index = {doc_id: doc for doc, doc_id in enumerate(self.doc_ids)}
+        self._offset = n_docs
+        self.suffix_array = SuffixArray(values)
+        self._performance_metrics = {
+            'documents': n_docs,
+            'tokens': int(lengths.sum()),
+            'build_time': time.time() - start_time
+        }
+    
+    def kgram_count(self, doc_id: str) -> int:
+        """Get the number of k-gram positions of a submission."""
+        return max(int(self._lengths[self._doc_index[doc_id]]) - self.window_size + 1, 0)
+    
+    def shared_kgram_counts(self, max_owners: Optional[int] = None) -> Dict[Tuple[str, str], Tuple[int, int]]:
+        """
+        Count the k-gram positions every pair of submissions has in common.
+        
+        Suffixes starting with the same k-gram are adjacent in the suffix
+        array, separated by LCP values below k, so one scan groups all
+        occurrences of every k-gram. Each group contributes its occurrence
+        counts to every pair of its owners.
+        
+        Args:
+            max_owners: Skip k-grams shared by more submissions than this
+                (e.g. boilerplate), which would otherwise add to a
+                quadratic number of pairs; None counts all of them
+        
+        Returns:
+            Dictionary mapping (first ID, second ID) pairs, in corpus order,
+            to the number of k-gram positions of the first whose k-gram
+            occurs in the second and vice versa
+        """
+        start_time = time.time()
+        k = self.window_size
+        sa, lcp = self.suffix_array.sa, self.suffix_array.lcp
+        counts: Dict[Tuple[str, str], Tuple[int, int]] = {}
+        if len(sa) == 0:
+            return counts
+        
+        group = np.cumsum(lcp < k)
+        # Suffixes with fewer than k tokens left hit a separator and are
+        # in singleton groups anyway
+        valid = self._remaining[sa] >= k
+        group, doc = group[valid], self._doc_of[sa[valid]]
+        
+        n_docs = len(self.doc_ids)
+        keys, occurrences = np.unique(group * n_docs + doc, return_counts=True)
+        key_groups = keys // n_docs
+        # Runs of keys belonging to the same k-gram
+        boundaries = np.flatnonzero(np.diff(key_groups)) + 1
+        run_starts = np.concatenate(([0], boundaries))
+        run_ends = np.concatenate((boundaries, [len(keys)]))
+        owners_per_run = run_ends - run_starts
+        shared = owners_per_run >= 2
+        if max_owners is not None:
+            shared &= owners_per_run <= max_owners
+        
+        key_docs = (keys % n_docs).tolist()
+        occurrences = occurrences.tolist()
+        for start, end in zip(run_starts[shared].tolist(), run_ends[shared].tolist()):
+            for i in range(start, end):
+                for j in range(i + 1, end):
+                    pair = (key_docs[i], key_docs[j])
+                    first, second = counts.get(pair, (0, 0))
+                    counts[pair] = (first + occurrences[i], second + occurrences[j])
+        
+        result = {(self.doc_ids[a], self.doc_ids[b]): value for (a, b), value in counts.items()}
+        self._performance_metrics['count_time'] = time.time() - start_time
+        return result
+    
+    def shared_fragments(self, min_length: Optional[int] = None) -> Iterator[Fragment]:
+        """
+        List the fragments that occur in more than one submission.
+        
+        The LCP intervals of the suffix array are traversed bottom-up with a
+        stack in one pass. Every interval is a fragment that cannot be
+        extended to the right without losing an occurrence; intervals whose
+        occurrences are all preceded by the same token are skipped, so only
+        maximal fragments are listed. Fragments whose occurrences belong to
+        a single submission are skipped too.
+        
+        Args:
+            min_length: Minimum fragment length (defaults to window_size)
+        
+        Yields:
+            Tuples of (token IDs, sorted owner IDs, list of (owner ID,
+            start offset in the owner) occurrences)
+        """
+        if min_length is None:
+            min_length = self.window_size
+        sa, lcp = self.suffix_array.sa, self.suffix_array.lcp
+        n = len(sa)
+        
+        # Stack of (LCP value, left bound) of the open intervals
+        stack = [(0, 0)]
+        for i in range(1, n + 1):
+            current = int(lcp[i]) if i < n else 0
+            left = i - 1
+            while current < stack[-1][0]:
+                length, left = stack.pop()
+                if length >= min_length:
+                    fragment = self._fragment(length, left, i)
+                    if fragment is not None:
+                        yield fragment
+            if current > stack[-1][0]:
+                stack.append((current, left))
+    
+    def _fragment(self, length: int, left: int, right: int) -> Optional[Fragment]:
+        """Build the fragment of the LCP interval sa[left:right], or None if it is not reported."""
+        positions = self.suffix_array.sa[left:right]
+        docs = self._doc_of[positions]
+        if np.all(docs == docs[0]):
+            return None
+        
+        # Extendable to the left: a suffix of a longer fragment. Separators
+        # are unique, so occurrences at document starts never agree.
+        previous = self.suffix_array.values[positions - 1]
+        if np.all(positions > 0) and np.all(previous == previous[0]):
+            return None
+        
+        occurrences = sorted((self.doc_ids[doc], int(position - self._starts[doc]))
+                             for doc, position in zip(docs.tolist(), positions.tolist()))
+        owners = sorted({doc_id for doc_id, _ in occurrences})
+        start = positions[0]
+        tokens = self.suffix_array.values[start:start + length] - self._offset
+        return tokens.astype(np.uint32), owners, occurrences
+    
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+    
+    def get_performance_metrics(self) -> Dict:
+        """Get current performance metrics."""
+        metrics = dict(self._performance_metrics)
+        metrics['suffix_array_time'] = self.suffix_array.get_performance_metrics()['build_time']
+        return metrics
@@ -0,0 +1,226 @@
+from typing import Dict, List, Optional, Tuple
+import heapq
+import logging
+import time
+import numpy as np
+from suffix_array import SuffixArray
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# A tile: (start in the first sequence, start in the second, length)
+Tile = Tuple[int, int, int]
+
+class GreedyStringTiling:
+    def __init__(self, min_match_length: int = 8):
+        """
+        Initialize the Greedy String Tiling comparison engine.
+        
+        Greedy String Tiling repeatedly finds the longest common substrings
+        of two token sequences that do not overlap tokens already covered,
+        and marks them as tiles until no match of at least min_match_length
+        tokens is left. Reordered blocks and partial copies are therefore
+        found, unlike with whole-file window matching.
+        
+        The maximal matches are read from one suffix array and LCP array
+        over both sequences, built once per pair, instead of the Karp-Rabin
+        hash table of Running-Karp-Rabin GST. Match lengths are visited in
+        decreasing order: at length L, the suffixes sharing a prefix of at
+        least L form groups of adjacent suffix array entries (merged with a
+        union-find as L decreases), and any two group members from different
+        sequences with L uncovered tokens ahead of them form a tile. Marking
+        a tile only shortens the uncovered runs of the L - 1 tokens before
+        it, so after the O(n log n) suffix array the tiling costs at most
+        O(n log^2 n), from merging the groups' heaps smaller into larger.
+        The 'rounds' metric counts the distinct tile lengths.
+        
+        Args:
+            min_match_length: Minimum number of tokens in a tile
+        """
+        if min_match_length < 1:
+            raise ValueError("min_match_length must be at least 1")
+        
+        self.min_match_length = min_match_length
+        self._performance_metrics = {
+            'comparisons': 0,
+            'rounds': 0,
+            'tiles': 0,
+            'processing_time': 0
+        }
+    
+    def tiles(self, first: np.ndarray, second: np.ndarray) -> List[Tile]:
+        """
+        Find the tiles covering two token sequences.
+        
+        Args:
+            first: Integer token array
+            second: Integer token array
+        
+        Returns:
+            List of (start in first, start in second, length) tuples,
+            sorted by their start in first
+        """
+        start_time = time.time()
+        first = np.asarray(first, dtype=np.int64)
+        second = np.asarray(second, dtype=np.int64)
+        n_first, n_second = len(first), len(second)
+        self._performance_metrics['comparisons'] += 1
+        
+        tiles: List[Tile] = []
+        if min(n_first, n_second) < self.min_match_length:
+            return tiles
+        
+        # first, a separator and second in one sequence. Token values are
+        # shifted above the separator, which therefore occurs only once.
+        total = n_first + 1 + n_second
+        values = np.empty(total, dtype=np.int64)
+        values[:n_first] = first + total
+        values[n_first] = n_first
+        values[n_first + 1:] = second + total
+        suffix_array = SuffixArray(values)
+        sa, lcp = suffix_array.sa, suffix_array.lcp
+        
+        top = int(lcp.max())
+        if top < self.min_match_length:
+            return self._finish(tiles, start_time)
+        
+        # Neighbouring suffix array entries to merge at each common prefix length
+        merges: List[List[int]] = [[] for _ in range(top + 1)]
+        for i in np.flatnonzero(lcp >= self.min_match_length).tolist():
+            merges[lcp[i]].append(i)
+        
+        # free[p]: uncovered tokens from p to the end of its sequence (capped
+        # at top). A position takes part in matches of length free[p] and
+        # below, so it is activated when the length reaches free[p].
+        positions = np.arange(total)
+        free = np.minimum(np.where(positions < n_first, n_first - positions, total - positions), top)
+        free[n_first] = 0
+        pending: List[List[int]] = [[] for _ in range(top + 1)]
+        for p in np.flatnonzero(free >= self.min_match_length).tolist():
+            pending[free[p]].append(p)
+        free = free.tolist()
+        sa = sa.tolist()
+        
+        covered = [False] * total
+        covered[n_first] = True
+        active = [False] * total
+        parent = list(range(total))
+        # Active members of each group, per sequence, as min-heaps
+        # (entries of deactivated positions are skipped lazily)
+        heaps: Dict[int, Tuple[List[int], List[int]]] = {}
+        
+        def find(p: int) -> int:
+            while parent[p] != p:
+                parent[p] = parent[parent[p]]
+                p = parent[p]
+            return p
+        
+        def group_heaps(root: int) -> Tuple[List[int], List[int]]:
+            if root not in heaps:
+                heaps[root] = ([], [])
+            return heaps[root]
+        
+        def pop_active(heap: List[int]) -> Optional[int]:
+            while heap and not active[heap[0]]:
+                heapq.heappop(heap)
+            return heapq.heappop(heap) if heap else None
+        
+        def cover(start: int, length: int):
+            for p in range(start, start + length):
+                covered[p] = True
+                active[p] = False
+                free[p] = 0
+            # The tokens just before the tile now run into it
+            for p in range(start - 1, max(start - length, -1), -1):
+                if covered[p]:
+                    break
+                shorter = start - p
+                if shorter < free[p]:
+                    free[p] = shorter
+                    active[p] = False
+                    if shorter >= self.min_match_length:
+                        pending[shorter].append(p)
+        
+        for length in range(top, self.min_match_length - 1, -1):
+            touched = []
+            for i in merges[length]:
+                root_a, root_b = find(sa[i - 1]), find(sa[i])
+                if root_a == root_b:
+                    continue
+                heaps_a, heaps_b = heaps.pop(root_a, ([], [])), heaps.pop(root_b, ([], []))
+                if len(heaps_a[0]) + len(heaps_a[1]) < len(heaps_b[0]) + len(heaps_b[1]):
+                    root_a, root_b, heaps_a, heaps_b = root_b, root_a, heaps_b, heaps_a
+                parent[root_b] = root_a
+                for kept, merged in zip(heaps_a, heaps_b):
+                    for p in merged:
+                        heapq.heappush(kept, p)
+                heaps[root_a] = heaps_a
+                touched.append(root_a)
+            
+            for p in pending[length]:
+                if not covered[p] and not active[p] and free[p] == length:
+                    active[p] = True
+                    root = find(p)
+                    heapq.heappush(group_heaps(root)[0 if p < n_first else 1], p)
+                    touched.append(root)
+            pending[length] = []
+            
+            # Groups that were not touched have no active members in both
+            # sequences, or they would have been tiled at a longer length
+            found = False
+            for root in touched:
+                first_heap, second_heap = group_heaps(find(root))
+                while True:
+                    a = pop_active(first_heap)
+                    if a is None:
+                        break
+                    b = pop_active(second_heap)
+                    if b is None:
+                        heapq.heappush(first_heap, a)
+                        break
+                    cover(a, length)
+                    cover(b, length)
+                    tiles.append((a, b - n_first - 1, length))
+                    found = True
+            if found:
+                self._performance_metrics['rounds'] += 1
+        
+        return self._finish(tiles, start_time)
+    
+    def _finish(self, tiles: List[Tile], start_time: float) -> List[Tile]:
+        """Sort the tiles and record the metrics of one comparison."""
+        tiles.sort()
+        self._performance_metrics['tiles'] += len(tiles)
+        self._performance_metrics['processing_time'] += time.time() - start_time
+        return tiles
+    
+    def similarity(self, first: np.ndarray, second: np.ndarray) -> float:
+        """
+        Compute the tile coverage of two token sequences.
+        
+        Args:
+            first: Integer token array
+            second: Integer token array
+        
+        Returns:
+            Fraction of the tokens of both sequences covered by tiles
+            (2 * covered / (len(first) + len(second)))
+        """
+        if len(first) + len(second) == 0:
+            return 0.0
+        covered = sum(length for _, _, length in self.tiles(first, second))
+        return 2 * covered / (len(first) + len(second))
+    
+    def get_performance_metrics(self) -> Dict:
+        """Get current performance metrics."""
+        return dict(self._performance_metrics)
+    
+    def clear(self):
+        """Reset metrics."""
+        self._performance_metrics = {
+            'comparisons': 0,
+            'rounds': 0,
+            'tiles': 0,
+            'processing_time': 0
+        }
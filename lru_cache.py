@@ -0,0 +1,132 @@
+from typing import Any, Callable, Dict, Hashable, Optional
+import logging
+import threading
+from collections import OrderedDict
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class LRUCache:
+    def __init__(self, max_entries: Optional[int] = 4096, max_bytes: Optional[int] = None,
+                 on_evict: Optional[Callable[[Hashable, Any], None]] = None):
+        """
+        Initialize a thread-safe least-recently-used cache.
+        
+        The cache is bounded by entry count, by total byte size, or both.
+        Entries beyond the bounds are evicted oldest first.
+        
+        Args:
+            max_entries: Maximum number of entries (None for no limit)
+            max_bytes: Maximum total size of entries in bytes (None for no limit)
+            on_evict: Optional callback called with (key, value) for every
+                evicted entry
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+        self._entries: 'OrderedDict[Hashable, Any]' = OrderedDict()
+        self._sizes: Dict[Hashable, int] = {}
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._performance_metrics = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0
+        }
+    
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Get a cached value and mark it as most recently used.
+        
+        Args:
+            key: Key to look up
+            default: Value returned when the key is not cached
+        
+        Returns:
+            The cached value, or default
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._performance_metrics['hits'] += 1
+                return self._entries[key]
+            self._performance_metrics['misses'] += 1
+            return default
+    
+    def put(self, key: Hashable, value: Any, size: int = 0):
+        """
+        Store a value, evicting least recently used entries if needed.
+        
+        Args:
+            key: Key to store
+            value: Value to store
+            size: Size of the entry in bytes, counted against max_bytes
+        """
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._sizes[key]
+                self._entries.move_to_end(key)
+            self._entries[key] = value
+            self._sizes[key] = size
+            self._bytes += size
+            self._evict()
+    
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove an entry without counting it as an eviction."""
+        with self._lock:
+            if key not in self._entries:
+                return default
+            self._bytes -= self._sizes.pop(key)
+            return self._entries.pop(key)
+    
+    def _evict(self):
+        """Evict entries until the cache is within its bounds."""
+        while self._entries and (
+                (self.max_entries is not None and len(self._entries) > self.max_entries) or
+                (self.max_bytes is not None and self._bytes > self.max_bytes)):
+            key, value = self._entries.popitem(last=False)
+            self._bytes -= self._sizes.pop(key)
+            self._performance_metrics['evictions'] += 1
+            if self.on_evict is not None:
+                self.on_evict(key, value)
+    
+    def items(self):
+        """Get a snapshot of the cached (key, value) pairs, oldest first."""
+        with self._lock:
+            return list(self._entries.items())
+    
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._entries
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    @property
+    def total_bytes(self) -> int:
+        """Total size of the cached entries in bytes."""
+        return self._bytes
+    
+    def get_performance_metrics(self) -> Dict:
+        """Get current performance metrics."""
+        with self._lock:
+            return {
+                'hits': self._performance_metrics['hits'],
+                'misses': self._performance_metrics['misses'],
+                'evictions': self._performance_metrics['evictions'],
+                'entries': len(self._entries),
+                'bytes': self._bytes
+            }
+    
+    def clear(self):
+        """Remove all entries and reset metrics."""
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._bytes = 0
+            self._performance_metrics = {
+                'hits': 0,
+                'misses': 0,
+                'evictions': 0
+            }
@@ -0,0 +1,194 @@
+from typing import Dict, Iterable, List, Set
+import logging
+import time
+from collections import defaultdict
+import numpy as np
+from rabin_karp import DEFAULT_HASH_SEED, MASK_64, mix64
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Signature value of an empty k-gram set
+_EMPTY_SLOT = np.iinfo(np.uint64).max
+
+class MinHashLSH:
+    def __init__(self, bands: int = 32, rows: int = 4, seed: int = DEFAULT_HASH_SEED,
+                 chunk_size: int = 4096):
+        """
+        Initialize a MinHash signature index with banded locality-sensitive hashing.
+        
+        Every submission is summarized by a signature of bands * rows MinHash
+        values of its k-gram hash set. The signature is cut into bands, and
+        two submissions become candidates when all rows of at least one band
+        are equal, which happens with probability 1 - (1 - J^rows)^bands for
+        Jaccard similarity J. A query reads one bucket per band, so its cost
+        does not depend on the number of stored submissions or on the length
+        of posting lists.
+        
+        Args:
+            bands: Number of bands (more bands raise recall)
+            rows: Number of MinHash values per band (more rows raise precision)
+            seed: Seed of the hash permutations
+            chunk_size: Number of k-gram hashes mixed at once when computing
+                a signature
+        """
+        if bands < 1 or rows < 1:
+            raise ValueError("bands and rows must be at least 1")
+        
+        self.bands = bands
+        self.rows = rows
+        self.num_perm = bands * rows
+        self.chunk_size = chunk_size
+        self._seeds = mix64(np.arange(self.num_perm, dtype=np.uint64), seed & MASK_64)
+        self._buckets: List[Dict[bytes, Set[str]]] = [defaultdict(set) for _ in range(bands)]
+        self._signatures: Dict[str, np.ndarray] = {}
+        self._performance_metrics = {
+            'documents': 0,
+            'queries': 0,
+            'candidates_returned': 0,
+            'signature_time': 0,
+            'processing_time': 0
+        }
+    
+    @property
+    def threshold(self) -> float:
+        """Approximate Jaccard similarity at which pairs become candidates with probability 1/2."""
+        return (1.0 / self.bands) ** (1.0 / self.rows)
+    
+    def signature(self, hashes: Iterable[int]) -> np.ndarray:
+        """
+        Compute the MinHash signature of a set of k-gram hashes.
+        
+        Each permutation is a seeded splitmix64 mix of the hash values, and
+        its slot keeps the minimum mixed value over the set.
+        
+        Args:
+            hashes: k-gram hashes of a submission (duplicates are ignored)
+        
+        Returns:
+            uint64 array of num_perm MinHash values
+        """
+        start_time = time.time()
+        values = np.unique(np.asarray(hashes if isinstance(hashes, np.ndarray) else list(hashes),
+                                      dtype=np.uint64))
+        signature = np.full(self.num_perm, _EMPTY_SLOT, dtype=np.uint64)
+        
+        for start in range(0, len(values), self.chunk_size):
+            chunk = values[start:start + self.chunk_size]
+            mixed = mix64(chunk[:, None] ^ self._seeds[None, :], 0)
+            np.minimum(signature, mixed.min(axis=0), out=signature)
+        
+        self._performance_metrics['signature_time'] += time.time() - start_time
+        return signature
+    
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        """Split a signature into the bucket key of every band."""
+        if len(signature) != self.num_perm:
+            raise ValueError(f"Expected a signature of {self.num_perm} values, got {len(signature)}")
+        return [signature[band * self.rows:(band + 1) * self.rows].tobytes()
+                for band in range(self.bands)]
+    
+    def add(self, doc_id: str, signature: np.ndarray):
+        """
+        Add a submission's signature to the band buckets.
+        
+        Args:
+            doc_id: Unique identifier of the submission
+            signature: Signature from signature()
+        """
+        if doc_id in self._signatures:
+            self.remove(doc_id)
+        
+        for band, key in enumerate(self._band_keys(signature)):
+            self._buckets[band][key].add(doc_id)
+        
+        self._signatures[doc_id] = signature
+        self._performance_metrics['documents'] += 1
+    
+    def remove(self, doc_id: str) -> bool:
+        """
+        Remove a submission from the band buckets.
+        
+        Args:
+            doc_id: Identifier of the submission to remove
+        
+        Returns:
+            bool: True if the submission was indexed
+        """
+        signature = self._signatures.pop(doc_id, None)
+        if signature is None:
+            return False
+        
+        for band, key in enumerate(self._band_keys(signature)):
+            bucket = self._buckets[band].get(key)
+            if bucket is not None:
+                bucket.discard(doc_id)
+                if not bucket:
+                    del self._buckets[band][key]
+        
+        self._performance_metrics['documents'] -= 1
+        return True
+    
+    def query(self, signature: np.ndarray) -> Set[str]:
+        """
+        Find stored submissions sharing at least one band with a signature.
+        
+        Args:
+            signature: Signature from signature()
+        
+        Returns:
+            Set of candidate submission IDs
+        """
+        start_time = time.time()
+        candidates: Set[str] = set()
+        for band, key in enumerate(self._band_keys(signature)):
+            bucket = self._buckets[band].get(key)
+            if bucket:
+                candidates |= bucket
+        
+        self._performance_metrics['queries'] += 1
+        self._performance_metrics['candidates_returned'] += len(candidates)
+        self._performance_metrics['processing_time'] += time.time() - start_time
+        return candidates
+    
+    @staticmethod
+    def estimate_similarity(signature1: np.ndarray, signature2: np.ndarray) -> float:
+        """Estimate the Jaccard similarity of two k-gram sets from their signatures."""
+        return float(np.mean(signature1 == signature2))
+    
+    def get_signature(self, doc_id: str) -> np.ndarray:
+        """Get the signature stored for a submission (None if unknown)."""
+        return self._signatures.get(doc_id)
+    
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._signatures
+    
+    def __len__(self) -> int:
+        return len(self._signatures)
+    
+    def get_performance_metrics(self) -> Dict:
+        """Get current performance metrics."""
+        return {
+            'documents': self._performance_metrics['documents'],
+            'bands': self.bands,
+            'rows': self.rows,
+            'buckets': sum(len(buckets) for buckets in self._buckets),
+            'queries': self._performance_metrics['queries'],
+            'candidates_returned': self._performance_metrics['candidates_returned'],
+            'signature_time': self._performance_metrics['signature_time'],
+            'processing_time': self._performance_metrics['processing_time']
+        }
+    
+    def clear(self):
+        """Clear the buckets and reset metrics."""
+        for buckets in self._buckets:
+            buckets.clear()
+        self._signatures.clear()
+        self._performance_metrics = {
+            'documents': 0,
+            'queries': 0,
+            'candidates_returned': 0,
+            'signature_time': 0,
+            'processing_time': 0
+        }
@@ -0,0 +1,570 @@
+from typing import List, Dict, Optional, Tuple, Any, Iterator, Union
+import os
+import mmap
+import time
+import pickle
+import struct
+import logging
+from bisect import bisect_left, bisect_right
+from lru_cache import LRUCache
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# File header stored in page 0: magic, format version, page size, order,
+# root page, allocated page count, head of the free page list, key count
+_FILE_MAGIC = b'PDBT'
+_FILE_HEADER = struct.Struct('<4sIIIIIIQ')
+FILE_FORMAT_VERSION = 1
+
+# Every page starts with its type, the number of payload bytes it holds and
+# the next page of its chain (0 for none; page 0 is never part of a chain)
+_PAGE_HEADER = struct.Struct('<BII')
+_PAGE_FREE = 0
+_PAGE_NODE = 1
+_PAGE_OVERFLOW = 2
+
+class PagedNode:
+    __slots__ = ('page_id', 'is_leaf', 'keys', 'values', 'children', 'next', 'dirty')
+    
+    def __init__(self, page_id: int, is_leaf: bool = True):
+        self.page_id = page_id
+        self.is_leaf = is_leaf
+        self.keys: List[Any] = []
+        # Leaf values are pickled bytes, or the first page of an overflow
+        # chain for values too large to keep inline
+        self.values: List[Union[bytes, int]] = []
+        self.children: List[int] = []  # Page IDs of the children
+        self.next = 0  # Page ID of the next leaf
+        self.dirty = False
+
+class PagedBPlusTree:
+    def __init__(self, filepath: str, order: int = 64, page_size: int = 4096,
+                 pool_pages: int = 1024):
+        """
+        Initialize a disk-backed B+ Tree stored in fixed-size pages of one file.
+        
+        The file is memory-mapped and decoded nodes are kept in an LRU buffer
+        pool, so opening an existing store only reads its header page and a
+        lookup touches O(height) nodes. Nodes larger than a page continue in
+        overflow pages, and large values are stored in their own overflow
+        chains so leaves stay small. Modified nodes are written back when
+        they are evicted from the pool and on flush/close.
+        
+        Deleted keys are removed from their leaf, but leaves are not merged;
+        searches and iteration are unaffected by underfull leaves.
+        
+        Args:
+            filepath: Path of the store file (created if it does not exist)
+            order: Maximum number of children per node, for new files
+            page_size: Size of a page in bytes, for new files
+            pool_pages: Maximum number of nodes held in the buffer pool
+        """
+        if order < 3:
+            raise ValueError("B+ Tree order must be at least 3")
+        
+        self.filepath = filepath
+        self._pool = LRUCache(max_entries=max(pool_pages, 16), on_evict=self._write_back)
+        self._performance_metrics = {
+            'insertions': 0,
+            'deletions': 0,
+            'searches': 0,
+            'splits': 0,
+            'page_reads': 0,
+            'page_writes': 0,
+            'processing_time': 0
+        }
+        
+        exists = os.path.exists(filepath) and os.path.getsize(filepath) > 0
+        self._file = open(filepath, 'r+b' if exists else 'w+b')
+        
+        if exists:
+            self._mmap = mmap.mmap(self._file.fileno(), 0)
+            try:
+                self._read_header()
+            except ValueError:
+                self._mmap.close()
+                self._file.close()
+                raise
+        else:
+            self.page_size = page_size
+            self.order = order
+            self.root = 0
+            self.page_count = 1
+            self.free_head = 0
+            self._size = 0
+            self._file.truncate(page_size)
+            self._mmap = mmap.mmap(self._file.fileno(), 0)
+            self._write_header()
+        
+        self.max_keys = self.order - 1
+        # Values up to this size are stored inline in their leaf
+        self.inline_value_limit = self.page_size // 16
+    
+    def _read_header(self):
+        """Load the file header from page 0."""
+        magic, version, page_size, order, root, page_count, free_head, size = \
+            _FILE_HEADER.unpack_from(self._mmap, 0)
+        if magic != _FILE_MAGIC:
+            raise ValueError(f"{self.filepath} is not a paged B+ Tree file")
+        if version != FILE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported paged B+ Tree format version {version}")
+        
+        self.page_size = page_size
+        self.order = order
+        self.root = root
+        self.page_count = page_count
+        self.free_head = free_head
+        self._size = size
+    
+    def _write_header(self):
+        """Store the file header in page 0."""
+        _FILE_HEADER.pack_into(self._mmap, 0, _FILE_MAGIC, FILE_FORMAT_VERSION, self.page_size,
+                               self.order, self.root, self.page_count, self.free_head, self._size)
+    
+    # Page management
+    
+    def _ensure_capacity(self, page_count: int):
+        """Grow the file so it holds at least page_count pages."""
+        capacity = len(self._mmap) // self.page_size
+        if page_count <= capacity:
+            return
+        
+        # Grow geometrically so remapping is amortized
+        capacity = max(page_count, 2 * capacity)
+        self._mmap.close()
+        self._file.truncate(capacity * self.page_size)
+        self._mmap = mmap.mmap(self._file.fileno(), 0)
+    
+    def _allocate_page(self) -> int:
+        """Take a page from the free list, or append one to the file."""
+        if self.free_head:
+            page_id = self.free_head
+            _, _, self.free_head = _PAGE_HEADER.unpack_from(self._mmap, page_id * self.page_size)
+        else:
+            page_id = self.page_count
+            self.page_count += 1
+            self._ensure_capacity(self.page_count)
+        
+        _PAGE_HEADER.pack_into(self._mmap, page_id * self.page_size, _PAGE_NODE, 0, 0)
+        return page_id
+    
+    def _free_chain(self, page_id: int):
+        """Return every page of a chain to the free list."""
+        while page_id:
+            offset = page_id * self.page_size
+            _, _, next_page = _PAGE_HEADER.unpack_from(self._mmap, offset)
+            _PAGE_HEADER.pack_into(self._mmap, offset, _PAGE_FREE, 0, self.free_head)
+            self.free_head = page_id
+            page_id = next_page
+    
+    def _write_chain(self, page_id: int, page_type: int, data: bytes):
+        """
+        Write data across a chain of pages starting at page_id.
+        
+        Pages of the existing chain are reused; missing pages are allocated
+        and leftover pages are freed.
+        """
+        capacity = self.page_size - _PAGE_HEADER.size
+        position = 0
+        
+        while True:
+            offset = page_id * self.page_size
+            _, _, next_page = _PAGE_HEADER.unpack_from(self._mmap, offset)
+            chunk = data[position:position + capacity]
+            position += len(chunk)
+            
+            if position >= len(data):
+                # Last page of the chain: release the rest of the old chain
+                _PAGE_HEADER.pack_into(self._mmap, offset, page_type, len(chunk), 0)
+                self._mmap[offset + _PAGE_HEADER.size:offset + _PAGE_HEADER.size + len(chunk)] = chunk
+                self._performance_metrics['page_writes'] += 1
+                self._free_chain(next_page)
+                return
+            
+            if not next_page:
+                next_page = self._allocate_page()
+            _PAGE_HEADER.pack_into(self._mmap, offset, page_type, len(chunk), next_page)
+            self._mmap[offset + _PAGE_HEADER.size:offset + _PAGE_HEADER.size + len(chunk)] = chunk
+            self._performance_metrics['page_writes'] += 1
+            page_id = next_page
+    
+    def _read_chain(self, page_id: int) -> bytes:
+        """Read the data stored in a chain of pages."""
+        chunks = []
+        while page_id:
+            offset = page_id * self.page_size
+            _, length, page_id = _PAGE_HEADER.unpack_from(self._mmap, offset)
+            chunks.append(self._mmap[offset + _PAGE_HEADER.size:offset + _PAGE_HEADER.size + length])
+            self._performance_metrics['page_reads'] += 1
+        return b''.join(chunks)
+    
+    # Node access through the buffer pool
+    
+    def _load(self, page_id: int) -> PagedNode:
+        """Get a node from the buffer pool, reading it from its pages on a miss."""
+        node = self._pool.get(page_id)
+        if node is not None:
+            return node
+        
+        is_leaf, keys, payload, next_leaf = pickle.loads(self._read_chain(page_id))
+        node = PagedNode(page_id, is_leaf)
+        node.keys = keys
+        if is_leaf:
+            node.values = payload
+        else:
+            node.children = payload
+        node.next = next_leaf
+        self._pool.put(page_id, node)
+        return node
+    
+    def _new_node(self, is_leaf: bool) -> PagedNode:
+        """Allocate a page for a new node and add it to the buffer pool."""
+        node = PagedNode(self._allocate_page(), is_leaf)
+        self._mark_dirty(node)
+        return node
+    
+    def _mark_dirty(self, node: PagedNode):
+        """
+        Record that a node was modified.
+        
+        The node is (re)inserted into the pool, so a modified node is either
+        cached with its dirty flag set or was already written back.
+        """
+        node.dirty = True
+        self._pool.put(node.page_id, node)
+    
+    def _write_back(self, page_id: int, node: PagedNode):
+        """Write a node to its pages if it was modified."""
+        if not node.dirty:
+            return
+        payload = node.values if node.is_leaf else node.children
+        data = pickle.dumps((node.is_leaf, node.keys, payload, node.next),
+                            protocol=pickle.HIGHEST_PROTOCOL)
+        self._write_chain(page_id, _PAGE_NODE, data)
+        node.dirty = False
+    
+    # Value encoding
+    
+    def _encode_value(self, value: Any) -> Union[bytes, int]:
+        """Pickle a value, moving it to an overflow chain if it is large."""
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(data) <= self.inline_value_limit:
+            return data
+        page_id = self._allocate_page()
+        self._write_chain(page_id, _PAGE_OVERFLOW, data)
+        return page_id
+    
+    def _decode_value(self, stored: Union[bytes, int]) -> Any:
+        """Unpickle a value stored inline or in an overflow chain."""
+        if isinstance(stored, int):
+            stored = self._read_chain(stored)
+        return pickle.loads(stored)
+    
+    def _release_value(self, stored: Union[bytes, int]):
+        """Free the overflow chain of a stored value, if any."""
+        if isinstance(stored, int):
+            self._free_chain(stored)
+    
+    # Tree operations
+    
+    def insert(self, key: Any, value: Any) -> bool:
+        """
+        Insert a key-value pair into the tree.
+        
+        Args:
+            key: The key to insert
+            value: The value associated with the key (must be picklable)
+        
+        Returns:
+            bool: True if insertion was successful
+        """
+        start_time = time.time()
+        
+        try:
+            stored = self._encode_value(value)
+            
+            if not self.root:
+                leaf = self._new_node(is_leaf=True)
+                leaf.keys = [key]
+                leaf.values = [stored]
+                self.root = leaf.page_id
+                self._size += 1
+                self._performance_metrics['insertions'] += 1
+                return True
+            
+            # Descend to the leaf, remembering the path for splits
+            path = []
+            node = self._load(self.root)
+            while not node.is_leaf:
+                idx = bisect_right(node.keys, key)
+                path.append((node, idx))
+                node = self._load(node.children[idx])
+            
+            idx = bisect_left(node.keys, key)
+            if idx < len(node.keys) and node.keys[idx] == key:
+                # Update existing value
+                self._release_value(node.values[idx])
+                node.values[idx] = stored
+            else:
+                node.keys.insert(idx, key)
+                node.values.insert(idx, stored)
+                self._size += 1
+                self._performance_metrics['insertions'] += 1
+            self._mark_dirty(node)
+            
+            if len(node.keys) > self.max_keys:
+                self._split(node, path)
+            
+            self._performance_metrics['processing_time'] += time.time() - start_time
+            return True
+        
+        except Exception as e:
+            logger.error(f"Error inserting key {key}: {str(e)}")
+            return False
+    
+    def _split(self, node: PagedNode, path: List[Tuple[PagedNode, int]]):
+        """Split an overfull node and propagate the separator up the path."""
+        while len(node.keys) > self.max_keys:
+            self._performance_metrics['splits'] += 1
+            mid = len(node.keys) // 2
+            new_node = self._new_node(node.is_leaf)
+            
+            if node.is_leaf:
+                new_node.keys = node.keys[mid:]
+                new_node.values = node.values[mid:]
+                del node.keys[mid:]
+                del node.values[mid:]
+                new_node.next = node.next
+                node.next = new_node.page_id
+                separator = new_node.keys[0]
+            else:
+                separator = node.keys[mid]
+                new_node.keys = node.keys[mid + 1:]
+                new_node.children = node.children[mid + 1:]
+                del node.keys[mid:]
+                del node.children[mid + 1:]
+            
+            self._mark_dirty(node)
+            self._mark_dirty(new_node)
+            
+            if not path:
+                root = self._new_node(is_leaf=False)
+                root.keys = [separator]
+                root.children = [node.page_id, new_node.page_id]
+                self.root = root.page_id
+                return
+            
+            parent, idx = path.pop()
+            parent.keys.insert(idx, separator)
+            parent.children.insert(idx + 1, new_node.page_id)
+            self._mark_dirty(parent)
+            node = parent
+    
+    def _find_leaf(self, key: Any) -> PagedNode:
+        """Find the leaf node where a key belongs."""
+        node = self._load(self.root)
+        while not node.is_leaf:
+            node = self._load(node.children[bisect_right(node.keys, key)])
+        return node
+    
+    def search(self, key: Any) -> Optional[Any]:
+        """
+        Search for a key in the tree.
+        
+        Args:
+            key: The key to search for
+        
+        Returns:
+            The value associated with the key, or None if not found
+        """
+        start_time = time.time()
+        self._performance_metrics['searches'] += 1
+        
+        try:
+            if not self.root:
+                return None
+            
+            leaf = self._find_leaf(key)
+            idx = bisect_left(leaf.keys, key)
+            self._performance_metrics['processing_time'] += time.time() - start_time
+            if idx < len(leaf.keys) and leaf.keys[idx] == key:
+                return self._decode_value(leaf.values[idx])
+            return None
+        
+        except Exception as e:
+            logger.error(f"Error searching for key {key}: {str(e)}")
+            return None
+    
+    def delete(self, key: Any) -> bool:
+        """
+        Delete a key from the tree.
+        
+        Args:
+            key: The key to delete
+        
+        Returns:
+            bool: True if deletion was successful
+        """
+        try:
+            if not self.root:
+                return False
+            
+            leaf = self._find_leaf(key)
+            idx = bisect_left(leaf.keys, key)
+            if idx == len(leaf.keys) or leaf.keys[idx] != key:
+                return False
+            
+            leaf.keys.pop(idx)
+            self._release_value(leaf.values.pop(idx))
+            self._mark_dirty(leaf)
+            self._size -= 1
+            self._performance_metrics['deletions'] += 1
+            return True
+        
+        except Exception as e:
+            logger.error(f"Error deleting key {key}: {str(e)}")
+            return False
+    
+    def range_search(self, start_key: Any, end_key: Any) -> List[Tuple[Any, Any]]:
+        """
+        Search for all keys in the range [start_key, end_key].
+        
+        Args:
+            start_key: The lower bound of the range
+            end_key: The upper bound of the range
+        
+        Returns:
+            List of (key, value) tuples in the range
+        """
+        results = []
+        try:
+            results.extend(self.iter_range(start_key, end_key))
+            return results
+        
+        except Exception as e:
+            logger.error(f"Error in range search: {str(e)}")
+            return results
+    
+    def iter_range(self, start_key: Any = None, end_key: Any = None) -> Iterator[Tuple[Any, Any]]:
+        """
+        Lazily iterate over the keys in the range [start_key, end_key].
+        
+        Leaves are loaded one at a time by following the leaf chain. The
+        tree must not be modified while the iterator is in use.
+        
+        Args:
+            start_key: The lower bound of the range (None for no bound)
+            end_key: The upper bound of the range (None for no bound)
+        
+        Yields:
+            (key, value) tuples in key order
+        """
+        if not self.root:
+            return
+        
+        if start_key is None:
+            leaf = self._load(self.root)
+            while not leaf.is_leaf:
+                leaf = self._load(leaf.children[0])
+            idx = 0
+        else:
+            leaf = self._find_leaf(start_key)
+            idx = bisect_left(leaf.keys, start_key)
+        
+        while True:
+            keys = leaf.keys
+            end = len(keys) if end_key is None else bisect_right(keys, end_key)
+            for i in range(idx, end):
+                yield keys[i], self._decode_value(leaf.values[i])
+            if end < len(keys) or not leaf.next:
+                return
+            leaf = self._load(leaf.next)
+            idx = 0
+    
+    def iter_prefix(self, prefix: str) -> Iterator[Tuple[str, Any]]:
+        """
+        Lazily iterate over the string keys starting with a prefix.
+        
+        Args:
+            prefix: Key prefix to match
+        
+        Yields:
+            (key, value) tuples in key order
+        """
+        for key, value in self.iter_range(prefix):
+            if not key.startswith(prefix):
+                return
+            yield key, value
+    
+    def iter_all(self) -> Iterator[Tuple[Any, Any]]:
+        """Lazily iterate over all (key, value) pairs in key order."""
+        return self.iter_range()
+    
+    def items(self) -> List[Tuple[Any, Any]]:
+        """Get all (key, value) pairs in key order."""
+        return list(self.iter_all())
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def flush(self):
+        """Write all modified nodes and the header to the file."""
+        for page_id, node in self._pool.items():
+            self._write_back(page_id, node)
+        self._write_header()
+        self._mmap.flush()
+    
+    def close(self):
+        """Flush and close the file."""
+        if self._file.closed:
+            return
+        self.flush()
+        self._pool.clear()
+        self._mmap.close()
+        self._file.close()
+    
+    def __enter__(self) -> 'PagedBPlusTree':
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def get_performance_metrics(self) -> Dict:
+        """Get current performance metrics."""
+        pool_metrics = self._pool.get_performance_metrics()
+        return {
+            'insertions': self._performance_metrics['insertions'],
+            'deletions': self._performance_metrics['deletions'],
+            'searches': self._performance_metrics['searches'],
+            'splits': self._performance_metrics['splits'],
+            'page_reads': self._performance_metrics['page_reads'],
+            'page_writes': self._performance_metrics['page_writes'],
+            'pool_hits': pool_metrics['hits'],
+            'pool_misses': pool_metrics['misses'],
+            'pool_evictions': pool_metrics['evictions'],
+            'pages': self.page_count,
+            'processing_time': self._performance_metrics['processing_time']
+        }
+    
+    def clear(self):
+        """Remove all keys, shrink the file to its header and reset metrics."""
+        self._pool.clear()
+        self.root = 0
+        self.page_count = 1
+        self.free_head = 0
+        self._size = 0
+        self._mmap.close()
+        self._file.truncate(self.page_size)
+        self._mmap = mmap.mmap(self._file.fileno(), 0)
+        self._write_header()
+        self._performance_metrics = {
+            'insertions': 0,
+            'deletions': 0,
+            'searches': 0,
+            'splits': 0,
+            'page_reads': 0,
+            'page_writes': 0,
+            'processing_time': 0
+        }
@@ -0,0 +1,305 @@
+from typing import Dict, List, Optional, Set, Tuple
+import os
+import re
+import shutil
+import struct
+import hashlib
+import logging
+import tempfile
+import threading
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Layout of a cache entry: magic, then the number of distinct tokens, tokens,
+# fingerprints and k-gram hashes, and the byte length of the token text
+_ENTRY_MAGIC = b'PDPC'
+_ENTRY_HEADER = struct.Struct('<4sIIIII')
+
+# Bump when the entry layout changes
+CACHE_FORMAT_VERSION = 1
+
+# Version directories are named v<parser version>.<format version> and hold
+# this marker file, so that only directories written by ParseCache are purged
+_VERSION_DIR_PATTERN = re.compile(r'v\d+\.\d+')
+_MARKER_NAME = '.parse_cache'
+
+class ParseCache:
+    def __init__(self, cache_dir: str, parser_version: int,
+                 max_bytes: Optional[int] = 512 * 1024 * 1024):
+        """
+        Initialize an on-disk cache of parsed token arrays and fingerprints.
+        
+        Entries are keyed by the SHA-256 of the file bytes together with the
+        parser and fingerprint parameters, so unchanged files are loaded
+        without any regex work. Entries live in a directory named after the
+        parser version; directories of other versions are deleted on startup.
+        Only directories named like a version tag that contain the cache's
+        marker file count as such, so other directories in cache_dir are
+        never touched.
+        
+        Args:
+            cache_dir: Directory holding the cache
+            parser_version: Version of the tokenizer producing the entries
+            max_bytes: Maximum total size of the cache (None for no limit);
+                least recently used entries are deleted beyond it
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.version_tag = f"v{parser_version}.{CACHE_FORMAT_VERSION}"
+        self.entry_dir = os.path.join(cache_dir, self.version_tag)
+        self._lock = threading.Lock()
+        self._entry_sizes: Dict[str, int] = {}
+        self._total_bytes = 0
+        self._performance_metrics = {
+            'hits': 0,
+            'misses': 0,
+            'writes': 0,
+            'evictions': 0
+        }
+        
+        self._make_entry_dir()
+        self._purge_stale_versions()
+        self._scan_entries()
+    
+    def _make_entry_dir(self):
+        """Create the entry directory of this version and its marker file."""
+        os.makedirs(self.entry_dir, exist_ok=True)
+        with open(os.path.join(self.entry_dir, _MARKER_NAME), 'a'):
+            pass
+    
+    def _purge_stale_versions(self):
+        """Delete entries written by other parser or format versions."""
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name != self.version_tag and _VERSION_DIR_PATTERN.fullmatch(name) and \
+                    os.path.isfile(os.path.join(path, _MARKER_NAME)):
+                logger.info(f"Removing stale parse cache {path}")
+                shutil.rmtree(path, ignore_errors=True)
+    
+    def _scan_entries(self):
+        """Load the size of every existing entry."""
+        for root, _, files in os.walk(self.entry_dir):
+            for name in files:
+                if name.endswith('.bin'):
+                    try:
+                        size = os.path.getsize(os.path.join(root, name))
+                    except OSError:
+                        continue
+                    self._entry_sizes[name[:-4]] = size
+                    self._total_bytes += size
+    
+    def refresh(self):
+        """
+        Re-read entry sizes from disk and enforce the size limit.
+        
+        Needed after other processes (e.g. ingestion workers) wrote entries.
+        """
+        with self._lock:
+            self._entry_sizes.clear()
+            self._total_bytes = 0
+            self._scan_entries()
+        self.prune()
+    
+    def make_key(self, content: bytes, file_ext: str, window_size: int,
+                 winnow_window: int, seed: int) -> str:
+        """
+        Build the cache key of a file.
+        
+        Args:
+            content: Raw bytes of the file
+            file_ext: File extension selecting the language
+            window_size: k-gram length used for fingerprints
+            winnow_window: Winnowing window size
+            seed: Seed of the stable token hash
+        
+        Returns:
+            Hex digest identifying the entry
+        """
+        digest = hashlib.sha256(content)
+        return self._finish_key(digest, file_ext, window_size, winnow_window, seed)
+    
+    def make_file_key(self, file_path: str, file_ext: str, window_size: int,
+                      winnow_window: int, seed: int, chunk_size: int = 1 << 20) -> str:
+        """
+        Build the cache key of a file on disk, reading it in chunks.
+        
+        Equals make_key() of the file's bytes without holding them in memory.
+        
+        Raises:
+            OSError: If the file cannot be read
+        """
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+        return self._finish_key(digest, file_ext, window_size, winnow_window, seed)
+    
+    def _finish_key(self, digest, file_ext: str, window_size: int,
+                    winnow_window: int, seed: int) -> str:
+        """Add the parser and fingerprint parameters to a content digest."""
+        digest.update(f"|{self.version_tag}|{file_ext.lower()}|{window_size}|"
+                      f"{winnow_window}|{seed}".encode('utf-8'))
+        return digest.hexdigest()
+    
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.entry_dir, key[:2], key + '.bin')
+    
+    def get(self, key: str) -> Optional[Tuple[List[str], np.ndarray, Set[int], np.ndarray]]:
+        """
+        Load a cached entry.
+        
+        Args:
+            key: Key from make_key
+        
+        Returns:
+            Tuple of (distinct tokens, token indexes, fingerprints, unique
+            k-gram hashes), or None on a miss
+        """
+        path = self._entry_path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            entry = self._decode(data)
+        except (OSError, ValueError, struct.error):
+            with self._lock:
+                self._performance_metrics['misses'] += 1
+            return None
+        
+        # Touch the entry so eviction removes least recently used ones first
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        
+        with self._lock:
+            self._performance_metrics['hits'] += 1
+        return entry
+    
+    def put(self, key: str, distinct_tokens: List[str], token_indexes: np.ndarray,
+            fingerprints: Set[int], kgram_hashes: np.ndarray):
+        """
+        Store an entry.
+        
+        Args:
+            key: Key from make_key
+            distinct_tokens: Distinct tokens of the file
+            token_indexes: Index into distinct_tokens for every token
+            fingerprints: Winnowed fingerprints of the file
+            kgram_hashes: Unique k-gram hashes of the file
+        """
+        data = self._encode(distinct_tokens, token_indexes, fingerprints, kgram_hashes)
+        path = self._entry_path(key)
+        
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temporary file first so readers never see partial entries
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error(f"Error writing parse cache entry {key}: {str(e)}")
+            return
+        
+        with self._lock:
+            self._total_bytes += len(data) - self._entry_sizes.get(key, 0)
+            self._entry_sizes[key] = len(data)
+            self._performance_metrics['writes'] += 1
+        
+        if self.max_bytes is not None and self._total_bytes > self.max_bytes:
+            self.prune()
+    
+    def prune(self):
+        """Delete least recently used entries until the cache fits in max_bytes."""
+        if self.max_bytes is None:
+            return
+        
+        with self._lock:
+            if self._total_bytes <= self.max_bytes:
+                return
+            
+            entries = []
+            for key in self._entry_sizes:
+                try:
+                    entries.append((os.path.getmtime(self._entry_path(key)), key))
+                except OSError:
+                    entries.append((0, key))
+            entries.sort()
+            
+            # Shrink to 90% of the limit so pruning does not run on every write
+            target = int(self.max_bytes * 0.9)
+            for _, key in entries:
+                if self._total_bytes <= target:
+                    break
+                try:
+                    os.remove(self._entry_path(key))
+                except OSError:
+                    pass
+                self._total_bytes -= self._entry_sizes.pop(key)
+                self._performance_metrics['evictions'] += 1
+    
+    def _encode(self, distinct_tokens: List[str], token_indexes: np.ndarray,
+                fingerprints: Set[int], kgram_hashes: np.ndarray) -> bytes:
+        """Serialize an entry to bytes."""
+        # Tokens never contain whitespace, so newlines can separate them
+        token_text = '\n'.join(distinct_tokens).encode('utf-8')
+        fingerprint_array = np.array(sorted(fingerprints), dtype='<u8')
+        header = _ENTRY_HEADER.pack(_ENTRY_MAGIC, len(distinct_tokens), len(token_indexes),
+                                    len(fingerprint_array), len(kgram_hashes), len(token_text))
+        return b''.join([
+            header,
+            token_text,
+            np.asarray(token_indexes, dtype='<u4').tobytes(),
+            fingerprint_array.tobytes(),
+            np.asarray(kgram_hashes, dtype='<u8').tobytes()
+        ])
+    
+    def _decode(self, data: bytes) -> Tuple[List[str], np.ndarray, Set[int], np.ndarray]:
+        """Deserialize an entry from bytes."""
+        magic, n_distinct, n_tokens, n_fingerprints, n_kgrams, text_length = \
+            _ENTRY_HEADER.unpack_from(data)
+        if magic != _ENTRY_MAGIC:
+            raise ValueError("Not a parse cache entry")
+        
+        offset = _ENTRY_HEADER.size
+        token_text = data[offset:offset + text_length].decode('utf-8')
+        distinct_tokens = token_text.split('\n') if n_distinct else []
+        offset += text_length
+        
+        token_indexes = np.frombuffer(data, dtype='<u4', count=n_tokens, offset=offset)
+        offset += 4 * n_tokens
+        fingerprints = np.frombuffer(data, dtype='<u8', count=n_fingerprints, offset=offset)
+        offset += 8 * n_fingerprints
+        kgram_hashes = np.frombuffer(data, dtype='<u8', count=n_kgrams, offset=offset)
+        
+        if len(distinct_tokens) != n_distinct:
+            raise ValueError("Corrupt parse cache entry")
+        
+        return (distinct_tokens, token_indexes.astype(np.uint32),
+                set(fingerprints.tolist()), kgram_hashes.astype(np.uint64))
+    
+    def clear(self):
+        """Delete all entries of the current version."""
+        with self._lock:
+            shutil.rmtree(self.entry_dir, ignore_errors=True)
+            self._make_entry_dir()
+            self._entry_sizes.clear()
+            self._total_bytes = 0
+    
+    def __len__(self) -> int:
+        return len(self._entry_sizes)
+    
+    def get_performance_metrics(self) -> Dict:
+        """Get current performance metrics."""
+        with self._lock:
+            return {
+                'hits': self._performance_metrics['hits'],
+                'misses': self._performance_metrics['misses'],
+                'writes': self._performance_metrics['writes'],
+                'evictions': self._performance_metrics['evictions'],
+                'entries': len(self._entry_sizes),
+                'bytes': self._total_bytes
+            }
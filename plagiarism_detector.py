@@ -1,30 +1,337 @@
-from typing import List, Dict, Set, Tuple, Optional
+from typing import List, Dict, Set, Tuple, Optional, Iterator, Iterable, AsyncIterator, Union, Callable
 import os
+import asyncio
+import heapq
+import hashlib
+import time
+import itertools
+from contextlib import contextmanager
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
 from code_parser import CodeParser
 from rabin_karp import RabinKarp
+from greedy_string_tiling import GreedyStringTiling
 from similarity_graph import SimilarityGraph
 from bplus_tree import BPlusTree
+from paged_bplus_tree import PagedBPlusTree
+from fingerprint_index import FingerprintIndex
+from fragment_index import FragmentIndex
+from minhash_lsh import MinHashLSH
+from parse_cache import ParseCache
+from token_store import TokenStore
 import logging
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def _parse_and_fingerprint(parser: CodeParser, rabin_karp: RabinKarp,
+                           parse_cache: Optional[ParseCache], file_path: str,
+                           window_size: int, winnow_window: int) -> Optional[Tuple]:
+    """
+    Parse and fingerprint a file, loading it from the parse cache if possible.
+    
+    Files larger than the parser's stream_threshold are hashed, tokenized
+    and fingerprinted chunk by chunk (see _stream_and_fingerprint).
+    
+    Returns:
+        Tuple of (token IDs, metadata, fingerprints, unique k-gram hashes),
+        or None if the file could not be parsed
+    """
+    if _should_stream(parser, file_path):
+        prepared = _stream_and_fingerprint(parser, rabin_karp, parse_cache, file_path,
+                                           window_size, winnow_window)
+        prepared = prepared[:3] if prepared is not None else None
+    elif parse_cache is None:
+        tokens = parser.parse_file(file_path)
+        prepared = _fingerprint_tokens(rabin_karp, tokens, window_size, winnow_window) \
+            if tokens is not None else None
+    else:
+        try:
+            with open(file_path, 'rb') as f:
+                content = f.read()
+        except OSError as e:
+            logger.error(f"Error reading file {file_path}: {str(e)}")
+            return None
+        
+        prepared = _parse_content(parser, rabin_karp, parse_cache, content, file_path,
+                                  window_size, winnow_window)
+    
+    if prepared is None:
+        return None
+    
+    tokens, fingerprints, kgram_hashes = prepared
+    return tokens, parser.get_metadata(file_path), fingerprints, kgram_hashes
+
+def _should_stream(parser: CodeParser, file_path: str) -> bool:
+    """Check whether a file is large enough to be parsed chunk by chunk."""
+    try:
+        return os.path.getsize(file_path) > parser.stream_threshold
+    except OSError:
+        return False
+
+def _stream_and_fingerprint(parser: CodeParser, rabin_karp: RabinKarp,
+                            parse_cache: Optional[ParseCache], file_path: str,
+                            window_size: int, winnow_window: int,
+                            token_store: Optional[TokenStore] = None) -> Optional[Tuple]:
+    """
+    Parse and fingerprint a large file chunk by chunk, using the parse cache if given.
+    
+    The cache key is hashed from the file in chunks, and the token ID blocks
+    of CodeParser.stream_file are fed to RabinKarp.stream_fingerprint as
+    they are produced, so neither the file's text nor its token strings are
+    ever held whole. With a token store, the blocks are appended to a new
+    array in it instead of being concatenated.
+    
+    Returns:
+        Tuple of (token IDs, fingerprints, unique k-gram hashes, token store
+        handle or None), or None if the file could not be parsed
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext not in parser.scanners:
+        logger.warning(f"Unsupported file type: {ext}")
+        return None
+    
+    try:
+        cache_key = None
+        if parse_cache is not None:
+            cache_key = parse_cache.make_file_key(file_path, ext, window_size, winnow_window,
+                                                  rabin_karp.seed)
+            entry = parse_cache.get(cache_key)
+            if entry is not None:
+                distinct_tokens, token_indexes, fingerprints, kgram_hashes = entry
+                tokens = parser.vocabulary.encode(distinct_tokens)[token_indexes]
+                return tokens, fingerprints, kgram_hashes, None
+    except OSError as e:
+        logger.error(f"Error reading file {file_path}: {str(e)}")
+        return None
+    
+    blocks: List[np.ndarray] = []
+    distinct_hashes: List[np.ndarray] = []
+    handle = token_store.add(parser.vocabulary.encode([])) if token_store is not None else None
+    
+    def collect(stream: Iterable[np.ndarray]) -> Iterator[np.ndarray]:
+        for block in stream:
+            if handle is not None:
+                token_store.extend(handle, block)
+            else:
+                blocks.append(block)
+            yield block
+    
+    try:
+        fingerprints = rabin_karp.stream_fingerprint(
+            collect(parser.stream_file(file_path)), window_size, winnow_window,
+            on_hashes=lambda hashes: distinct_hashes.append(np.unique(hashes)))
+    except Exception as e:
+        if handle is not None:
+            token_store.remove(handle)
+        logger.error(f"Error parsing file {file_path}: {str(e)}")
+        return None
+    
+    if handle is not None:
+        tokens = token_store.get(handle)
+    else:
+        tokens = np.concatenate(blocks) if blocks else parser.vocabulary.encode([])
+    kgram_hashes = (np.unique(np.concatenate(distinct_hashes)) if distinct_hashes
+                    else np.empty(0, dtype=np.uint64))
+    
+    if cache_key is not None:
+        unique_ids, token_indexes = np.unique(tokens, return_inverse=True)
+        parse_cache.put(cache_key, parser.vocabulary.decode(unique_ids), token_indexes,
+                        fingerprints, kgram_hashes)
+    
+    return tokens, fingerprints, kgram_hashes, handle
+
+def _parse_content(parser: CodeParser, rabin_karp: RabinKarp,
+                   parse_cache: Optional[ParseCache], content: bytes, file_name: str,
+                   window_size: int, winnow_window: int) -> Optional[Tuple]:
+    """
+    Parse and fingerprint raw source bytes, using the parse cache if given.
+    
+    Args:
+        content: Raw bytes of the source file
+        file_name: Name or path of the file; its extension selects the language
+    
+    Returns:
+        Tuple of (token IDs, fingerprints, unique k-gram hashes), or None if
+        the content could not be parsed
+    """
+    ext = os.path.splitext(file_name)[1].lower()
+    
+    cache_key = None
+    if parse_cache is not None:
+        cache_key = parse_cache.make_key(content, ext, window_size, winnow_window, rabin_karp.seed)
+        entry = parse_cache.get(cache_key)
+        if entry is not None:
+            distinct_tokens, token_indexes, fingerprints, kgram_hashes = entry
+            tokens = parser.vocabulary.encode(distinct_tokens)[token_indexes]
+            return tokens, fingerprints, kgram_hashes
+    
+    try:
+        text = content.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+    except UnicodeDecodeError as e:
+        logger.error(f"Error parsing file {file_name}: {str(e)}")
+        return None
+    
+    tokens = parser.parse_source(text, ext)
+    if tokens is None:
+        return None
+    
+    tokens, fingerprints, kgram_hashes = _fingerprint_tokens(rabin_karp, tokens, window_size, winnow_window)
+    
+    if cache_key is not None:
+        unique_ids, token_indexes = np.unique(tokens, return_inverse=True)
+        parse_cache.put(cache_key, parser.vocabulary.decode(unique_ids), token_indexes,
+                        fingerprints, kgram_hashes)
+    
+    return tokens, fingerprints, kgram_hashes
+
+def _fingerprint_tokens(rabin_karp: RabinKarp, tokens: np.ndarray,
+                        window_size: int, winnow_window: int) -> Tuple:
+    """Compute the winnowed fingerprints and unique k-gram hashes of a token array."""
+    kgram_hashes = rabin_karp.kgram_hashes(tokens, window_size)
+    fingerprints = {value for value, _ in rabin_karp.winnow(kgram_hashes, winnow_window)}
+    return tokens, fingerprints, np.unique(kgram_hashes)
+
+def _read_bytes(file_path: str) -> bytes:
+    """Read a whole file as bytes."""
+    with open(file_path, 'rb') as f:
+        return f.read()
+
+def _file_sha256(file_path: str, chunk_size: int = 1 << 20) -> str:
+    """Hash a file in chunks, without holding its content in memory."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# Parser, hasher and cache owned by each worker process of the ingestion pool
+_worker_parser: Optional[CodeParser] = None
+_worker_rabin_karp: Optional[RabinKarp] = None
+_worker_parse_cache: Optional[ParseCache] = None
+
+def _init_worker(cache_dir: Optional[str] = None, stream_threshold: int = 8 << 20):
+    """Create the per-process parser, hasher and cache for pool workers."""
+    global _worker_parser, _worker_rabin_karp, _worker_parse_cache
+    _worker_parser = CodeParser(stream_threshold=stream_threshold)
+    _worker_rabin_karp = RabinKarp(vocabulary=_worker_parser.vocabulary)
+    # Size limits are enforced by the parent once the pool is done
+    _worker_parse_cache = (ParseCache(cache_dir, CodeParser.PARSER_VERSION, max_bytes=None)
+                           if cache_dir is not None else None)
+
+def _prepare_submission(file_path: str, window_size: int, winnow_window: int) -> Optional[Tuple]:
+    """
+    Parse and fingerprint a file inside a worker process.
+    
+    Token IDs are local to the worker's vocabulary, so the distinct tokens
+    are returned along with per-token indexes into them for the parent to
+    re-intern. Fingerprints use stable token hashes and can be used as is.
+    
+    Returns:
+        Tuple of (distinct tokens, token indexes, metadata, fingerprints,
+        unique k-gram hashes), or None if the file could not be parsed
+    """
+    prepared = _parse_and_fingerprint(_worker_parser, _worker_rabin_karp, _worker_parse_cache,
+                                      file_path, window_size, winnow_window)
+    if prepared is None:
+        return None
+    
+    tokens, metadata, fingerprints, kgram_hashes = prepared
+    unique_ids, token_indexes = np.unique(tokens, return_inverse=True)
+    return (_worker_parser.vocabulary.decode(unique_ids), token_indexes.astype(np.uint32),
+            metadata, fingerprints, kgram_hashes)
+
 class PlagiarismDetector:
-    def __init__(self, similarity_threshold: float = 0.7, window_size: int = 5):
+    SUPPORTED_EXTENSIONS = ('.py', '.java', '.cpp', '.c', '.h', '.js', '.ts', '.rb')
+    ENGINES = ('rabin_karp', 'gst')
+    
+    def __init__(self, similarity_threshold: float = 0.7, window_size: int = 5,
+                 winnow_window: int = 4, use_index: bool = True,
+                 cache_dir: Optional[str] = None,
+                 cache_max_bytes: Optional[int] = 512 * 1024 * 1024,
+                 metadata_path: Optional[str] = None,
+                 overwrite_metadata: bool = False,
+                 async_queue_size: int = 256, use_lsh: bool = False,
+                 lsh_bands: int = 32, lsh_rows: int = 4, engine: str = 'rabin_karp',
+                 min_match_length: Optional[int] = None):
         """
         Initialize the plagiarism detector.
         
         Args:
             similarity_threshold: Minimum similarity score to consider submissions similar (0.0 to 1.0)
-            window_size: Size of the sliding window for code comparison
+            window_size: Size of the sliding window for code comparison (k-gram length)
+            winnow_window: Number of consecutive k-grams per winnowing window
+            use_index: Use the fingerprint index to select comparison candidates
+                instead of comparing against every stored submission
+            cache_dir: Optional directory for the on-disk parse/fingerprint cache
+            cache_max_bytes: Size limit of the parse cache (None for no limit)
+            metadata_path: Optional file for a disk-backed, paged metadata
+                store; the store is kept in memory when not given. The file
+                only holds the metadata of this detector's submissions, whose
+                tokens, fingerprints and similarities live in memory
+            overwrite_metadata: Clear the records of an existing, non-empty
+                metadata file instead of raising ValueError
+            async_queue_size: Maximum number of submissions (and of unread
+                results) buffered by the asynchronous ingestion API
+            use_lsh: Select comparison candidates with MinHash LSH buckets
+                instead of the fingerprint index. Queries cost one bucket per
+                band, but pairs with low Jaccard similarity (a small file
+                contained in a much larger one) can be missed; see
+                lsh_recall_report
+            lsh_bands: Number of LSH bands
+            lsh_rows: Number of MinHash values per LSH band
+            engine: Comparison engine for candidate pairs: 'rabin_karp'
+                scores a pair when the whole earlier submission occurs in
+                the new one, 'gst' scores the tile coverage found by Greedy
+                String Tiling, which also catches reordered and partial copies
+            min_match_length: Minimum tile length of the 'gst' engine
+                (defaults to window_size + winnow_window - 1, the shortest
+                match guaranteed to share a winnowed fingerprint, so the
+                fingerprint index finds every pair with a tile)
         """
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unknown comparison engine: {engine}")
+        
         self.parser = CodeParser()
-        self.rabin_karp = RabinKarp()
+        self.rabin_karp = RabinKarp(vocabulary=self.parser.vocabulary)
+        self.engine = engine
+        self.string_tiling = GreedyStringTiling(
+            min_match_length if min_match_length is not None else window_size + winnow_window - 1)
         self.similarity_graph = SimilarityGraph(similarity_threshold=similarity_threshold)
-        self.metadata_store = BPlusTree()
+        self.metadata_store = (PagedBPlusTree(metadata_path) if metadata_path is not None
+                               else BPlusTree())
+        if len(self.metadata_store) > 0:
+            # Records of another detector's submissions
+            if not overwrite_metadata:
+                records = len(self.metadata_store)
+                self.metadata_store.close()
+                raise ValueError(f"Metadata file {metadata_path} already holds {records} records; "
+                                 f"pass overwrite_metadata=True to clear them")
+            logger.warning(f"Clearing {len(self.metadata_store)} records from {metadata_path}")
+            self.metadata_store.clear()
+        self.fingerprint_index = FingerprintIndex()
+        self.lsh = MinHashLSH(bands=lsh_bands, rows=lsh_rows) if use_lsh else None
         self.window_size = window_size
-        self.submissions: Dict[str, List[str]] = {}  # submission_id -> tokens
+        self.winnow_window = winnow_window
+        self.use_index = use_index
+        self.token_store = TokenStore()
+        self.submissions: Dict[str, int] = {}  # submission_id -> token store handle
+        self._short_submissions: Set[str] = set()  # submissions with fewer than window_size tokens
+        self._pending_metadata: Optional[Dict[str, Dict]] = None  # metadata buffered by batch_ingest
+        self._one_pass_ids: Optional[List[str]] = None  # submissions awaiting the one-pass comparison
+        self.async_queue_size = async_queue_size
+        self._ingest_queue: Optional[asyncio.Queue] = None
+        self._results_queue: Optional[asyncio.Queue] = None
+        self._ingest_task: Optional[asyncio.Task] = None
+        self._ingest_executor: Optional[ThreadPoolExecutor] = None
+        self._streaming_results = False
+        self._scan_state: Dict[str, Dict] = {}  # file path -> size, mtime_ns, sha256, submission_id
+        self._sequence: Dict[str, int] = {}  # submission_id -> position in ingestion order
+        self._next_sequence = 0
+        self.parse_cache = (ParseCache(cache_dir, CodeParser.PARSER_VERSION, max_bytes=cache_max_bytes)
+                            if cache_dir is not None else None)
     
     def add_submission(self, file_path: str, submission_id: str) -> bool:
         """
@@ -38,72 +345,775 @@ class PlagiarismDetector:
             bool: True if submission was added successfully
         """
         try:
-            # Parse the file
-            tokens = self.parser.parse_file(file_path)
-            if tokens is None:
+            if _should_stream(self.parser, file_path):
+                # Large files are streamed straight into the token store
+                prepared = _stream_and_fingerprint(self.parser, self.rabin_karp, self.parse_cache,
+                                                   file_path, self.window_size, self.winnow_window,
+                                                   self.token_store)
+                if prepared is None:
+                    logger.error(f"Failed to parse file: {file_path}")
+                    return False
+                
+                tokens, fingerprints, kgram_hashes, handle = prepared
+                return self._ingest_submission(submission_id, tokens,
+                                               self.parser.get_metadata(file_path),
+                                               fingerprints, kgram_hashes, handle)
+            
+            # Parse and fingerprint the file
+            prepared = _parse_and_fingerprint(self.parser, self.rabin_karp, self.parse_cache,
+                                              file_path, self.window_size, self.winnow_window)
+            if prepared is None:
                 logger.error(f"Failed to parse file: {file_path}")
                 return False
             
-            # Get file metadata
-            metadata = self.parser.get_metadata(file_path)
-            metadata['tokens'] = tokens
-            
-            # Add to similarity graph
-            self.similarity_graph.add_file(submission_id, metadata)
-            
-            # Store metadata
-            self.metadata_store.insert(submission_id, metadata)
-            
-            # Compare with existing submissions
-            self._compare_with_existing(submission_id, tokens)
-            
-            return True
+            tokens, metadata, fingerprints, kgram_hashes = prepared
+            return self._ingest_submission(submission_id, tokens, metadata,
+                                           fingerprints, kgram_hashes)
             
         except Exception as e:
             logger.error(f"Error adding submission {submission_id}: {str(e)}")
             return False
     
-    def _compare_with_existing(self, submission_id: str, tokens: List[str]):
-        """Compare a submission with all existing submissions."""
-        # Get all existing submissions
-        existing_submissions = self.metadata_store.range_search("", "zzzzzzzzzz")
+    def add_submissions(self, submissions: Iterable[Tuple[str, str]]) -> int:
+        """
+        Add many submissions, bulk loading their metadata.
+        
+        Args:
+            submissions: (file_path, submission_id) pairs
+        
+        Returns:
+            int: Number of submissions added successfully
+        """
+        added = 0
+        with self.batch_ingest():
+            for file_path, submission_id in submissions:
+                if self.add_submission(file_path, submission_id):
+                    added += 1
+        return added
+    
+    @contextmanager
+    def batch_ingest(self, one_pass: bool = False):
+        """
+        Buffer metadata store updates while many submissions are ingested.
+        
+        Submissions are compared, indexed and added to the graph as usual,
+        but their metadata is only written to the B+ Tree when the block
+        exits. Large batches rebuild the tree with BPlusTree.bulk_load instead
+        of inserting and splitting one key at a time.
+        
+        Args:
+            one_pass: Skip the per-submission comparisons and score the batch
+                in one pass over a corpus-wide suffix array when the block
+                exits (see compare_in_one_pass)
+        """
+        if self._pending_metadata is not None:
+            # Nested batch: the outermost one flushes
+            yield
+            return
+        
+        self._pending_metadata = {}
+        if one_pass:
+            self._one_pass_ids = []
+        try:
+            yield
+        finally:
+            batch_ids, self._one_pass_ids = self._one_pass_ids, None
+            pending, self._pending_metadata = self._pending_metadata, None
+            self._flush_metadata(pending)
+            if batch_ids:
+                self.compare_in_one_pass(batch_ids)
+    
+    def _flush_metadata(self, pending: Dict[str, Dict]):
+        """Write buffered metadata to the metadata store."""
+        if not pending:
+            return
+        
+        if len(pending) * 4 < len(self.metadata_store) or \
+                isinstance(self.metadata_store, PagedBPlusTree):
+            # Small batch relative to the store: rebuilding would cost more.
+            # The paged store is always updated in place.
+            for submission_id in sorted(pending):
+                self.metadata_store.insert(submission_id, pending[submission_id])
+            return
+        
+        merged = dict(self.metadata_store.iter_all())
+        merged.update(pending)
+        self.metadata_store = BPlusTree.bulk_load(sorted(merged.items()),
+                                                  order=self.metadata_store.order)
+    
+    def _lookup_metadata(self, submission_id: str) -> Optional[Dict]:
+        """Get the metadata of a submission, including ones not yet flushed."""
+        if self._pending_metadata and submission_id in self._pending_metadata:
+            return self._pending_metadata[submission_id]
+        return self.metadata_store.search(submission_id)
+    
+    def _iter_submission_ids(self) -> Iterator[str]:
+        """Lazily yield the sorted IDs of all stored submissions, including buffered ones."""
+        stored_ids = (key for key, _ in self.metadata_store.iter_all())
+        if not self._pending_metadata:
+            yield from stored_ids
+            return
+        
+        previous = None
+        for submission_id in heapq.merge(stored_ids, sorted(self._pending_metadata)):
+            if submission_id != previous:
+                yield submission_id
+            previous = submission_id
+    
+    def _ingest_submission(self, submission_id: str, tokens: np.ndarray, metadata: Dict,
+                           fingerprints: Optional[Set[int]] = None,
+                           kgram_hashes: Optional[np.ndarray] = None,
+                           handle: Optional[int] = None) -> bool:
+        """
+        Store a parsed submission and compare it with existing ones.
+        
+        Fingerprints and k-gram hashes are computed here unless they were
+        already produced by the caller. The tokens go to the token store
+        (unless the caller already stored them under handle) and the
+        metadata only keeps their handle. An existing submission with
+        the same ID is replaced in place, keeping its position in the
+        ingestion order.
+        """
+        if submission_id in self.submissions:
+            self._remove_submission(submission_id, keep_sequence=True)
+        if submission_id not in self._sequence:
+            self._sequence[submission_id] = self._next_sequence
+            self._next_sequence += 1
+        
+        if handle is None:
+            handle = self.token_store.add(tokens)
+        tokens = self.token_store.get(handle)
+        metadata['token_handle'] = handle
+        metadata['token_count'] = len(tokens)
         
-        for existing_id, metadata in existing_submissions:
-            if existing_id == submission_id:
+        # Add to similarity graph (metadata is only kept in the metadata store)
+        self.similarity_graph.add_file(submission_id)
+        
+        # Store metadata
+        if self._pending_metadata is not None:
+            self._pending_metadata[submission_id] = metadata
+        else:
+            self.metadata_store.insert(submission_id, metadata)
+        
+        if len(tokens) >= self.window_size and fingerprints is None:
+            fingerprints = self.rabin_karp.fingerprint(tokens, self.window_size, self.winnow_window)
+        
+        signature = None
+        if self.lsh is not None and len(tokens) >= self.window_size:
+            if kgram_hashes is None:
+                kgram_hashes = self.rabin_karp.kgram_hashes(tokens, self.window_size)
+            signature = self.lsh.signature(kgram_hashes)
+        
+        # Compare with existing submissions (deferred in one-pass batches)
+        if self._one_pass_ids is not None:
+            self._one_pass_ids.append(submission_id)
+        else:
+            self._compare_with_existing(submission_id, tokens, kgram_hashes, signature)
+            if self._sequence[submission_id] < self._next_sequence - 1:
+                # A replaced submission is also compared with the ones added after it
+                self._compare_with_later(submission_id, tokens, fingerprints)
+        
+        # Make the submission visible to later comparisons
+        self._index_submission(submission_id, handle, tokens, fingerprints, signature)
+        
+        return True
+    
+    def _index_submission(self, submission_id: str, handle: int, tokens: np.ndarray,
+                          fingerprints: Optional[Set[int]] = None,
+                          signature: Optional[np.ndarray] = None):
+        """Add a submission's winnowed fingerprints (and MinHash signature) to the indexes."""
+        self.submissions[submission_id] = handle
+        
+        if len(tokens) < self.window_size:
+            # Too short to produce a k-gram, so it can never be found through
+            # the index and is always compared directly
+            self.fingerprint_index.remove(submission_id)
+            self._short_submissions.add(submission_id)
+            return
+        
+        self._short_submissions.discard(submission_id)
+        self.fingerprint_index.add(submission_id, fingerprints)
+        if signature is not None:
+            self.lsh.add(submission_id, signature)
+    
+    def _find_candidates(self, submission_id: str, tokens: np.ndarray,
+                         kgram_hashes: Optional[np.ndarray] = None,
+                         signature: Optional[np.ndarray] = None) -> List[str]:
+        """
+        Select the stored submissions worth comparing against a new one.
+        
+        A stored submission can only be found inside the new token stream if
+        all of its k-grams occur there, so probing the index with every k-gram
+        hash of the new submission finds it through any of its fingerprints.
+        With LSH enabled, the candidates are the submissions sharing a band
+        bucket with the new signature instead.
+        """
+        if signature is not None:
+            candidates = self.lsh.query(signature)
+        else:
+            if kgram_hashes is None:
+                kgram_hashes = self.rabin_karp.kgram_hashes(tokens, self.window_size)
+            candidates = set(self.fingerprint_index.candidates(np.unique(kgram_hashes).tolist()))
+        candidates.update(self._short_submissions)
+        candidates.discard(submission_id)
+        return sorted(candidates)
+    
+    def _compare_with_existing(self, submission_id: str, tokens: np.ndarray,
+                               kgram_hashes: Optional[np.ndarray] = None,
+                               signature: Optional[np.ndarray] = None):
+        """Compare a submission with existing submissions."""
+        if self.use_index or self.lsh is not None:
+            existing_ids = self._find_candidates(submission_id, tokens, kgram_hashes, signature)
+        else:
+            # Walk all existing submissions lazily
+            existing_ids = (
+                existing_id
+                for existing_id in self._iter_submission_ids()
+                if existing_id in self.submissions
+            )
+        
+        sequence = self._sequence[submission_id]
+        for existing_id in existing_ids:
+            if existing_id == submission_id or self._sequence[existing_id] > sequence:
                 continue
             
-            # Compare tokens using sliding window
-            existing_tokens = metadata['tokens']
-            matches = self.rabin_karp.find_matches(tokens, existing_tokens)
-            
-            if matches:
-                # Calculate overall similarity
-                similarity = max(score for _, score in matches)
+            existing_tokens = self.token_store.get(self.submissions[existing_id])
+            similarity = self._compare_pair(tokens, existing_tokens)
+            if similarity is not None:
                 self.similarity_graph.add_similarity(submission_id, existing_id, similarity)
     
-    def process_directory(self, directory_path: str) -> int:
+    def compare_in_one_pass(self, submission_ids: Optional[Iterable[str]] = None,
+                            max_owners: Optional[int] = 64) -> int:
+        """
+        Score submissions against the whole corpus with one suffix array pass.
+        
+        A generalized suffix array is built over the token streams of all
+        stored submissions (see FragmentIndex), and the k-gram positions
+        every pair has in common are counted in one scan instead of
+        comparing pairs one by one. A pair involving at least one of the
+        given submissions is scored with its shared k-gram coverage,
+        (shared in first + shared in second) / (k-grams of both), and added
+        to the similarity graph. Scores are symmetric, so they differ from
+        the containment scores of the 'rabin_karp' engine.
+        
+        Args:
+            submission_ids: Submissions to score (default: all)
+            max_owners: Ignore k-grams shared by more submissions than this,
+                such as boilerplate, which would otherwise touch a quadratic
+                number of pairs (None for no limit)
+        
+        Returns:
+            int: Number of pairs scored
+        """
+        targets = set(self.submissions if submission_ids is None else submission_ids)
+        
+        ordered_ids = sorted(self.submissions, key=self._sequence.get)
+        fragment_index = FragmentIndex(
+            ((submission_id, self.token_store.get(self.submissions[submission_id]))
+             for submission_id in ordered_ids),
+            window_size=self.window_size)
+        
+        scored = 0
+        for (first_id, second_id), (first_shared, second_shared) in \
+                fragment_index.shared_kgram_counts(max_owners).items():
+            if first_id not in targets and second_id not in targets:
+                continue
+            total = fragment_index.kgram_count(first_id) + fragment_index.kgram_count(second_id)
+            # Edges point from the later submission, like per-pair comparisons
+            self.similarity_graph.add_similarity(second_id, first_id,
+                                                 (first_shared + second_shared) / total)
+            scored += 1
+        return scored
+    
+    def find_shared_fragments(self, min_length: Optional[int] = None) -> Iterator[Tuple]:
+        """
+        List every token fragment that appears in more than one submission.
+        
+        Args:
+            min_length: Minimum fragment length (defaults to window_size)
+        
+        Yields:
+            Tuples of (token IDs, sorted owner IDs, list of (owner ID,
+            start offset) occurrences); token IDs can be decoded with
+            parser.vocabulary
+        """
+        fragment_index = FragmentIndex(
+            ((submission_id, self.token_store.get(handle))
+             for submission_id, handle in self.submissions.items()),
+            window_size=self.window_size)
+        yield from fragment_index.shared_fragments(min_length)
+    
+    def _compare_pair(self, tokens: np.ndarray, existing_tokens: np.ndarray) -> Optional[float]:
+        """
+        Score a submission against an earlier one with the configured engine.
+        
+        Returns:
+            Similarity score, or None if the engine found no match
+        """
+        if self.engine == 'gst':
+            similarity = self.string_tiling.similarity(tokens, existing_tokens)
+            return similarity if similarity > 0 else None
+        
+        # Compare token ID arrays using the vectorized 64-bit rolling hash
+        matches = self.rabin_karp.find_matches(tokens, existing_tokens)
+        if not matches:
+            return None
+        return max(score for _, score in matches)
+    
+    def _compare_with_later(self, submission_id: str, tokens: np.ndarray,
+                            fingerprints: Optional[Set[int]] = None):
+        """
+        Compare a replaced submission with the submissions added after it.
+        
+        Those were originally checked for containing the old version, so
+        they are now checked for containing the new one. A later submission
+        containing all of it shares at least one winnowed fingerprint once
+        it spans a full winnowing window, so the index narrows the search;
+        shorter submissions are compared with every later one.
+        """
+        sequence = self._sequence[submission_id]
+        if self.use_index and len(tokens) >= self.window_size + self.winnow_window - 1:
+            later_ids = sorted(self.fingerprint_index.candidates(fingerprints))
+        else:
+            later_ids = list(self.submissions)
+        
+        for later_id in later_ids:
+            if later_id == submission_id or self._sequence[later_id] < sequence:
+                continue
+            
+            later_tokens = self.token_store.get(self.submissions[later_id])
+            similarity = self._compare_pair(later_tokens, tokens)
+            if similarity is not None:
+                self.similarity_graph.add_similarity(later_id, submission_id, similarity)
+    
+    def _iter_source_files(self, directory_path: str) -> Iterator[str]:
+        """Yield the paths of supported code files under a directory."""
+        for root, _, files in os.walk(directory_path):
+            for file in files:
+                if file.endswith(self.SUPPORTED_EXTENSIONS):
+                    yield os.path.join(root, file)
+    
+    def process_directory(self, directory_path: str, jobs: Optional[int] = 1,
+                          one_pass: bool = False) -> int:
         """
         Process all code files in a directory.
         
         Args:
             directory_path: Path to the directory containing submissions
+            jobs: Number of worker processes used for parsing and
+                fingerprinting (None for one per CPU). Results are applied in
+                directory order, so submission IDs and scores match the
+                serial run.
+            one_pass: Score the directory in one pass over a corpus-wide
+                suffix array instead of comparing each file with its
+                candidates (see compare_in_one_pass)
+        
+        Metadata of the whole directory is bulk loaded into the metadata
+        store once all files are ingested (see batch_ingest).
         
         Returns:
             int: Number of files processed successfully
         """
+        if jobs is None:
+            jobs = os.cpu_count() or 1
+        
+        with self.batch_ingest(one_pass=one_pass):
+            if jobs > 1:
+                return self._process_files_parallel(self._iter_source_files(directory_path), jobs)
+            
+            processed_count = 0
+            
+            for file_path in self._iter_source_files(directory_path):
+                submission_id = self._make_submission_id(file_path, processed_count)
+                
+                if self.add_submission(file_path, submission_id):
+                    processed_count += 1
+            
+            return processed_count
+    
+    def rescan_directory(self, directory_path: str, jobs: Optional[int] = 1) -> Dict:
+        """
+        Incrementally bring the detector in sync with a directory.
+        
+        The size, modification time and SHA-256 of every file seen by
+        previous rescans are remembered. Unchanged files are skipped (the
+        hash is only computed when size or mtime differ), modified files
+        are replaced (see replace_submission), new files are added and files
+        that disappeared are removed from the graph, index and stores.
+        Submission IDs are derived from the path relative to the directory,
+        so they stay stable across rescans.
+        
+        A file that cannot be read or parsed is reported as 'failed'. Its
+        previous version, if any, is removed rather than kept stale, and
+        the file is retried as a new one on the next rescan.
+        
+        Args:
+            directory_path: Path to the directory containing submissions
+            jobs: Number of worker processes for parsing new and modified
+                files (None for one per CPU)
+        
+        Returns:
+            Dictionary with the IDs of 'added', 'modified', 'removed' and
+            'failed' submissions and the number of 'unchanged' files
+        """
+        if jobs is None:
+            jobs = os.cpu_count() or 1
+        
+        directory_path = os.path.abspath(directory_path)
+        changed: List[Tuple[str, Dict]] = []
+        seen = set()
+        failed = []
+        unchanged = 0
+        
+        for file_path in self._iter_source_files(directory_path):
+            seen.add(file_path)
+            try:
+                stat = os.stat(file_path)
+            except OSError as e:
+                logger.error(f"Error reading file {file_path}: {str(e)}")
+                failed.append(self._drop_failed_scan(directory_path, file_path))
+                continue
+            
+            state = self._scan_state.get(file_path)
+            if state is not None and state['size'] == stat.st_size and state['mtime_ns'] == stat.st_mtime_ns:
+                unchanged += 1
+                continue
+            
+            try:
+                digest = _file_sha256(file_path)
+            except OSError as e:
+                logger.error(f"Error reading file {file_path}: {str(e)}")
+                failed.append(self._drop_failed_scan(directory_path, file_path))
+                continue
+            
+            if state is not None and state['sha256'] == digest:
+                # Touched but not changed
+                state['mtime_ns'] = stat.st_mtime_ns
+                unchanged += 1
+                continue
+            
+            changed.append((file_path, {
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns,
+                'sha256': digest,
+                'submission_id': self._stable_submission_id(directory_path, file_path)
+            }))
+        
+        removed = []
+        for file_path in [p for p in self._scan_state if p.startswith(directory_path + os.sep) and p not in seen]:
+            submission_id = self._scan_state.pop(file_path)['submission_id']
+            self._remove_submission(submission_id)
+            removed.append(submission_id)
+        
+        # Modified files are replaced in place when they are ingested, so
+        # success is detected by a new token store handle
+        previous_handles = {state['submission_id']: self.submissions.get(state['submission_id'])
+                            for _, state in changed}
+        states = dict(changed)
+        with self.batch_ingest():
+            if jobs > 1:
+                self._process_files_parallel(iter(states), jobs,
+                                             lambda file_path, _: states[file_path]['submission_id'])
+            else:
+                for file_path, state in changed:
+                    self.add_submission(file_path, state['submission_id'])
+        
+        added = []
+        modified = []
+        for file_path, state in changed:
+            submission_id = state['submission_id']
+            if self.submissions.get(submission_id) not in (None, previous_handles[submission_id]):
+                (modified if file_path in self._scan_state else added).append(submission_id)
+                self._scan_state[file_path] = state
+            else:
+                failed.append(self._drop_failed_scan(directory_path, file_path))
+        
+        return {'added': added, 'modified': modified, 'removed': removed,
+                'failed': failed, 'unchanged': unchanged}
+    
+    def _drop_failed_scan(self, directory_path: str, file_path: str) -> str:
+        """Forget a file that failed to rescan and remove its stale submission."""
+        state = self._scan_state.pop(file_path, None)
+        if state is not None:
+            self._remove_submission(state['submission_id'])
+            return state['submission_id']
+        return self._stable_submission_id(directory_path, file_path)
+    
+    def _stable_submission_id(self, directory_path: str, file_path: str) -> str:
+        """Build a submission ID that depends only on the file's relative path."""
+        relative_path = os.path.relpath(file_path, directory_path).replace(os.sep, '/')
+        path_hash = hashlib.sha1(relative_path.encode('utf-8')).hexdigest()[:8]
+        return f"{os.path.splitext(os.path.basename(file_path))[0]}_{path_hash}"
+    
+    def remove_submission(self, submission_id: str) -> bool:
+        """
+        Withdraw a submission.
+        
+        The submission's tokens, fingerprints, metadata and similarity edges
+        are removed, and only the clusters of its connected component are
+        recomputed.
+        
+        Args:
+            submission_id: ID of the submission to remove
+        
+        Returns:
+            bool: True if the submission existed
+        """
+        metadata = self._lookup_metadata(submission_id)
+        if not self._remove_submission(submission_id):
+            return False
+        
+        # Forget the file in rescans so it is not treated as unchanged
+        file_path = metadata.get('file_path') if metadata else None
+        state = self._scan_state.get(file_path)
+        if state is not None and state['submission_id'] == submission_id:
+            del self._scan_state[file_path]
+        return True
+    
+    def replace_submission(self, submission_id: str, file_path: str) -> bool:
+        """
+        Replace a submission with a new version of the file.
+        
+        The new version keeps the submission's position in the ingestion
+        order: it is checked for containing the submissions added before it,
+        and the ones added after it are checked for containing it, which
+        gives the same edges as rebuilding the detector with the new file.
+        Only index candidates are compared. An unknown ID is added as the
+        newest submission.
+        
+        Args:
+            submission_id: ID of the submission to replace
+            file_path: Path to the new version of the file
+        
+        Returns:
+            bool: True if the new version was ingested; the old version is
+            kept if the file cannot be parsed
+        """
+        return self.add_submission(file_path, submission_id)
+    
+    def _remove_submission(self, submission_id: str, keep_sequence: bool = False) -> bool:
+        """Remove a submission from the stores, the index and the graph."""
+        handle = self.submissions.pop(submission_id, None)
+        if handle is None:
+            return False
+        
+        if not keep_sequence:
+            del self._sequence[submission_id]
+        self.token_store.remove(handle)
+        self.fingerprint_index.remove(submission_id)
+        if self.lsh is not None:
+            self.lsh.remove(submission_id)
+        self._short_submissions.discard(submission_id)
+        if self._pending_metadata is not None:
+            self._pending_metadata.pop(submission_id, None)
+        self.metadata_store.delete(submission_id)
+        self.similarity_graph.remove_file(submission_id)
+        return True
+    
+    def _make_submission_id(self, file_path: str, processed_count: int) -> str:
+        """Build the submission ID for the n-th successfully processed file."""
+        return f"{os.path.splitext(os.path.basename(file_path))[0]}_{processed_count}"
+    
+    def _process_files_parallel(self, file_paths: Iterator[str], jobs: int,
+                                make_submission_id: Optional[Callable[[str, int], str]] = None) -> int:
+        """
+        Parse and fingerprint files in a process pool and ingest the results.
+        
+        At most a few tasks per worker are in flight, and results are consumed
+        in submission order by this process, which is the only writer to the
+        index, graph and metadata store.
+        """
+        if make_submission_id is None:
+            make_submission_id = self._make_submission_id
         processed_count = 0
+        max_pending = jobs * 4
         
-        for root, _, files in os.walk(directory_path):
-            for file in files:
-                if file.endswith(('.py', '.java', '.cpp', '.c', '.h', '.js', '.ts', '.rb')):
-                    file_path = os.path.join(root, file)
-                    submission_id = f"{os.path.splitext(file)[0]}_{processed_count}"
+        cache_dir = self.parse_cache.cache_dir if self.parse_cache is not None else None
+        
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=(cache_dir, self.parser.stream_threshold)) as executor:
+            def submit(file_path):
+                return file_path, executor.submit(_prepare_submission, file_path,
+                                                  self.window_size, self.winnow_window)
+            
+            pending = deque(submit(file_path) for file_path in itertools.islice(file_paths, max_pending))
+            
+            while pending:
+                file_path, future = pending.popleft()
+                next_path = next(file_paths, None)
+                if next_path is not None:
+                    pending.append(submit(next_path))
+                
+                submission_id = make_submission_id(file_path, processed_count)
+                try:
+                    prepared = future.result()
+                    if prepared is None:
+                        logger.error(f"Failed to parse file: {file_path}")
+                        continue
                     
-                    if self.add_submission(file_path, submission_id):
+                    distinct_tokens, token_indexes, metadata, fingerprints, kgram_hashes = prepared
+                    tokens = self.parser.vocabulary.encode(distinct_tokens)[token_indexes]
+                    if self._ingest_submission(submission_id, tokens, metadata,
+                                               fingerprints, kgram_hashes):
                         processed_count += 1
+                
+                except Exception as e:
+                    logger.error(f"Error adding submission {submission_id}: {str(e)}")
+        
+        if self.parse_cache is not None:
+            self.parse_cache.refresh()
         
         return processed_count
     
+    async def submit(self, source: Union[str, bytes], submission_id: str,
+                     file_name: Optional[str] = None) -> asyncio.Future:
+        """
+        Queue a submission for asynchronous ingestion.
+        
+        Waits while async_queue_size submissions are already queued, so a
+        fast producer is slowed down to the ingestion rate instead of
+        growing memory. Files are read in the event loop's default executor
+        and parsing, fingerprinting and comparison run on a single ingestion
+        thread, which is the only writer to the detector's state. Files
+        larger than the parser's stream_threshold are streamed chunk by
+        chunk; smaller files and raw bytes are held whole while they are
+        parsed, so raw bytes submissions are not bounded in memory. Do not
+        call the synchronous add methods while asynchronous ingestion is
+        running.
+        
+        Args:
+            source: Path of the file, or its raw bytes
+            submission_id: Unique identifier for the submission
+            file_name: Name of the file; required for raw bytes, where its
+                extension selects the language
+        
+        Returns:
+            Future resolved with the submission's result (see results())
+        """
+        if isinstance(source, (bytes, bytearray)) and file_name is None:
+            raise ValueError("file_name is required when submitting raw bytes")
+        
+        self._start_ingestion()
+        future = asyncio.get_running_loop().create_future()
+        await self._ingest_queue.put((source, submission_id, file_name, future))
+        return future
+    
+    async def results(self) -> AsyncIterator[Dict]:
+        """
+        Stream the results of asynchronously ingested submissions.
+        
+        Results are produced in submission order while an iterator is
+        active; at most async_queue_size unread results are buffered before
+        ingestion waits for the reader. The stream ends after aclose().
+        Only one reader is supported.
+        
+        Yields:
+            Dictionaries with 'submission_id', 'success', 'similar' (list of
+            (submission_id, similarity) tuples) and, on failure, 'error'
+        """
+        self._start_ingestion()
+        self._streaming_results = True
+        try:
+            while True:
+                result = await self._results_queue.get()
+                if result is None:
+                    return
+                yield result
+        finally:
+            self._streaming_results = False
+    
+    async def drain(self):
+        """Wait until every queued submission has been ingested."""
+        if self._ingest_queue is not None:
+            await self._ingest_queue.join()
+    
+    async def aclose(self):
+        """Finish queued submissions, end the results stream and stop ingestion."""
+        if self._ingest_task is None:
+            return
+        
+        await self._ingest_queue.put(None)
+        await self._ingest_task
+        if self._streaming_results:
+            await self._results_queue.put(None)
+        self._ingest_executor.shutdown(wait=True)
+        self._ingest_queue = None
+        self._results_queue = None
+        self._ingest_task = None
+        self._ingest_executor = None
+    
+    def _start_ingestion(self):
+        """Create the queues, ingestion thread and consumer task on first use."""
+        if self._ingest_task is not None:
+            return
+        self._ingest_queue = asyncio.Queue(maxsize=self.async_queue_size)
+        self._results_queue = asyncio.Queue(maxsize=self.async_queue_size)
+        self._ingest_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ingest')
+        self._ingest_task = asyncio.get_running_loop().create_task(self._ingest_loop())
+    
+    async def _ingest_loop(self):
+        """Consume queued submissions one at a time until the stop marker."""
+        loop = asyncio.get_running_loop()
+        
+        while True:
+            item = await self._ingest_queue.get()
+            if item is None:
+                self._ingest_queue.task_done()
+                return
+            
+            source, submission_id, file_name, future = item
+            try:
+                if isinstance(source, str) and _should_stream(self.parser, source):
+                    result = await loop.run_in_executor(self._ingest_executor, self._ingest_file,
+                                                        submission_id, source)
+                elif isinstance(source, str):
+                    content = await loop.run_in_executor(None, _read_bytes, source)
+                    result = await loop.run_in_executor(self._ingest_executor, self._ingest_content,
+                                                        submission_id, content, source, source)
+                else:
+                    result = await loop.run_in_executor(self._ingest_executor, self._ingest_content,
+                                                        submission_id, bytes(source), file_name, None)
+            except Exception as e:
+                logger.error(f"Error adding submission {submission_id}: {str(e)}")
+                result = {'submission_id': submission_id, 'success': False, 'similar': [], 'error': str(e)}
+            finally:
+                self._ingest_queue.task_done()
+            
+            if not future.done():
+                future.set_result(result)
+            if self._streaming_results:
+                await self._results_queue.put(result)
+    
+    def _ingest_file(self, submission_id: str, file_path: str) -> Dict:
+        """Stream a large file into the detector on the ingestion thread."""
+        if not self.add_submission(file_path, submission_id):
+            return {'submission_id': submission_id, 'success': False, 'similar': [],
+                    'error': f"Failed to parse file: {file_path}"}
+        return {
+            'submission_id': submission_id,
+            'success': True,
+            'similar': self.similarity_graph.find_similar_files(submission_id)
+        }
+    
+    def _ingest_content(self, submission_id: str, content: bytes, file_name: str,
+                        file_path: Optional[str]) -> Dict:
+        """Parse, fingerprint and ingest source bytes on the ingestion thread."""
+        prepared = _parse_content(self.parser, self.rabin_karp, self.parse_cache, content,
+                                  file_name, self.window_size, self.winnow_window)
+        if prepared is None:
+            return {'submission_id': submission_id, 'success': False, 'similar': [],
+                    'error': f"Failed to parse file: {file_name}"}
+        
+        tokens, fingerprints, kgram_hashes = prepared
+        metadata = (self.parser.get_metadata(file_path) if file_path is not None
+                    else self.parser.get_content_metadata(file_name, content))
+        success = self._ingest_submission(submission_id, tokens, metadata, fingerprints, kgram_hashes)
+        return {
+            'submission_id': submission_id,
+            'success': success,
+            'similar': self.similarity_graph.find_similar_files(submission_id)
+        }
+    
     def find_plagiarism_clusters(self) -> List[Dict]:
         """
         Find clusters of similar submissions.
@@ -118,7 +1128,7 @@ class PlagiarismDetector:
             # Get metadata for each submission in the cluster
             cluster_metadata = []
             for submission_id in cluster:
-                metadata = self.metadata_store.search(submission_id)
+                metadata = self._lookup_metadata(submission_id)
                 if metadata:
                     cluster_metadata.append(metadata)
             
@@ -130,33 +1140,141 @@ class PlagiarismDetector:
         
         return result
     
-    def get_similarity_matrix(self) -> Tuple[List[str], List[List[float]]]:
+    def get_submission_cluster(self, submission_id: str) -> Set[str]:
+        """
+        Get the cluster a submission currently belongs to.
+        
+        Clusters are maintained as submissions are added, so this is cheap
+        to call while a batch is still being ingested.
+        
+        Args:
+            submission_id: ID of the submission
+        
+        Returns:
+            Set of submission IDs in the cluster (empty if unknown)
+        """
+        return self.similarity_graph.get_cluster_of(submission_id)
+    
+    def get_similarity_matrix(self, output: str = 'list') -> Tuple[List[str], object]:
         """
         Get the similarity matrix for all submissions.
         
+        The matrix is built from the similarity graph's edge list in O(E).
+        
+        Args:
+            output: 'list' for a list of lists, 'dense' for a NumPy array or
+                'sparse' for a scipy.sparse CSR matrix
+        
         Returns:
             Tuple of (submission_ids, similarity_matrix)
         """
+        if output not in ('list', 'dense', 'sparse'):
+            raise ValueError(f"Unknown similarity matrix output: {output}")
+        
         # Get all submissions
-        submissions = self.metadata_store.range_search("", "zzzzzzzzzz")
-        submission_ids = [s[0] for s in submissions]
-        
-        # Create similarity matrix
-        n = len(submission_ids)
-        matrix = [[0.0 for _ in range(n)] for _ in range(n)]
-        
-        # Fill matrix with similarity scores
-        for i, id1 in enumerate(submission_ids):
-            for j, id2 in enumerate(submission_ids):
-                if i != j:
-                    similar_files = self.similarity_graph.find_similar_files(id1)
-                    for similar_id, score in similar_files:
-                        if similar_id == id2:
-                            matrix[i][j] = score
-                            break
+        submission_ids = list(self._iter_submission_ids())
+        
+        matrix = self.similarity_graph.similarity_matrix(submission_ids, dense=(output != 'sparse'))
+        if output == 'list':
+            matrix = matrix.tolist()
         
         return submission_ids, matrix
     
+    def lsh_recall_report(self, bands: Optional[int] = None, rows: Optional[int] = None) -> Dict:
+        """
+        Measure the recall of LSH candidate selection against exhaustive comparison.
+        
+        The stored submissions are replayed in ingestion order. Each one is
+        compared with every earlier submission using RabinKarp.find_matches,
+        and a matching pair counts as found when the earlier submission would
+        have been an LSH candidate (submissions too short for a k-gram are
+        always compared). Any band and row configuration can be measured
+        without re-ingesting.
+        
+        Args:
+            bands: Number of LSH bands (defaults to the detector's setting)
+            rows: Number of MinHash values per band (defaults to the
+                detector's setting)
+        
+        Returns:
+            Dictionary with the configuration, the number of matching and
+            found pairs, the recall, the average number of candidates per
+            submission and the time spent on both paths
+        """
+        if bands is None:
+            bands = self.lsh.bands if self.lsh is not None else 32
+        if rows is None:
+            rows = self.lsh.rows if self.lsh is not None else 4
+        lsh = MinHashLSH(bands=bands, rows=rows)
+        
+        short_ids = set()
+        earlier_ids: List[str] = []
+        matching_pairs = 0
+        found_pairs = 0
+        total_candidates = 0
+        exhaustive_time = 0.0
+        lsh_time = 0.0
+        
+        for submission_id in sorted(self.submissions, key=self._sequence.get):
+            tokens = self.token_store.get(self.submissions[submission_id])
+            
+            start_time = time.time()
+            signature = None
+            candidates: Set[str] = set()
+            if len(tokens) >= self.window_size:
+                signature = lsh.signature(self.rabin_karp.kgram_hashes(tokens, self.window_size))
+                candidates = lsh.query(signature)
+            total_candidates += len(candidates)
+            lsh_time += time.time() - start_time
+            
+            start_time = time.time()
+            for earlier_id in earlier_ids:
+                earlier_tokens = self.token_store.get(self.submissions[earlier_id])
+                if self.rabin_karp.find_matches(tokens, earlier_tokens):
+                    matching_pairs += 1
+                    if earlier_id in candidates or earlier_id in short_ids:
+                        found_pairs += 1
+            exhaustive_time += time.time() - start_time
+            
+            if signature is not None:
+                lsh.add(submission_id, signature)
+            else:
+                short_ids.add(submission_id)
+            earlier_ids.append(submission_id)
+        
+        return {
+            'bands': bands,
+            'rows': rows,
+            'threshold': lsh.threshold,
+            'submissions': len(earlier_ids),
+            'matching_pairs': matching_pairs,
+            'found_pairs': found_pairs,
+            'recall': found_pairs / matching_pairs if matching_pairs else 1.0,
+            'avg_candidates': total_candidates / len(earlier_ids) if earlier_ids else 0.0,
+            'exhaustive_time': exhaustive_time,
+            'lsh_time': lsh_time
+        }
+    
+    def get_tokens(self, submission_id: str) -> Optional[np.ndarray]:
+        """
+        Get the token IDs of a submission.
+        
+        Args:
+            submission_id: ID of the submission
+        
+        Returns:
+            Read-only uint32 array of token IDs, or None if unknown
+        """
+        handle = self.submissions.get(submission_id)
+        if handle is None:
+            return None
+        return self.token_store.get(handle)
+    
+    def close(self):
+        """Flush and close the disk-backed metadata store, if one is used."""
+        if isinstance(self.metadata_store, PagedBPlusTree):
+            self.metadata_store.close()
+    
     def get_submission_metadata(self, submission_id: str) -> Dict:
         """Get metadata for a specific submission."""
-        return self.metadata_store.search(submission_id) or {} 
\ No newline at end of file
+        return self._lookup_metadata(submission_id) or {} 
\ No newline at end of file
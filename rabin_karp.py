@@ -1,63 +1,152 @@
-from typing import List, Dict, Set, Optional, Tuple
+from typing import List, Dict, Set, Optional, Tuple, Sequence, Union, Iterable, Callable
 import logging
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import time
+import hashlib
+import threading
+from array import array
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from lru_cache import LRUCache
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+MASK_64 = (1 << 64) - 1
+
+# Default seed for stable token hashing
+DEFAULT_HASH_SEED = 0x9E3779B97F4A7C15
+
+def stable_token_hash(token: str, seed: int = DEFAULT_HASH_SEED) -> int:
+    """
+    Compute a seeded 64-bit hash of a token.
+    
+    Unlike the built-in hash(), which is salted per interpreter
+    (PYTHONHASHSEED), the result is identical across processes and runs, so
+    fingerprints derived from it can be cached on disk or shared between
+    worker processes.
+    
+    Args:
+        token: Token to hash
+        seed: 64-bit seed selecting the hash function
+    
+    Returns:
+        Unsigned 64-bit hash value
+    """
+    digest = hashlib.blake2b(token.encode('utf-8'), digest_size=8,
+                             key=(seed & MASK_64).to_bytes(8, 'little')).digest()
+    return int.from_bytes(digest, 'little')
+
+def mix64(values: np.ndarray, seed: int = DEFAULT_HASH_SEED) -> np.ndarray:
+    """
+    Seeded 64-bit mix (splitmix64 finalizer) of an integer array.
+    
+    Args:
+        values: uint64 array to mix
+        seed: 64-bit seed
+    
+    Returns:
+        uint64 array of mixed values
+    """
+    z = values ^ np.uint64(seed & MASK_64)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+# Token lists (classic mode) or integer token arrays (vectorized mode)
+TokenSequence = Union[Sequence[str], np.ndarray]
+
 class RabinKarp:
-    def __init__(self, base: int = 256, prime: int = 101):
+    # Odd multiplier for the vectorized 64-bit hash (the 64-bit FNV prime).
+    # Being odd makes it invertible modulo 2^64.
+    HASH_BASE_64 = 0x100000001B3
+    
+    def __init__(self, base: int = 256, prime: int = 101, seed: int = DEFAULT_HASH_SEED,
+                 vocabulary=None, cache_size: int = 4096):
         """
         Initialize Rabin-Karp algorithm with configurable base and prime numbers.
         
+        Token lists are hashed with `base` and `prime`. Integer token arrays
+        use the vectorized mode, which hashes modulo 2^64.
+        
         Args:
             base: Base for the hash function (default: 256 for ASCII)
             prime: Prime number for modulo operation (default: 101)
+            seed: Seed for the stable per-token hash
+            vocabulary: Optional TokenVocabulary used to map token ID arrays
+                to the stable hashes of their tokens
+            cache_size: Maximum number of window hashes kept in the LRU cache
         """
         self.base = base
         self.prime = prime
-        self._hash_cache = {}  # Cache for hash values
+        self.seed = seed
+        self.vocabulary = vocabulary
+        self._token_hashes: Dict[str, int] = {}  # token -> stable hash
+        self.hash_base = np.uint64(self.HASH_BASE_64)
+        self._inverse_base = np.uint64(pow(self.HASH_BASE_64, -1, 1 << 64))
+        self._hash_cache = LRUCache(max_entries=cache_size)  # window content digest -> hash value
+        self._metrics_lock = threading.Lock()
         self._performance_metrics = {
             'total_operations': 0,
             'cache_hits': 0,
             'processing_time': 0
         }
     
+    def _token_hash(self, token: str) -> int:
+        """Get the stable 64-bit hash of a token, hashing each distinct token once."""
+        value = self._token_hashes.get(token)
+        if value is None:
+            value = stable_token_hash(token, self.seed)
+            self._token_hashes[token] = value
+        return value
+    
+    def _record(self, metric: str, amount: float = 1):
+        """Increment a performance counter; safe to call from worker threads."""
+        with self._metrics_lock:
+            self._performance_metrics[metric] += amount
+    
     def _compute_hash(self, text: List[str], start: int, length: int) -> int:
         """
         Compute rolling hash for a window of tokens.
-        Uses caching to improve performance for repeated computations.
+        
+        Results are cached by a fixed-size digest of the window content, so
+        equal windows share an entry regardless of where they occur and
+        every entry is small however long the window is.
         """
-        cache_key = (tuple(text[start:start+length]), start, length)
-        if cache_key in self._hash_cache:
-            self._performance_metrics['cache_hits'] += 1
-            return self._hash_cache[cache_key]
+        token_hashes = array('Q', (self._token_hash(token) for token in text[start:start + length]))
+        cache_key = hashlib.blake2b(token_hashes.tobytes(), digest_size=16).digest()
+        cached = self._hash_cache.get(cache_key)
+        if cached is not None:
+            self._record('cache_hits')
+            return cached
         
         hash_value = 0
-        for i in range(length):
-            hash_value = (hash_value * self.base + hash(text[start + i])) % self.prime
+        for token_hash in token_hashes:
+            hash_value = (hash_value * self.base + token_hash) % self.prime
         
-        self._hash_cache[cache_key] = hash_value
-        self._performance_metrics['total_operations'] += 1
+        self._hash_cache.put(cache_key, hash_value)
+        self._record('total_operations')
         return hash_value
     
-    def find_matches(self, text: List[str], pattern: List[str], 
+    def find_matches(self, text: TokenSequence, pattern: TokenSequence, 
                     min_similarity: float = 0.8) -> List[Tuple[int, float]]:
         """
         Find all matches of pattern in text using Rabin-Karp algorithm.
         Returns list of (start_index, similarity_score) tuples.
         
+        When both text and pattern are integer token arrays the vectorized
+        64-bit mode is used.
+        
         Args:
-            text: List of tokens to search in
-            pattern: List of tokens to search for
+            text: List of tokens (or integer token array) to search in
+            pattern: List of tokens (or integer token array) to search for
             min_similarity: Minimum similarity threshold (0.0 to 1.0)
         
         Returns:
             List of tuples containing (start_index, similarity_score)
         """
-        if not text or not pattern:
+        if len(text) == 0 or len(pattern) == 0:
             logger.warning("Empty text or pattern provided")
             return []
         
@@ -65,6 +154,9 @@ class RabinKarp:
             logger.warning("Pattern longer than text")
             return []
         
+        if isinstance(text, np.ndarray) and isinstance(pattern, np.ndarray):
+            return self._find_matches_vectorized(text, pattern, min_similarity)
+        
         start_time = time.time()
         matches = []
         pattern_hash = self._compute_hash(pattern, 0, len(pattern))
@@ -88,12 +180,50 @@ class RabinKarp:
             
             # Calculate hash for next window
             if i < len(text) - len(pattern):
-                window_hash = (self.base * (window_hash - hash(text[i]) * power) + 
-                             hash(text[i + len(pattern)])) % self.prime
+                window_hash = (self.base * (window_hash - self._token_hash(text[i]) * power) + 
+                             self._token_hash(text[i + len(pattern)])) % self.prime
+        
+        self._record('processing_time', time.time() - start_time)
+        return matches
+    
+    def _find_matches_vectorized(self, text: np.ndarray, pattern: np.ndarray,
+                                 min_similarity: float) -> List[Tuple[int, float]]:
+        """
+        Find matches of an integer token array in another one.
+        
+        Every window hash of the text is computed in one NumPy pass and only
+        positions whose 64-bit hash equals the pattern hash are verified.
+        """
+        start_time = time.time()
+        text_values = self._as_token_array(text)
+        pattern_values = self._as_token_array(pattern)
+        
+        pattern_hash = self._window_hashes(pattern_values, len(pattern_values))[0]
+        window_hashes = self._window_hashes(text_values, len(pattern_values))
+        self._record('total_operations', 2)
+        
+        matches = []
+        for i in np.flatnonzero(window_hashes == pattern_hash).tolist():
+            similarity = self._calculate_similarity_vectorized(
+                text[i:i + len(pattern)], pattern)
+            if similarity >= min_similarity:
+                matches.append((i, similarity))
         
-        self._performance_metrics['processing_time'] = time.time() - start_time
+        self._record('processing_time', time.time() - start_time)
         return matches
     
+    def _calculate_similarity_vectorized(self, text_window: np.ndarray,
+                                         pattern: np.ndarray) -> float:
+        """Vectorized equivalent of _calculate_similarity for token arrays."""
+        if len(text_window) != len(pattern):
+            return 0.0
+        
+        half = len(pattern) / 2
+        weights = 1.0 + 0.5 * (1 - np.abs(np.arange(len(pattern)) - half) / half)
+        total_weight = weights.sum()
+        
+        return float(weights[text_window == pattern].sum() / total_weight) if total_weight > 0 else 0.0
+    
     def _calculate_similarity(self, text_window: List[str], 
                             pattern: List[str]) -> float:
         """
@@ -149,22 +279,238 @@ class RabinKarp:
         
         return results
     
+    def encode_tokens(self, tokens: Sequence[str]) -> np.ndarray:
+        """
+        Map tokens to the 64-bit integer values used by the vectorized mode.
+        
+        Values come from stable_token_hash, so the resulting k-gram hashes and
+        fingerprints are bit-identical across processes and runs.
+        
+        Args:
+            tokens: Sequence of tokens to encode
+        
+        Returns:
+            uint64 array with one value per token
+        """
+        return np.fromiter((self._token_hash(token) for token in tokens),
+                           dtype=np.uint64, count=len(tokens))
+    
+    def _as_token_array(self, tokens: TokenSequence) -> np.ndarray:
+        """
+        Return tokens as 64-bit hash values.
+        
+        uint64 arrays are taken as already hashed. Other integer arrays hold
+        token IDs and are mapped through the vocabulary, or mixed with the
+        seed when no vocabulary is set. Token lists are encoded.
+        """
+        if isinstance(tokens, np.ndarray):
+            if tokens.dtype == np.uint64:
+                return tokens
+            if self.vocabulary is not None:
+                return self.vocabulary.token_hashes(tokens)
+            return mix64(tokens.astype(np.uint64), self.seed)
+        return self.encode_tokens(tokens)
+    
+    def _window_hashes(self, values: np.ndarray, length: int) -> np.ndarray:
+        """
+        Hash every window of `length` values in a single vectorized pass.
+        
+        The hash of the window starting at i is sum(values[i + j] * B^j) mod
+        2^64. It is derived from prefix sums of values[j] * B^j, shifted back
+        to position 0 with the modular inverse of B (B is odd, so the inverse
+        exists). uint64 arithmetic wraps, which provides the modulus for free.
+        """
+        n = len(values)
+        if length <= 0 or n < length:
+            return np.empty(0, dtype=np.uint64)
+        
+        powers = np.full(n, self.hash_base, dtype=np.uint64)
+        powers[0] = 1
+        np.cumprod(powers, out=powers)
+        
+        inverse_powers = np.full(n - length + 1, self._inverse_base, dtype=np.uint64)
+        inverse_powers[0] = 1
+        np.cumprod(inverse_powers, out=inverse_powers)
+        
+        prefix = np.zeros(n + 1, dtype=np.uint64)
+        np.cumsum(values * powers, out=prefix[1:])
+        
+        return (prefix[length:] - prefix[:-length]) * inverse_powers
+    
+    def kgram_hashes(self, tokens: TokenSequence, k: int) -> np.ndarray:
+        """
+        Compute the 64-bit rolling hash of every k-gram in a token sequence.
+        
+        Args:
+            tokens: Token list or integer token array to hash
+            k: Number of tokens per k-gram
+        
+        Returns:
+            uint64 array of len(tokens) - k + 1 hash values (empty if too short)
+        """
+        hashes = self._window_hashes(self._as_token_array(tokens), k)
+        self._record('total_operations')
+        return hashes
+    
+    def batch_kgram_hashes(self, token_arrays: List[TokenSequence], k: int) -> List[np.ndarray]:
+        """
+        Compute k-gram hashes for many submissions in one vectorized pass.
+        
+        All token arrays are concatenated and hashed together; windows that
+        straddle two submissions are discarded when splitting the result.
+        
+        Args:
+            token_arrays: Token lists or integer token arrays, one per submission
+            k: Number of tokens per k-gram
+        
+        Returns:
+            List of uint64 hash arrays in the same order as token_arrays
+        """
+        arrays = [self._as_token_array(tokens) for tokens in token_arrays]
+        if not arrays:
+            return []
+        
+        lengths = np.array([len(values) for values in arrays], dtype=np.int64)
+        offsets = np.concatenate(([0], np.cumsum(lengths)))
+        hashes = self._window_hashes(np.concatenate(arrays), k)
+        self._record('total_operations')
+        
+        return [
+            hashes[offsets[i]:offsets[i] + lengths[i] - k + 1]
+            if lengths[i] >= k else np.empty(0, dtype=np.uint64)
+            for i in range(len(arrays))
+        ]
+    
+    def winnow(self, hashes: np.ndarray, window: int) -> List[Tuple[int, int]]:
+        """
+        Select fingerprints from k-gram hashes using winnowing.
+        
+        In every run of `window` consecutive hashes the minimum (rightmost on
+        ties) is selected, which guarantees that any shared token run of at
+        least window + k - 1 tokens yields a shared fingerprint.
+        
+        Args:
+            hashes: k-gram hashes as returned by kgram_hashes
+            window: Number of consecutive hashes per winnowing window
+        
+        Returns:
+            List of (hash, position) tuples in position order
+        """
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if len(hashes) == 0:
+            return []
+        
+        window = max(1, min(window, len(hashes)))
+        windows = sliding_window_view(hashes, window)
+        
+        # argmin returns the first minimum, so search each window reversed
+        # to get the rightmost one
+        positions = (np.arange(len(windows)) + window - 1 -
+                     windows[:, ::-1].argmin(axis=1))
+        
+        # Selected positions never move left; keep each one once
+        keep = np.ones(len(positions), dtype=bool)
+        keep[1:] = positions[1:] != positions[:-1]
+        positions = positions[keep]
+        
+        return list(zip(hashes[positions].tolist(), positions.tolist()))
+    
+    def fingerprint(self, tokens: TokenSequence, k: int, window: int) -> Set[int]:
+        """
+        Compute the winnowed fingerprint set of a token sequence.
+        
+        Args:
+            tokens: Token list or integer token array to fingerprint
+            k: Number of tokens per k-gram
+            window: Winnowing window size
+        
+        Returns:
+            Set of selected k-gram hashes
+        """
+        return {value for value, _ in self.winnow(self.kgram_hashes(tokens, k), window)}
+    
+    def stream_fingerprint(self, blocks: Iterable[TokenSequence], k: int, window: int,
+                           on_hashes: Optional[Callable[[np.ndarray], None]] = None) -> Set[int]:
+        """
+        Compute the winnowed fingerprint set of a token stream given in blocks.
+        
+        Only the last k - 1 tokens and window - 1 k-gram hashes of a block
+        are kept for the next one, so memory does not grow with the length
+        of the stream. The result equals fingerprint() of the whole stream.
+        
+        Args:
+            blocks: Consecutive token lists or integer token arrays, e.g.
+                from CodeParser.stream_file()
+            k: Number of tokens per k-gram
+            window: Winnowing window size
+            on_hashes: Called with the k-gram hashes completed by every
+                block, e.g. to collect the distinct k-gram hashes
+        
+        Returns:
+            Set of selected k-gram hashes
+        """
+        window = max(1, window)
+        fingerprints: Set[int] = set()
+        values = np.empty(0, dtype=np.uint64)
+        hashes = np.empty(0, dtype=np.uint64)
+        for block in blocks:
+            values = np.concatenate((values, self._as_token_array(block)))
+            block_hashes = self._window_hashes(values, k)
+            if on_hashes is not None:
+                on_hashes(block_hashes)
+            hashes = np.concatenate((hashes, block_hashes))
+            if len(hashes) >= window:
+                fingerprints.update(sliding_window_view(hashes, window).min(axis=1).tolist())
+            values = values[max(len(values) - k + 1, 0):]
+            hashes = hashes[max(len(hashes) - window + 1, 0):]
+        
+        # A stream shorter than one window is winnowed as a single window
+        if not fingerprints and len(hashes):
+            fingerprints.add(int(hashes.min()))
+        self._record('total_operations')
+        return fingerprints
+    
+    def batch_fingerprints(self, token_arrays: List[TokenSequence], k: int,
+                           window: int) -> List[Set[int]]:
+        """
+        Compute winnowed fingerprint sets for many submissions at once.
+        
+        Args:
+            token_arrays: Token lists or integer token arrays, one per submission
+            k: Number of tokens per k-gram
+            window: Winnowing window size
+        
+        Returns:
+            List of fingerprint sets in the same order as token_arrays
+        """
+        return [
+            {value for value, _ in self.winnow(hashes, window)}
+            for hashes in self.batch_kgram_hashes(token_arrays, k)
+        ]
+    
     def get_performance_metrics(self) -> Dict:
-        """Get current performance metrics."""
+        """Get current performance metrics; processing_time is the total time spent in find_matches."""
+        with self._metrics_lock:
+            metrics = dict(self._performance_metrics)
+        cache_metrics = self._hash_cache.get_performance_metrics()
         return {
-            'total_operations': self._performance_metrics['total_operations'],
-            'cache_hits': self._performance_metrics['cache_hits'],
-            'cache_hit_ratio': (self._performance_metrics['cache_hits'] / 
-                              self._performance_metrics['total_operations'] 
-                              if self._performance_metrics['total_operations'] > 0 else 0),
-            'processing_time': self._performance_metrics['processing_time']
+            'total_operations': metrics['total_operations'],
+            'cache_hits': metrics['cache_hits'],
+            'cache_hit_ratio': (metrics['cache_hits'] / 
+                              metrics['total_operations'] 
+                              if metrics['total_operations'] > 0 else 0),
+            'cache_entries': cache_metrics['entries'],
+            'cache_evictions': cache_metrics['evictions'],
+            'processing_time': metrics['processing_time']
         }
     
     def clear_cache(self):
         """Clear the hash cache to free memory."""
         self._hash_cache.clear()
-        self._performance_metrics = {
-            'total_operations': 0,
-            'cache_hits': 0,
-            'processing_time': 0
-        } 
\ No newline at end of file
+        self._token_hashes.clear()
+        with self._metrics_lock:
+            self._performance_metrics = {
+                'total_operations': 0,
+                'cache_hits': 0,
+                'processing_time': 0
+            } 
\ No newline at end of file
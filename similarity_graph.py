@@ -1,26 +1,37 @@
 from typing import List, Dict, Set, Tuple, Optional
 import networkx as nx
 import numpy as np
+from scipy import sparse
 from sklearn.cluster import DBSCAN
 import logging
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import time
 from collections import defaultdict
+from union_find import UnionFind
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class SimilarityGraph:
-    def __init__(self, similarity_threshold: float = 0.8):
+    def __init__(self, similarity_threshold: float = 0.8, cluster_eps: float = 0.2):
         """
         Initialize similarity graph with configurable threshold.
         
+        Connected components and clusters are maintained incrementally with
+        union-find structures as edges are added, so they can be read at
+        any time without recomputation.
+        
         Args:
             similarity_threshold: Minimum similarity score to create an edge (0.0 to 1.0)
+            cluster_eps: Maximum distance (1 - similarity) of edges joining
+                files into the same incrementally maintained cluster
         """
         self.graph = nx.Graph()
         self.similarity_threshold = similarity_threshold
+        self.cluster_eps = cluster_eps
+        self._components = UnionFind()
+        self._clusters = UnionFind()
         self._performance_metrics = {
             'total_edges': 0,
             'total_nodes': 0,
@@ -28,16 +39,133 @@ class SimilarityGraph:
             'clustering_time': 0
         }
     
-    def add_file(self, file_id: str, metadata: Dict):
-        """Add a file node to the graph with its metadata."""
-        self.graph.add_node(file_id, **metadata)
+    def add_file(self, file_id: str, metadata: Optional[Dict] = None):
+        """Add a file node to the graph, with its metadata as node attributes if given."""
+        self.graph.add_node(file_id, **(metadata or {}))
+        self._components.add(file_id)
+        self._clusters.add(file_id)
         self._performance_metrics['total_nodes'] += 1
     
+    def remove_file(self, file_id: str) -> bool:
+        """
+        Remove a file node and its edges from the graph.
+        
+        Returns:
+            bool: True if the file was in the graph
+        """
+        if file_id not in self.graph:
+            return False
+        
+        self._performance_metrics['total_edges'] -= self.graph.degree(file_id)
+        self._performance_metrics['total_nodes'] -= 1
+        members = self._components.group(file_id)
+        self.graph.remove_node(file_id)
+        members.discard(file_id)
+        self._rebuild_component(file_id, members)
+        return True
+    
+    def remove_similarity(self, file1_id: str, file2_id: str) -> bool:
+        """
+        Remove the edge between two files.
+        
+        Returns:
+            bool: True if the edge existed
+        """
+        if not self.graph.has_edge(file1_id, file2_id):
+            return False
+        
+        self.graph.remove_edge(file1_id, file2_id)
+        self._performance_metrics['total_edges'] -= 1
+        self._rebuild_component(file1_id)
+        return True
+    
     def add_similarity(self, file1_id: str, file2_id: str, similarity: float):
         """Add an edge between two files if similarity exceeds threshold."""
         if similarity >= self.similarity_threshold:
+            previous = self.graph.get_edge_data(file1_id, file2_id, default={}).get('weight')
             self.graph.add_edge(file1_id, file2_id, weight=similarity)
             self._performance_metrics['total_edges'] += 1
+            
+            if previous is not None and self._in_cluster_range(previous) \
+                    and not self._in_cluster_range(similarity):
+                # A weakened edge may split a cluster, which union-find cannot undo
+                self._rebuild_component(file1_id)
+                return
+            
+            self._components.union(file1_id, file2_id)
+            if self._in_cluster_range(similarity):
+                self._clusters.union(file1_id, file2_id)
+    
+    def _in_cluster_range(self, similarity: float) -> bool:
+        """Check whether an edge joins its files into the same cluster."""
+        return 1 - similarity <= self.cluster_eps
+    
+    def _rebuild_component(self, file_id: str, members: Optional[Set[str]] = None):
+        """
+        Rebuild the union-find groups of one connected component.
+        
+        Only the component's own nodes and edges are visited, so removing
+        a node or weakening an edge costs time proportional to the component.
+        
+        Args:
+            file_id: A file of the component
+            members: Files of the component, when file_id itself was removed
+        """
+        if members is None:
+            members = self._components.group(file_id)
+        
+        self._components.remove_group(file_id)
+        for member in members:
+            self._components.remove_group(member)
+            self._clusters.remove_group(member)
+        self._clusters.remove_group(file_id)
+        
+        for member in members:
+            self._components.add(member)
+            self._clusters.add(member)
+        for u, v, weight in self.graph.edges(members, data='weight'):
+            self._components.union(u, v)
+            if self._in_cluster_range(weight):
+                self._clusters.union(u, v)
+    
+    def _rebuild_union_find(self):
+        """Rebuild the component and cluster structures from the graph."""
+        self._components.clear()
+        self._clusters.clear()
+        for node in self.graph.nodes():
+            self._components.add(node)
+            self._clusters.add(node)
+        for u, v, weight in self.graph.edges(data='weight'):
+            self._components.union(u, v)
+            if self._in_cluster_range(weight):
+                self._clusters.union(u, v)
+    
+    def get_component_of(self, file_id: str) -> Set[str]:
+        """
+        Get the files connected to a file through edges above the threshold.
+        
+        Args:
+            file_id: ID of the file
+        
+        Returns:
+            Set of file IDs in the component (empty if the file is unknown)
+        """
+        return self._components.group(file_id)
+    
+    def get_cluster_of(self, file_id: str) -> Set[str]:
+        """
+        Get the cluster containing a file.
+        
+        Files are in the same cluster when they are connected through edges
+        with distance (1 - similarity) of at most cluster_eps.
+        
+        Args:
+            file_id: ID of the file
+        
+        Returns:
+            Set of file IDs in the cluster (empty if the file is unknown)
+        """
+        return self._clusters.group(file_id)
     
     def find_similar_files(self, file_id: str, min_similarity: Optional[float] = None) -> List[Tuple[str, float]]:
         """
@@ -64,6 +192,44 @@ class SimilarityGraph:
         
         return sorted(similar_files, key=lambda x: x[1], reverse=True)
     
+    def similarity_matrix(self, file_ids: Optional[List[str]] = None,
+                          min_similarity: Optional[float] = None,
+                          dense: bool = False):
+        """
+        Build the similarity matrix directly from the edge list.
+        
+        Args:
+            file_ids: Row/column order of the matrix (default: graph node order);
+                edges to files not listed are ignored
+            min_similarity: Optional minimum similarity threshold
+            dense: Return a NumPy array instead of a sparse matrix
+        
+        Returns:
+            Symmetric scipy.sparse CSR matrix (or NumPy array if dense) in
+            O(E) time and memory
+        """
+        if file_ids is None:
+            file_ids = list(self.graph.nodes())
+        
+        threshold = min_similarity if min_similarity is not None else self.similarity_threshold
+        index = {file_id: i for i, file_id in enumerate(file_ids)}
+        rows, cols, weights = [], [], []
+        
+        for u, v, weight in self.graph.edges(data='weight'):
+            i = index.get(u)
+            j = index.get(v)
+            if i is None or j is None or i == j or weight < threshold:
+                continue
+            rows.extend((i, j))
+            cols.extend((j, i))
+            weights.extend((weight, weight))
+        
+        n = len(file_ids)
+        matrix = sparse.csr_matrix((np.array(weights, dtype=np.float64),
+                                    (np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64))),
+                                   shape=(n, n))
+        return matrix.toarray() if dense else matrix
+    
     def find_clusters(self, eps: float = 0.2, min_samples: int = 2) -> List[Set[str]]:
         """
         Find clusters of similar files using DBSCAN algorithm.
@@ -79,20 +245,23 @@ class SimilarityGraph:
             return []
         
         start_time = time.time()
-        
-        # Convert graph to distance matrix
         nodes = list(self.graph.nodes())
-        n = len(nodes)
-        distance_matrix = np.zeros((n, n))
         
-        for i, node1 in enumerate(nodes):
-            for j, node2 in enumerate(nodes):
-                if i != j:
-                    if self.graph.has_edge(node1, node2):
-                        # Convert similarity to distance (1 - similarity)
-                        distance_matrix[i, j] = 1 - self.graph[node1][node2]['weight']
-                    else:
-                        distance_matrix[i, j] = 1.0
+        if eps == self.cluster_eps and min_samples <= 2:
+            # With at most two samples every file with a neighbour within eps
+            # is a core point, so DBSCAN clusters are exactly the maintained
+            # union-find groups; with one sample isolated files count too
+            clusters = [group for group in self._clusters.groups(nodes)
+                        if min_samples <= 1 or len(group) > 1]
+            self._performance_metrics['clustering_time'] = time.time() - start_time
+            return clusters
+        
+        if eps < 1.0:
+            # Non-edges are at distance 1.0 and can never be within eps, so
+            # only edges need to be stored
+            distance_matrix = self._sparse_distance_matrix(nodes, eps)
+        else:
+            distance_matrix = self._dense_distance_matrix(nodes)
         
         # Apply DBSCAN clustering
         clustering = DBSCAN(eps=eps, min_samples=min_samples, metric='precomputed')
@@ -107,9 +276,45 @@ class SimilarityGraph:
         self._performance_metrics['clustering_time'] = time.time() - start_time
         return list(clusters.values())
     
+    def _edge_arrays(self, nodes: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Get (rows, cols, distances) of every edge in both directions."""
+        index = {node: i for i, node in enumerate(nodes)}
+        edges = [(index[u], index[v], weight) for u, v, weight in self.graph.edges(data='weight')
+                 if u != v]
+        if not edges:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, np.empty(0, dtype=np.float64)
+        
+        rows, cols, weights = (np.array(column) for column in zip(*edges))
+        # Convert similarity to distance (1 - similarity)
+        distances = 1 - weights.astype(np.float64)
+        return (np.concatenate((rows, cols)), np.concatenate((cols, rows)),
+                np.concatenate((distances, distances)))
+    
+    def _sparse_distance_matrix(self, nodes: List[str], eps: float) -> sparse.csr_matrix:
+        """
+        Build a sparse precomputed distance graph holding only edges within eps.
+        
+        Identical files have distance 0, which is kept as an explicitly
+        stored zero so DBSCAN still treats them as neighbours.
+        """
+        rows, cols, distances = self._edge_arrays(nodes)
+        within = distances <= eps
+        n = len(nodes)
+        return sparse.csr_matrix((distances[within], (rows[within], cols[within])), shape=(n, n))
+    
+    def _dense_distance_matrix(self, nodes: List[str]) -> np.ndarray:
+        """Build the full distance matrix; non-edges are at distance 1.0."""
+        n = len(nodes)
+        distance_matrix = np.ones((n, n))
+        np.fill_diagonal(distance_matrix, 0.0)
+        rows, cols, distances = self._edge_arrays(nodes)
+        distance_matrix[rows, cols] = distances
+        return distance_matrix
+    
     def get_connected_components(self) -> List[Set[str]]:
         """Get connected components in the similarity graph."""
-        return list(nx.connected_components(self.graph))
+        return self._components.groups(self.graph.nodes())
     
     def get_most_similar_pairs(self, top_k: int = 10) -> List[Tuple[str, str, float]]:
         """Get top K most similar file pairs."""
@@ -155,6 +360,7 @@ class SimilarityGraph:
         """Load the graph from a file."""
         try:
             self.graph = nx.read_gpickle(filepath)
+            self._rebuild_union_find()
             self._performance_metrics['total_nodes'] = len(self.graph.nodes())
             self._performance_metrics['total_edges'] = len(self.graph.edges())
             logger.info(f"Graph loaded from {filepath}")
@@ -164,6 +370,8 @@ class SimilarityGraph:
     def clear(self):
         """Clear the graph and reset metrics."""
         self.graph.clear()
+        self._components.clear()
+        self._clusters.clear()
         self._performance_metrics = {
             'total_edges': 0,
             'total_nodes': 0,
@@ -0,0 +1,179 @@
+from typing import Dict, Iterator, List, Tuple
+import logging
+import time
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class SuffixArray:
+    def __init__(self, values: np.ndarray):
+        """
+        Build the suffix array and LCP array of an integer sequence.
+        
+        The suffix array is built by prefix doubling: suffixes are sorted by
+        their first 2^k values using the ranks of the previous round, so
+        every round is one O(n log n) NumPy sort and at most log n rounds
+        are needed. The LCP array is then read from the ranks of every round
+        by binary lifting, one vectorized step per round, instead of a
+        per-suffix Python loop. The ranks are kept as int32 while building,
+        so the peak memory is about 4 bytes per value per round.
+        
+        Args:
+            values: Integer sequence (e.g. token IDs) to index
+        """
+        start_time = time.time()
+        self.values = np.asarray(values, dtype=np.int64)
+        self.sa, self.rank, rank_levels = self._build(self.values)
+        self.lcp = self._build_lcp(self.sa, rank_levels)
+        self._performance_metrics = {
+            'length': len(self.values),
+            'build_time': time.time() - start_time
+        }
+    
+    @staticmethod
+    def _build(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray, List[np.ndarray]]:
+        """
+        Sort all suffixes by prefix doubling.
+        
+        Returns:
+            (suffix array, rank array, ranks of every round); entry t of the
+            last list ranks the suffixes by their first 2^t values
+        """
+        n = len(values)
+        if n == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), []
+        
+        rank_dtype = np.int32 if n < 2 ** 31 else np.int64
+        # Dense initial ranks of the single values
+        rank = np.unique(values, return_inverse=True)[1].astype(np.int64).reshape(n)
+        rank_levels = [rank.astype(rank_dtype)]
+        sa = np.argsort(rank, kind='stable')
+        k = 1
+        while n > 1:
+            # Rank of the suffix starting k positions later; -1 past the end
+            second = np.full(n, -1, dtype=np.int64)
+            second[:n - k] = rank[k:]
+            # One int64 key per suffix (rank, then second rank) sorts faster
+            # than a two-key lexsort; ties are only broken in the last round,
+            # where all keys are distinct
+            sa = np.argsort(rank * (n + 1) + (second + 1))
+            
+            first_sorted = rank[sa]
+            second_sorted = second[sa]
+            new_group = np.empty(n, dtype=bool)
+            new_group[0] = False
+            new_group[1:] = (first_sorted[1:] != first_sorted[:-1]) | \
+                            (second_sorted[1:] != second_sorted[:-1])
+            
+            rank = np.empty(n, dtype=np.int64)
+            rank[sa] = np.cumsum(new_group)
+            rank_levels.append(rank.astype(rank_dtype))
+            if rank[sa[-1]] == n - 1 or k >= n:
+                break
+            k *= 2
+        return sa.astype(np.int64), rank, rank_levels
+    
+    @staticmethod
+    def _build_lcp(sa: np.ndarray, rank_levels: List[np.ndarray]) -> np.ndarray:
+        """
+        Compute the LCP array from the prefix doubling ranks.
+        
+        lcp[i] is the length of the longest common prefix of the suffixes at
+        sa[i - 1] and sa[i]; lcp[0] is 0. Two suffixes share their first 2^t
+        values exactly when their round-t ranks are equal, so the LCP of all
+        neighbouring pairs is built bit by bit from the longest round down.
+        """
+        n = len(sa)
+        lcp = np.zeros(n, dtype=np.int64)
+        if n < 2:
+            return lcp
+        
+        left, right = sa[:-1], sa[1:]
+        common = np.zeros(n - 1, dtype=np.int64)
+        for t in range(len(rank_levels) - 1, -1, -1):
+            step = 1 << t
+            # Suffixes running past the end never match the padding of a
+            # longer prefix, so only pairs with room for 2^t more values count
+            i, j = left + common, right + common
+            room = (i + step <= n) & (j + step <= n)
+            ranks = rank_levels[t]
+            room[room] = ranks[i[room]] == ranks[j[room]]
+            common[room] += step
+        
+        lcp[1:] = common
+        return lcp
+    
+    def find(self, pattern: np.ndarray) -> np.ndarray:
+        """
+        Find all occurrences of a pattern.
+        
+        Args:
+            pattern: Integer sequence to search for
+        
+        Returns:
+            Sorted array of the start positions of the pattern
+        """
+        pattern = np.asarray(pattern, dtype=np.int64)
+        m = len(pattern)
+        if m == 0 or m > len(self.values):
+            return np.empty(0, dtype=np.int64)
+        
+        lo, hi = self._bound(pattern, False), self._bound(pattern, True)
+        return np.sort(self.sa[lo:hi])
+    
+    def _bound(self, pattern: np.ndarray, upper: bool) -> int:
+        """Binary search the first suffix whose prefix is >= (or > if upper) the pattern."""
+        m = len(pattern)
+        n = len(self.values)
+        lo, hi = 0, n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = self.sa[mid]
+            prefix = self.values[start:start + m]
+            # Compare the prefix with the pattern lexicographically
+            diff = np.flatnonzero(prefix != pattern[:len(prefix)])
+            if len(diff):
+                less = prefix[diff[0]] < pattern[diff[0]]
+            else:
+                # Equal on the common length: a shorter prefix sorts first
+                less = len(prefix) < m or upper
+            if less:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+    
+    def lcp_intervals(self, min_length: int) -> Iterator[Tuple[int, int, int]]:
+        """
+        Yield maximal runs of suffixes sharing a prefix of at least min_length.
+        
+        Args:
+            min_length: Minimum common prefix length
+        
+        Yields:
+            Tuples of (first suffix array index, end index, minimum LCP in
+            the run); every suffix in sa[first:end] shares that many values
+        """
+        if min_length < 1:
+            raise ValueError("min_length must be at least 1")
+        
+        long_enough = self.lcp >= min_length
+        start = None
+        end = None
+        for i in np.flatnonzero(long_enough).tolist():
+            if start is None or i != end:
+                if start is not None:
+                    yield start, end, int(self.lcp[start + 1:end].min())
+                start = i - 1
+            end = i + 1
+        if start is not None:
+            yield start, end, int(self.lcp[start + 1:end].min())
+    
+    def __len__(self) -> int:
+        return len(self.values)
+    
+    def get_performance_metrics(self) -> Dict:
+        """Get current performance metrics."""
+        return dict(self._performance_metrics)
@@ -1,12 +1,31 @@
 import unittest
 import os
+import sys
+import subprocess
 import tempfile
 import shutil
+import json
 from pathlib import Path
+import numpy as np
+from sklearn.cluster import DBSCAN
 from code_parser import CodeParser
 from rabin_karp import RabinKarp
 from similarity_graph import SimilarityGraph
 from bplus_tree import BPlusTree
+from paged_bplus_tree import PagedBPlusTree
+from fingerprint_index import FingerprintIndex
+from minhash_lsh import MinHashLSH
+from suffix_array import SuffixArray
+from greedy_string_tiling import GreedyStringTiling
+from fragment_index import FragmentIndex
+from token_vocabulary import TokenVocabulary
+from lru_cache import LRUCache
+from parse_cache import ParseCache
+from union_find import UnionFind
+from token_store import TokenStore
+from plagiarism_detector import PlagiarismDetector
+
+TEST_FILES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "test_files")
 
 class TestCodeParser(unittest.TestCase):
     def setUp(self):
@@ -40,19 +59,81 @@ class TestCodeParser(unittest.TestCase):
         shutil.rmtree(self.test_dir)
     
     def test_parse_python_file(self):
-        tokens = self.parser.parse_file(self.python_file)
-        self.assertIsNotNone(tokens)
-        self.assertGreater(len(tokens), 0)
+        token_ids = self.parser.parse_file(self.python_file)
+        self.assertIsNotNone(token_ids)
+        self.assertGreater(len(token_ids), 0)
+        tokens = self.parser.vocabulary.decode(token_ids)
         self.assertIn("def", tokens)
         self.assertIn("hello", tokens)
     
     def test_parse_java_file(self):
-        tokens = self.parser.parse_file(self.java_file)
-        self.assertIsNotNone(tokens)
-        self.assertGreater(len(tokens), 0)
+        token_ids = self.parser.parse_file(self.java_file)
+        self.assertIsNotNone(token_ids)
+        self.assertGreater(len(token_ids), 0)
+        tokens = self.parser.vocabulary.decode(token_ids)
         self.assertIn("public", tokens)
         self.assertIn("class", tokens)
     
+    def test_tokens_are_interned(self):
+        python_ids = self.parser.parse_file(self.python_file)
+        java_ids = self.parser.parse_file(self.java_file)
+        self.assertEqual(python_ids.dtype, np.uint32)
+        
+        # Both files share the vocabulary, so equal tokens get equal IDs
+        hello_id = self.parser.vocabulary.lookup("hello")
+        self.assertIn(hello_id, python_ids)
+        self.assertIn(hello_id, java_ids)
+        self.assertEqual(self.parser.vocabulary.encode(["hello"]).tolist(), [hello_id])
+    
+    def test_scanner_keeps_strings_and_skips_comments(self):
+        decode = self.parser.vocabulary.decode
+        python_source = 'def f():\n    """Docstring."""\n    url = "a#b"  # comment\n    return """Text"""\n'
+        self.assertEqual(decode(self.parser.parse_source(python_source, '.py')),
+                         ['def', 'f', '(', ')', ':', 'url', '=', '"', 'a', '#', 'b', '"',
+                          'return', '"', '"', '"', 'text', '"', '"', '"'])
+        
+        js_source = 'let u = "http://x"; /* block */ let t = `a // b`; // tail'
+        self.assertEqual(decode(self.parser.parse_source(js_source, '.js')),
+                         ['let', 'u', '=', '"', 'http', ':', '/', '/', 'x', '"', ';',
+                          'let', 't', '=', '`', 'a', '/', '/', 'b', '`', ';'])
+        
+        ruby_source = 'x = 1\n=begin\nignored\n=end\ny = "#{x}"\n'
+        self.assertEqual(decode(self.parser.parse_source(ruby_source, '.rb')),
+                         ['x', '=', '1', 'y', '=', '"', '#', '{', 'x', '}', '"'])
+    
+    def test_scanner_matches_legacy_tokenizer_on_test_files(self):
+        from bench.tokenizer_benchmark import benchmark_tokenizer, load_sources
+        report = benchmark_tokenizer(load_sources([TEST_FILES_DIR]), repeat=1)
+        self.assertEqual(report['identical_files'], report['files'])
+        self.assertEqual(report['scanner']['tokens'], report['legacy']['tokens'])
+    
+    def test_streaming_matches_whole_file_at_any_chunk_size(self):
+        sources = [
+            ('.py', 'x = """a\n  # kept\n"""\n    """Doc\nstring."""\ny = "a\\\nb"  # c\n'),
+            ('.c', 'int a; /* one\n // two\n */ char *s = "/* no */"; // end\nb = \'"\';\n"open\n c;'),
+            ('.js', 'let t = `a\n${b}\n// x\n`; /* c\n*/ f("x")'),
+            ('.rb', 'a = 1\n=begin\nx y\n=end z\nb = "s" # c\n=begin\nnever closed')
+        ]
+        for path in sorted(Path(TEST_FILES_DIR).iterdir()):
+            if path.suffix in self.parser.scanners:
+                sources.append((path.suffix, path.read_text(encoding='utf-8')))
+        
+        for ext, text in sources:
+            expected = self.parser.parse_source(text, ext).tolist()
+            for size in (1, 2, 7, 64):
+                chunks = [text[i:i + size] for i in range(0, len(text), size)]
+                streamed = [token for block in self.parser.stream_source(chunks, ext) for token in block]
+                self.assertEqual(streamed, expected, f"{ext} source in chunks of {size}")
+    
+    def test_large_files_are_streamed(self):
+        path = self.python_file
+        streaming_parser = CodeParser(self.parser.vocabulary, stream_threshold=0)
+        self.assertEqual(streaming_parser.parse_file(path).tolist(),
+                         self.parser.parse_file(path).tolist())
+        blocks = list(self.parser.stream_file(path, chunk_size=16))
+        self.assertGreater(len(blocks), 1)
+        self.assertEqual(np.concatenate(blocks).tolist(), self.parser.parse_file(path).tolist())
+    
     def test_parse_nonexistent_file(self):
         tokens = self.parser.parse_file("nonexistent.py")
         self.assertIsNone(tokens)
@@ -90,6 +171,168 @@ class TestRabinKarp(unittest.TestCase):
         metrics = self.rabin_karp.get_performance_metrics()
         self.assertGreater(metrics['total_operations'], 0)
         self.assertGreaterEqual(metrics['cache_hits'], 0)
+    
+    def test_winnowing_fingerprints_shared_runs(self):
+        tokens = ["def", "hello", "(", ")", ":", "print", "(", '"Hello"', ")", "return"]
+        hashes = self.rabin_karp.kgram_hashes(tokens, 3)
+        self.assertEqual(len(hashes), len(tokens) - 2)
+        
+        fingerprints = self.rabin_karp.winnow(hashes, 4)
+        positions = [position for _, position in fingerprints]
+        self.assertEqual(positions, sorted(set(positions)))
+        
+        # A copied run of window + k - 1 tokens must share a fingerprint
+        copied = ["x", "y"] + tokens[2:8] + ["z"]
+        self.assertTrue(self.rabin_karp.fingerprint(tokens, 3, 4) &
+                        set(self.rabin_karp.kgram_hashes(copied, 3)))
+    
+    def test_vectorized_kgram_hashes(self):
+        values = np.array([7, 3, 9, 3, 7, 3, 9], dtype=np.uint64)
+        hashes = self.rabin_karp.kgram_hashes(values, 3)
+        
+        base = self.rabin_karp.HASH_BASE_64
+        expected = [sum(int(values[i + j]) * pow(base, j, 1 << 64) for j in range(3)) % (1 << 64)
+                    for i in range(len(values) - 2)]
+        self.assertEqual(hashes.tolist(), expected)
+        self.assertEqual(hashes[0], hashes[4])
+    
+    def test_batch_kgram_hashes_match_single(self):
+        arrays = [np.arange(10, dtype=np.uint64), np.array([1, 2], dtype=np.uint64),
+                  np.arange(5, 12, dtype=np.uint64)]
+        batch = self.rabin_karp.batch_kgram_hashes(arrays, 3)
+        
+        self.assertEqual(len(batch), 3)
+        for values, hashes in zip(arrays, batch):
+            self.assertEqual(hashes.tolist(), self.rabin_karp.kgram_hashes(values, 3).tolist())
+    
+    def test_find_matches_token_arrays(self):
+        text = self.rabin_karp.encode_tokens(["def", "hello", "(", ")", ":", "print", "(", ")"])
+        pattern = text[5:8].copy()
+        matches = self.rabin_karp.find_matches(text, pattern)
+        self.assertEqual(matches, [(5, 1.0)])
+    
+    def test_fingerprints_independent_of_hash_seed(self):
+        script = (
+            "from rabin_karp import RabinKarp\n"
+            "tokens = 'def hello ( ) : print ( x ) return x'.split()\n"
+            "print(sorted(RabinKarp().fingerprint(tokens, 3, 2)))\n"
+        )
+        outputs = []
+        for hash_seed in ("1", "2"):
+            env = dict(os.environ, PYTHONHASHSEED=hash_seed)
+            result = subprocess.run([sys.executable, "-c", script], env=env,
+                                    cwd=os.path.dirname(os.path.abspath(__file__)),
+                                    capture_output=True, text=True, check=True)
+            outputs.append(result.stdout)
+        
+        self.assertEqual(outputs[0], outputs[1])
+        self.assertEqual(outputs[0].strip(), str(sorted(self.rabin_karp.fingerprint(
+            "def hello ( ) : print ( x ) return x".split(), 3, 2))))
+    
+    def test_token_id_arrays_use_vocabulary_hashes(self):
+        vocabulary = TokenVocabulary()
+        rabin_karp = RabinKarp(vocabulary=vocabulary)
+        tokens = ["def", "hello", "(", ")", ":", "print", "(", ")"]
+        token_ids = vocabulary.encode(tokens)
+        
+        self.assertEqual(rabin_karp.kgram_hashes(token_ids, 3).tolist(),
+                         rabin_karp.kgram_hashes(tokens, 3).tolist())
+        self.assertEqual(rabin_karp.find_matches(token_ids, token_ids[5:8].copy()), [(5, 1.0)])
+    
+    def test_stream_fingerprint_matches_fingerprint(self):
+        tokens = self.rabin_karp.encode_tokens(
+            "def f ( x ) : return x + 1 def g ( y ) : return f ( y ) * 2".split())
+        for k, window in ((3, 4), (1, 2), (5, 1), (4, 30)):
+            expected = self.rabin_karp.fingerprint(tokens, k, window)
+            for size in (1, 3, 8):
+                blocks = [tokens[i:i + size] for i in range(0, len(tokens), size)]
+                self.assertEqual(self.rabin_karp.stream_fingerprint(blocks, k, window), expected)
+    
+    def test_hash_cache_is_bounded(self):
+        rabin_karp = RabinKarp(cache_size=2)
+        text = ["a", "b", "c", "d", "e", "f"]
+        for pattern in (["a", "b"], ["c", "d"], ["e", "f"], ["b", "c"]):
+            rabin_karp.find_matches(text, pattern)
+        
+        metrics = rabin_karp.get_performance_metrics()
+        self.assertLessEqual(metrics['cache_entries'], 2)
+        self.assertGreater(metrics['cache_evictions'], 0)
+    
+    def test_hash_cache_keys_are_fixed_size(self):
+        rabin_karp = RabinKarp()
+        text = [f"t{i % 11}" for i in range(2000)]
+        rabin_karp.find_matches(text, text[:1500])
+        
+        keys = [key for key, _ in rabin_karp._hash_cache.items()]
+        self.assertGreater(len(keys), 0)
+        self.assertTrue(all(len(key) == 16 for key in keys))
+    
+    def test_metrics_accurate_under_concurrency(self):
+        text = [f"t{i % 7}" for i in range(50)]
+        patterns = [text[i:i + 3] for i in range(40)]
+        self.rabin_karp.find_all_matches(text, patterns, max_workers=8)
+        
+        # Every find_matches call computes two window hashes (pattern and
+        # first text window), each counted as either a miss or a hit
+        metrics = self.rabin_karp.get_performance_metrics()
+        self.assertEqual(metrics['total_operations'] + metrics['cache_hits'], 2 * len(patterns))
+
+class TestLRUCache(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        evicted = []
+        cache = LRUCache(max_entries=2, on_evict=lambda key, value: evicted.append(key))
+        cache.put("a", 1)
+        cache.put("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.put("c", 3)
+        
+        self.assertEqual(evicted, ["b"])
+        self.assertNotIn("b", cache)
+        self.assertEqual(cache.get_performance_metrics()['evictions'], 1)
+    
+    def test_byte_bound(self):
+        cache = LRUCache(max_entries=None, max_bytes=10)
+        cache.put("a", "x", size=6)
+        cache.put("b", "y", size=6)
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.total_bytes, 6)
+
+class TestFingerprintIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = FingerprintIndex()
+    
+    def test_candidates_share_fingerprints(self):
+        self.index.add("a", [1, 2, 3])
+        self.index.add("b", [3, 4])
+        self.index.add("c", [5])
+        
+        self.assertEqual(self.index.candidates([3, 4, 9]), {"a": 1, "b": 2})
+        self.assertEqual(self.index.candidates([9]), {})
+    
+    def test_remove(self):
+        self.index.add("a", [1, 2])
+        self.index.add("b", [2])
+        
+        self.assertTrue(self.index.remove("a"))
+        self.assertFalse(self.index.remove("a"))
+        self.assertEqual(self.index.candidates([1, 2]), {"b": 1})
+        self.assertNotIn(1, self.index.postings)
+
+class TestUnionFind(unittest.TestCase):
+    def test_union_and_groups(self):
+        uf = UnionFind()
+        for item in "abcde":
+            uf.add(item)
+        self.assertTrue(uf.union("a", "b"))
+        self.assertTrue(uf.union("d", "c"))
+        self.assertTrue(uf.union("b", "c"))
+        self.assertFalse(uf.union("a", "d"))
+        
+        self.assertTrue(uf.connected("a", "d"))
+        self.assertEqual(uf.group("c"), {"a", "b", "c", "d"})
+        self.assertEqual(uf.groups("edcba"), [{"e"}, {"a", "b", "c", "d"}])
+        self.assertEqual(uf.remove_group("a"), {"a", "b", "c", "d"})
+        self.assertEqual(len(uf), 1)
 
 class TestSimilarityGraph(unittest.TestCase):
     def setUp(self):
@@ -118,6 +361,76 @@ class TestSimilarityGraph(unittest.TestCase):
         clusters = self.graph.find_clusters()
         self.assertEqual(len(clusters), 2)
     
+    def test_sparse_clustering_matches_dense(self):
+        for i in range(8):
+            self.graph.add_file(f"file{i}", {"name": f"test{i}.py"})
+        self.graph.add_similarity("file0", "file1", 1.0)
+        self.graph.add_similarity("file1", "file2", 0.85)
+        self.graph.add_similarity("file3", "file4", 0.95)
+        self.graph.add_similarity("file5", "file6", 0.8)
+        self.graph.add_similarity("file6", "file7", 0.9)
+        
+        nodes = list(self.graph.graph.nodes())
+        for eps in (0.05, 0.1, 0.2):
+            for min_samples in (2, 3):
+                clustering = DBSCAN(eps=eps, min_samples=min_samples, metric='precomputed')
+                dense_labels = clustering.fit_predict(self.graph._dense_distance_matrix(nodes))
+                sparse_labels = clustering.fit_predict(self.graph._sparse_distance_matrix(nodes, eps))
+                self.assertEqual(dense_labels.tolist(), sparse_labels.tolist())
+        
+        self.assertEqual(self.graph.find_clusters(eps=0.1),
+                         [{"file0", "file1"}, {"file3", "file4"}, {"file6", "file7"}])
+    
+    def test_incremental_clusters_match_dbscan(self):
+        import networkx as nx
+        self.graph = SimilarityGraph(similarity_threshold=0.7)
+        for i in range(8):
+            self.graph.add_file(f"file{i}", {"name": f"test{i}.py"})
+        self.graph.add_similarity("file0", "file1", 1.0)
+        self.graph.add_similarity("file1", "file2", 0.85)
+        self.graph.add_similarity("file3", "file4", 0.95)
+        self.graph.add_similarity("file5", "file6", 0.8)
+        self.graph.add_similarity("file6", "file7", 0.75)
+        
+        self.assertEqual(self.graph.get_connected_components(),
+                         list(nx.connected_components(self.graph.graph)))
+        self.assertEqual(self.graph.get_cluster_of("file2"), {"file0", "file1", "file2"})
+        self.assertEqual(self.graph.get_cluster_of("file7"), {"file7"})
+        self.assertEqual(self.graph.get_component_of("file7"), {"file5", "file6", "file7"})
+        
+        nodes = list(self.graph.graph.nodes())
+        for min_samples in (1, 2):
+            clustering = DBSCAN(eps=0.2, min_samples=min_samples, metric='precomputed')
+            labels = clustering.fit_predict(self.graph._dense_distance_matrix(nodes))
+            expected = {}
+            for node, label in zip(nodes, labels):
+                if label != -1:
+                    expected.setdefault(label, set()).add(node)
+            self.assertEqual(self.graph.find_clusters(min_samples=min_samples),
+                             list(expected.values()))
+        
+        # Weakening an edge below the cluster range splits the cluster
+        self.graph.add_similarity("file1", "file2", 0.7)
+        self.assertEqual(self.graph.get_cluster_of("file2"), {"file2"})
+        self.assertEqual(self.graph.get_component_of("file2"), {"file0", "file1", "file2"})
+    
+    def test_remove_file_splits_component(self):
+        for i in range(5):
+            self.graph.add_file(f"file{i}", {"name": f"test{i}.py"})
+        self.graph.add_similarity("file0", "file1", 0.9)
+        self.graph.add_similarity("file1", "file2", 0.9)
+        self.graph.add_similarity("file3", "file4", 0.9)
+        
+        self.assertTrue(self.graph.remove_file("file1"))
+        self.assertFalse(self.graph.remove_file("file1"))
+        self.assertEqual(self.graph.get_component_of("file0"), {"file0"})
+        self.assertEqual(self.graph.get_cluster_of("file2"), {"file2"})
+        self.assertEqual(self.graph.get_cluster_of("file4"), {"file3", "file4"})
+        self.assertEqual(self.graph.get_graph_metrics()['total_edges'], 1)
+        
+        self.assertTrue(self.graph.remove_similarity("file4", "file3"))
+        self.assertEqual(self.graph.find_clusters(), [])
+    
     def test_graph_metrics(self):
         self.graph.add_file("file1", {"name": "test1.py"})
         self.graph.add_file("file2", {"name": "test2.py"})
@@ -126,6 +439,25 @@ class TestSimilarityGraph(unittest.TestCase):
         metrics = self.graph.get_graph_metrics()
         self.assertEqual(metrics['total_nodes'], 2)
         self.assertEqual(metrics['total_edges'], 1)
+    
+    def test_similarity_matrix_from_edges(self):
+        for i in range(4):
+            self.graph.add_file(f"file{i}", {"name": f"test{i}.py"})
+        self.graph.add_similarity("file0", "file1", 0.9)
+        self.graph.add_similarity("file2", "file3", 0.85)
+        
+        ids = ["file3", "file0", "file1", "file2"]
+        matrix = self.graph.similarity_matrix(ids)
+        self.assertEqual(matrix.nnz, 4)
+        
+        dense = self.graph.similarity_matrix(ids, dense=True)
+        self.assertEqual(dense.tolist(), [
+            [0.0, 0.0, 0.0, 0.85],
+            [0.0, 0.0, 0.9, 0.0],
+            [0.0, 0.9, 0.0, 0.0],
+            [0.85, 0.0, 0.0, 0.0]
+        ])
+        self.assertEqual(matrix.toarray().tolist(), dense.tolist())
 
 class TestBPlusTree(unittest.TestCase):
     def setUp(self):
@@ -149,6 +481,78 @@ class TestBPlusTree(unittest.TestCase):
         self.assertIsNone(self.tree.search("key1"))
         self.assertIsNotNone(self.tree.search("key2"))
     
+    def test_many_inserts_remain_searchable(self):
+        keys = [f"sub_{i}" for i in range(200)]
+        for i, key in enumerate(keys):
+            self.tree.insert(key, {"value": i})
+        
+        for i, key in enumerate(keys):
+            self.assertEqual(self.tree.search(key)["value"], i)
+        self.assertEqual(len(self.tree.range_search("", "zzzzzzzzzz")), len(keys))
+    
+    def test_random_operations_match_dict(self):
+        import random
+        rng = random.Random(7)
+        for order in (3, 4, 5, 128):
+            tree = BPlusTree(order=order)
+            expected = {}
+            for _ in range(2000):
+                key = f"sub_{rng.randrange(300):03d}"
+                if rng.random() < 0.3:
+                    self.assertEqual(tree.delete(key), key in expected)
+                    expected.pop(key, None)
+                else:
+                    tree.insert(key, {"value": key})
+                    expected[key] = {"value": key}
+            
+            for key in (f"sub_{i:03d}" for i in range(300)):
+                self.assertEqual(tree.search(key), expected.get(key))
+            self.assertEqual(tree.range_search("", "zzzzzzzzzz"), sorted(expected.items()))
+            self.assertEqual(tree.range_search("sub_100", "sub_199"),
+                             sorted(kv for kv in expected.items() if "sub_100" <= kv[0] <= "sub_199"))
+            
+            # Draining the tree cascades merges up to the root
+            for key in rng.sample(sorted(expected), len(expected)):
+                self.assertTrue(tree.delete(key))
+            self.assertEqual(len(tree), 0)
+            self.assertEqual(tree.range_search("", "zzzzzzzzzz"), [])
+    
+    def test_nodes_use_slots(self):
+        self.tree.insert("key1", {"value": 1})
+        self.assertFalse(hasattr(self.tree.root, '__dict__'))
+        self.assertEqual(self.tree.order, 128)
+    
+    def test_bulk_load(self):
+        items = [(f"sub_{i:05d}", {"value": i}) for i in range(1000)]
+        for order in (3, 4, 128):
+            tree = BPlusTree.bulk_load(items, order=order)
+            self.assertEqual(len(tree), len(items))
+            self.assertEqual(tree.items(), items)
+            self.assertEqual(tree.search("sub_00500"), {"value": 500})
+            
+            # The loaded tree stays valid under further updates
+            for key, _ in items[::3]:
+                self.assertTrue(tree.delete(key))
+            tree.insert("sub_99999", {"value": -1})
+            self.assertEqual(tree.items(), [kv for i, kv in enumerate(items) if i % 3]
+                             + [("sub_99999", {"value": -1})])
+        
+        with self.assertRaises(ValueError):
+            BPlusTree.bulk_load([("b", 1), ("a", 2)])
+    
+    def test_lazy_iterators(self):
+        keys = ["a_1", "a_2", "ab_1", "b_1", "zzzzzzzzzzz_1", "~tail"]
+        for key in reversed(keys):
+            self.tree.insert(key, {"value": key})
+        
+        iterator = self.tree.iter_all()
+        self.assertEqual(next(iterator), ("a_1", {"value": "a_1"}))
+        self.assertEqual([k for k, _ in self.tree.iter_all()], keys)
+        self.assertEqual([k for k, _ in self.tree.iter_prefix("a_")], ["a_1", "a_2"])
+        self.assertEqual([k for k, _ in self.tree.iter_range("ab", None)], keys[2:])
+        self.assertEqual([k for k, _ in self.tree.iter_range(None, "ab_1")], keys[:3])
+        self.assertEqual(list(BPlusTree().iter_all()), [])
+    
     def test_range_search(self):
         for i in range(5):
             self.tree.insert(f"key{i}", {"value": i})
@@ -176,6 +580,729 @@ class TestBPlusTree(unittest.TestCase):
         
         # Clean up
         os.unlink(f.name)
+    
+    def test_binary_snapshot_round_trip(self):
+        items = [(f"sub_{i:04d}", {"file_name": f"s{i}.py", "file_size": i,
+                                   "tokens": np.arange(i, i + 50, dtype=np.uint32)})
+                 for i in range(0, 3000, 3)]
+        tree = BPlusTree.bulk_load(items, order=4)
+        
+        temp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(temp_dir, "tree.bin")
+            tree.save_tree(path)
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(4), b'PDBS')
+            
+            loaded = BPlusTree(order=4)
+            loaded.load_tree(path)
+            self.assertEqual(len(loaded), len(items))
+            for (key, value), (loaded_key, loaded_value) in zip(items, loaded.iter_all()):
+                self.assertEqual(key, loaded_key)
+                self.assertEqual(loaded_value["file_size"], value["file_size"])
+                self.assertEqual(loaded_value["tokens"].dtype, np.uint32)
+                self.assertEqual(loaded_value["tokens"].tolist(), value["tokens"].tolist())
+        finally:
+            shutil.rmtree(temp_dir)
+    
+    def test_load_legacy_json_snapshot(self):
+        legacy = {"is_leaf": False, "keys": ["b"], "values": None, "children": [
+            {"is_leaf": True, "keys": ["a"], "values": [{"value": 1}], "children": None},
+            {"is_leaf": True, "keys": ["b", "c"], "values": [{"value": 2}, {"value": 3}], "children": None}
+        ]}
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+            json.dump(legacy, f)
+        try:
+            self.tree.load_tree(f.name)
+            self.assertEqual(self.tree.items(), [("a", {"value": 1}), ("b", {"value": 2}), ("c", {"value": 3})])
+        finally:
+            os.unlink(f.name)
+
+class TestTokenStore(unittest.TestCase):
+    def test_add_get_and_compact(self):
+        store = TokenStore(initial_capacity=4)
+        arrays = [np.arange(i, i + n, dtype=np.uint32) for i, n in ((0, 3), (10, 5), (20, 0), (30, 7))]
+        handles = [store.add(array) for array in arrays]
+        for handle, array in zip(handles, arrays):
+            self.assertEqual(store.get(handle).tolist(), array.tolist())
+        self.assertFalse(store.get(handles[0]).flags.writeable)
+        
+        old_view = store.get(handles[3])
+        store.remove(handles[1])
+        store.remove(handles[3])
+        self.assertEqual(store.get_performance_metrics()['compactions'], 1)
+        self.assertEqual(store.get(handles[0]).tolist(), arrays[0].tolist())
+        self.assertEqual(old_view.tolist(), arrays[3].tolist())
+        self.assertEqual(len(store), 2)
+        with self.assertRaises(KeyError):
+            store.get(handles[1])
+    
+    def test_extend_appends_to_last_array(self):
+        store = TokenStore(initial_capacity=2)
+        first = store.add(np.array([1, 2], dtype=np.uint32))
+        last = store.add(np.empty(0, dtype=np.uint32))
+        for block in ([3, 4, 5], [], [6]):
+            store.extend(last, np.array(block, dtype=np.uint32))
+        self.assertEqual(store.get(first).tolist(), [1, 2])
+        self.assertEqual(store.get(last).tolist(), [3, 4, 5, 6])
+        with self.assertRaises(ValueError):
+            store.extend(first, np.array([7], dtype=np.uint32))
+
+class TestPagedBPlusTree(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "metadata.db")
+    
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+    
+    def test_random_operations_survive_reopen(self):
+        import random
+        rng = random.Random(3)
+        expected = {}
+        
+        # A tiny buffer pool forces nodes to be written back and re-read
+        with PagedBPlusTree(self.path, order=5, pool_pages=16) as tree:
+            for step in range(2000):
+                key = f"sub_{rng.randrange(400):03d}"
+                if rng.random() < 0.3:
+                    self.assertEqual(tree.delete(key), key in expected)
+                    expected.pop(key, None)
+                else:
+                    value = {"step": step, "text": "x" * rng.choice([1, 5000])}
+                    self.assertTrue(tree.insert(key, value))
+                    expected[key] = value
+            self.assertEqual(tree.items(), sorted(expected.items()))
+        
+        with PagedBPlusTree(self.path) as tree:
+            self.assertEqual(len(tree), len(expected))
+            self.assertEqual(tree.order, 5)
+            for key in (f"sub_{i:03d}" for i in range(400)):
+                self.assertEqual(tree.search(key), expected.get(key))
+            self.assertEqual([k for k, _ in tree.iter_prefix("sub_1")],
+                             sorted(k for k in expected if k.startswith("sub_1")))
+    
+    def test_lookup_touches_few_pages(self):
+        with PagedBPlusTree(self.path) as tree:
+            for i in range(20000):
+                tree.insert(f"sub_{i:05d}", {"tokens": np.arange(i % 7, dtype=np.uint32)})
+        
+        with PagedBPlusTree(self.path) as tree:
+            value = tree.search("sub_12345")
+            self.assertEqual(value["tokens"].tolist(), list(range(12345 % 7)))
+            self.assertLessEqual(tree.get_performance_metrics()['page_reads'], 6)
+    
+    def test_rejects_foreign_file(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'{"keys": []}' * 100)
+        with self.assertRaises(ValueError):
+            PagedBPlusTree(self.path)
+
+class TestParseCache(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+    
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+    
+    def test_round_trip(self):
+        cache = ParseCache(self.cache_dir, parser_version=1)
+        key = cache.make_key(b"x = 1", ".py", 5, 4, 0)
+        self.assertIsNone(cache.get(key))
+        
+        cache.put(key, ["x", "=", "1"], np.array([0, 1, 2, 0], dtype=np.uint32),
+                  {7, 3}, np.array([11, 12], dtype=np.uint64))
+        distinct_tokens, token_indexes, fingerprints, kgram_hashes = cache.get(key)
+        
+        self.assertEqual(distinct_tokens, ["x", "=", "1"])
+        self.assertEqual(token_indexes.tolist(), [0, 1, 2, 0])
+        self.assertEqual(fingerprints, {3, 7})
+        self.assertEqual(kgram_hashes.tolist(), [11, 12])
+        self.assertNotEqual(key, cache.make_key(b"x = 1", ".py", 6, 4, 0))
+    
+    def test_parser_version_change_invalidates(self):
+        cache = ParseCache(self.cache_dir, parser_version=1)
+        key = cache.make_key(b"x", ".py", 5, 4, 0)
+        cache.put(key, ["x"], np.zeros(1, dtype=np.uint32), set(), np.zeros(0, dtype=np.uint64))
+        
+        upgraded = ParseCache(self.cache_dir, parser_version=2)
+        self.assertEqual(len(upgraded), 0)
+        self.assertIsNone(upgraded.get(upgraded.make_key(b"x", ".py", 5, 4, 0)))
+        self.assertFalse(os.path.exists(cache.entry_dir))
+    
+    def test_unrelated_directories_survive_purge(self):
+        for name in ("venv", "vendor", "v1.0", "v9.9"):
+            os.makedirs(os.path.join(self.cache_dir, name))
+            Path(self.cache_dir, name, "keep.txt").write_text("data")
+        ParseCache(self.cache_dir, parser_version=1)
+        ParseCache(self.cache_dir, parser_version=2)
+        
+        # Only the version directory written by the cache itself is removed
+        for name in ("venv", "vendor", "v1.0", "v9.9"):
+            self.assertTrue(os.path.exists(os.path.join(self.cache_dir, name, "keep.txt")))
+        self.assertFalse(os.path.exists(os.path.join(self.cache_dir, "v1.1")))
+    
+    def test_size_limit(self):
+        cache = ParseCache(self.cache_dir, parser_version=1, max_bytes=400)
+        for i in range(10):
+            key = cache.make_key(str(i).encode(), ".py", 5, 4, 0)
+            cache.put(key, [f"token{i}"], np.zeros(20, dtype=np.uint32), set(), np.zeros(0, dtype=np.uint64))
+        
+        metrics = cache.get_performance_metrics()
+        self.assertLessEqual(metrics['bytes'], 400)
+        self.assertGreater(metrics['evictions'], 0)
+
+class TestMinHashLSH(unittest.TestCase):
+    def test_signature_estimates_jaccard(self):
+        lsh = MinHashLSH(bands=64, rows=4)
+        base = np.arange(1000, dtype=np.uint64)
+        self.assertTrue(np.array_equal(lsh.signature(base), lsh.signature(base[::-1])))
+        
+        # Jaccard similarity of 600 / 1400
+        estimate = lsh.estimate_similarity(lsh.signature(base), lsh.signature(base + 400))
+        self.assertAlmostEqual(estimate, 600 / 1400, delta=0.1)
+    
+    def test_query_finds_near_duplicates(self):
+        lsh = MinHashLSH(bands=16, rows=4)
+        base = np.arange(500, dtype=np.uint64)
+        lsh.add("original", lsh.signature(base))
+        lsh.add("unrelated", lsh.signature(base + 10000))
+        
+        near_duplicate = np.concatenate([base[:490], np.arange(20000, 20010, dtype=np.uint64)])
+        self.assertEqual(lsh.query(lsh.signature(near_duplicate)), {"original"})
+        
+        self.assertTrue(lsh.remove("original"))
+        self.assertFalse(lsh.remove("original"))
+        self.assertEqual(lsh.query(lsh.signature(near_duplicate)), set())
+        self.assertEqual(len(lsh), 1)
+
+class TestSuffixArray(unittest.TestCase):
+    def test_matches_naive_sort(self):
+        rng = np.random.default_rng(7)
+        for _ in range(50):
+            values = rng.integers(0, 3, rng.integers(1, 40))
+            suffix_array = SuffixArray(values)
+            expected = sorted(range(len(values)), key=lambda i: values[i:].tolist())
+            self.assertEqual(suffix_array.sa.tolist(), expected)
+            
+            for i in range(1, len(values)):
+                a, b = values[expected[i - 1]:], values[expected[i]:]
+                common = 0
+                while common < min(len(a), len(b)) and a[common] == b[common]:
+                    common += 1
+                self.assertEqual(suffix_array.lcp[i], common)
+            
+            pattern = values[:2]
+            occurrences = [i for i in range(len(values) - len(pattern) + 1)
+                           if values[i:i + len(pattern)].tolist() == pattern.tolist()]
+            self.assertEqual(suffix_array.find(pattern).tolist(), occurrences)
+
+class TestGreedyStringTiling(unittest.TestCase):
+    def test_tiles_are_maximal_and_disjoint(self):
+        rng = np.random.default_rng(11)
+        tiling = GreedyStringTiling(min_match_length=3)
+        for _ in range(50):
+            first = rng.integers(0, 4, rng.integers(0, 40))
+            second = rng.integers(0, 4, rng.integers(0, 40))
+            covered_first = np.zeros(len(first), dtype=bool)
+            covered_second = np.zeros(len(second), dtype=bool)
+            for a, b, length in tiling.tiles(first, second):
+                self.assertGreaterEqual(length, 3)
+                self.assertEqual(first[a:a + length].tolist(), second[b:b + length].tolist())
+                self.assertFalse(covered_first[a:a + length].any() or covered_second[b:b + length].any())
+                covered_first[a:a + length] = True
+                covered_second[b:b + length] = True
+            
+            # No match of the minimum length is left between uncovered tokens
+            for a in range(len(first) - 2):
+                for b in range(len(second) - 2):
+                    if not covered_first[a:a + 3].any() and not covered_second[b:b + 3].any():
+                        self.assertNotEqual(first[a:a + 3].tolist(), second[b:b + 3].tolist())
+    
+    def test_reordered_blocks_are_covered(self):
+        rng = np.random.default_rng(3)
+        original = rng.integers(0, 1000, 400)
+        reordered = np.concatenate([original[200:], original[:200]])
+        tiling = GreedyStringTiling(min_match_length=8)
+        self.assertEqual(tiling.tiles(original, reordered), [(0, 200, 200), (200, 0, 200)])
+        self.assertEqual(tiling.similarity(original, reordered), 1.0)
+        self.assertEqual(tiling.similarity(original, rng.integers(1000, 2000, 400)), 0.0)
+    
+    def test_one_suffix_array_per_pair(self):
+        from unittest import mock
+        import greedy_string_tiling
+        from bench.gst_benchmark import shuffled_pair
+        
+        first, second = shuffled_pair(4000, chunk=40, seed=2)
+        tiling = GreedyStringTiling(min_match_length=8)
+        with mock.patch.object(greedy_string_tiling, 'SuffixArray', wraps=SuffixArray) as build:
+            tiles = tiling.tiles(first, second)
+        self.assertEqual(build.call_count, 1)
+        # Many distinct tile lengths, all found from the one suffix array
+        self.assertGreater(len({length for _, _, length in tiles}), 20)
+        self.assertGreater(sum(length for _, _, length in tiles), 0.95 * len(first))
+    
+    def test_repeated_kgram_is_tiled_in_one_pass(self):
+        tiling = GreedyStringTiling(min_match_length=3)
+        first = np.tile([1, 2, 3], 3000)
+        second = np.tile([1, 2, 3, 4], 2000)
+        tiles = tiling.tiles(first, second)
+        self.assertEqual(len(tiles), 2000)
+        self.assertTrue(all(length == 3 for _, _, length in tiles))
+        self.assertEqual(tiling.get_performance_metrics()['rounds'], 1)
+
+class TestFragmentIndex(unittest.TestCase):
+    def test_shared_kgram_counts_match_naive(self):
+        rng = np.random.default_rng(5)
+        documents = [(f"doc{i}", rng.integers(0, 3, rng.integers(0, 30))) for i in range(5)]
+        index = FragmentIndex(documents, window_size=3)
+        
+        expected = {}
+        for i, (first_id, first) in enumerate(documents):
+            for second_id, second in documents[i + 1:]:
+                first_kgrams = [tuple(first[j:j + 3]) for j in range(len(first) - 2)]
+                second_kgrams = [tuple(second[j:j + 3]) for j in range(len(second) - 2)]
+                counts = (sum(g in set(second_kgrams) for g in first_kgrams),
+                          sum(g in set(first_kgrams) for g in second_kgrams))
+                if counts != (0, 0):
+                    expected[(first_id, second_id)] = counts
+        self.assertEqual(index.shared_kgram_counts(), expected)
+    
+    def test_shared_fragments(self):
+        shared = np.arange(100, 110)
+        documents = [("a", np.concatenate([[1, 2], shared, [3]])),
+                     ("b", np.concatenate([shared, [4, 5]])),
+                     ("c", np.array([6, 7, 8, 9, 1, 2]))]
+        fragments = list(FragmentIndex(documents, window_size=5).shared_fragments())
+        self.assertEqual(len(fragments), 1)
+        tokens, owners, occurrences = fragments[0]
+        self.assertEqual(tokens.tolist(), shared.tolist())
+        self.assertEqual(owners, ["a", "b"])
+        self.assertEqual(occurrences, [("a", 2), ("b", 0)])
+
+class TestPlagiarismDetector(unittest.TestCase):
+    def _edges(self, detector):
+        graph = detector.similarity_graph.graph
+        return {(min(u, v), max(u, v), w) for u, v, w in graph.edges(data='weight')}
+    
+    def test_index_matches_exhaustive_comparison(self):
+        indexed = PlagiarismDetector(use_index=True)
+        exhaustive = PlagiarismDetector(use_index=False)
+        
+        self.assertEqual(indexed.process_directory(TEST_FILES_DIR),
+                         exhaustive.process_directory(TEST_FILES_DIR))
+        self.assertEqual(self._edges(indexed), self._edges(exhaustive))
+        self.assertGreater(len(self._edges(indexed)), 0)
+    
+    def test_parallel_ingestion_matches_serial(self):
+        serial = PlagiarismDetector()
+        parallel = PlagiarismDetector()
+        
+        self.assertEqual(serial.process_directory(TEST_FILES_DIR),
+                         parallel.process_directory(TEST_FILES_DIR, jobs=2))
+        self.assertEqual(list(serial.submissions), list(parallel.submissions))
+        self.assertEqual(self._edges(serial), self._edges(parallel))
+        for submission_id in serial.submissions:
+            self.assertEqual(serial.parser.vocabulary.decode(serial.get_tokens(submission_id)),
+                             parallel.parser.vocabulary.decode(parallel.get_tokens(submission_id)))
+    
+    def test_parse_cache_reuses_entries(self):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            first = PlagiarismDetector(cache_dir=cache_dir)
+            first.process_directory(TEST_FILES_DIR)
+            self.assertGreater(first.parse_cache.get_performance_metrics()['writes'], 0)
+            
+            second = PlagiarismDetector(cache_dir=cache_dir)
+            second.process_directory(TEST_FILES_DIR)
+            metrics = second.parse_cache.get_performance_metrics()
+            self.assertEqual(metrics['misses'], 0)
+            self.assertEqual(metrics['hits'], len(second.submissions))
+            self.assertEqual(self._edges(first), self._edges(second))
+        finally:
+            shutil.rmtree(cache_dir)
+    
+    def test_streamed_files_match_whole_file_parsing(self):
+        reference = PlagiarismDetector()
+        reference.process_directory(TEST_FILES_DIR)
+        cache_dir = tempfile.mkdtemp()
+        try:
+            for cache in (None, cache_dir, cache_dir):
+                streaming = PlagiarismDetector(cache_dir=cache)
+                streaming.parser.stream_threshold = 0
+                streaming.process_directory(TEST_FILES_DIR)
+                self.assertEqual(self._edges(streaming), self._edges(reference))
+                for submission_id in reference.submissions:
+                    self.assertEqual(
+                        streaming.parser.vocabulary.decode(streaming.get_tokens(submission_id)),
+                        reference.parser.vocabulary.decode(reference.get_tokens(submission_id)))
+            self.assertEqual(streaming.parse_cache.get_performance_metrics()['misses'], 0)
+            
+            # Parallel workers stream too, and pick up the entries written above
+            parallel = PlagiarismDetector(cache_dir=cache_dir)
+            parallel.parser.stream_threshold = 0
+            parallel.process_directory(TEST_FILES_DIR, jobs=2)
+            self.assertEqual(self._edges(parallel), self._edges(reference))
+        finally:
+            shutil.rmtree(cache_dir)
+    
+    def test_batch_ingest_bulk_loads_metadata(self):
+        detector = PlagiarismDetector()
+        processed = detector.process_directory(TEST_FILES_DIR)
+        
+        self.assertEqual(len(detector.metadata_store), processed)
+        self.assertEqual([key for key, _ in detector.metadata_store.items()], sorted(detector.submissions))
+        self.assertIsNone(detector._pending_metadata)
+        
+        # A second batch is merged with the stored metadata
+        paths = sorted(Path(TEST_FILES_DIR).glob("*.py"))[:3]
+        added = detector.add_submissions((str(path), f"extra_{i}") for i, path in enumerate(paths))
+        self.assertEqual(added, 3)
+        self.assertEqual(len(detector.metadata_store), processed + 3)
+        metadata = detector.get_submission_metadata("extra_0")
+        self.assertEqual(metadata['token_count'], len(detector.get_tokens("extra_0")))
+    
+    def test_ids_beyond_old_range_sentinel(self):
+        detector = PlagiarismDetector(use_index=False)
+        path = os.path.join(TEST_FILES_DIR, "simple_sum.py")
+        self.assertTrue(detector.add_submission(path, "zzzzzzzzzzz_original"))
+        self.assertTrue(detector.add_submission(path, "~copy"))
+        
+        self.assertEqual(self._edges(detector), {("zzzzzzzzzzz_original", "~copy", 1.0)})
+        submission_ids, _ = detector.get_similarity_matrix()
+        self.assertEqual(submission_ids, ["zzzzzzzzzzz_original", "~copy"])
+    
+    def test_disk_backed_metadata_store(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(temp_dir, "metadata.db")
+            detector = PlagiarismDetector(metadata_path=path)
+            processed = detector.process_directory(TEST_FILES_DIR)
+            metadata = detector.get_submission_metadata("simple_sum_17")
+            detector.close()
+            
+            with PagedBPlusTree(path) as store:
+                self.assertEqual(len(store), processed)
+                self.assertEqual(store.search("simple_sum_17"), metadata)
+            
+            # Existing records are never cleared without an explicit opt-in
+            with self.assertRaises(ValueError):
+                PlagiarismDetector(metadata_path=path)
+            with PagedBPlusTree(path) as store:
+                self.assertEqual(len(store), processed)
+            
+            reopened = PlagiarismDetector(metadata_path=path, overwrite_metadata=True)
+            self.assertEqual(len(reopened.metadata_store), 0)
+            self.assertEqual(reopened.get_submission_metadata("simple_sum_17"), {})
+            self.assertTrue(reopened.add_submission(
+                os.path.join(TEST_FILES_DIR, "simple_sum.py"), "simple_sum"))
+            self.assertEqual(list(reopened.metadata_store.iter_all())[0][0], "simple_sum")
+            self.assertEqual(len(reopened.metadata_store), 1)
+            reopened.close()
+        finally:
+            shutil.rmtree(temp_dir)
+    
+    def test_metadata_keeps_token_handle_only(self):
+        detector = PlagiarismDetector()
+        detector.process_directory(TEST_FILES_DIR)
+        
+        metadata = detector.get_submission_metadata("simple_sum_17")
+        self.assertNotIn('tokens', metadata)
+        self.assertEqual(detector.similarity_graph.graph.nodes["simple_sum_17"], {})
+        tokens = detector.get_tokens("simple_sum_17")
+        self.assertEqual(detector.token_store.get(metadata['token_handle']).tolist(), tokens.tolist())
+        self.assertEqual(metadata['token_count'], len(tokens))
+        self.assertIn("def", detector.parser.vocabulary.decode(tokens))
+    
+    def test_async_ingestion_matches_serial(self):
+        import asyncio
+        serial = PlagiarismDetector()
+        serial.process_directory(TEST_FILES_DIR)
+        paths = list(serial._iter_source_files(TEST_FILES_DIR))
+        
+        detector = PlagiarismDetector(async_queue_size=2)
+        
+        async def run():
+            results = []
+            
+            async def read_results():
+                async for result in detector.results():
+                    results.append(result)
+            
+            reader = asyncio.ensure_future(read_results())
+            await asyncio.sleep(0)
+            futures = []
+            for i, path in enumerate(paths):
+                submission_id = serial._make_submission_id(path, i)
+                if path.endswith(".py"):
+                    # Submit Python files as raw bytes from an upload
+                    with open(path, 'rb') as f:
+                        futures.append(await detector.submit(f.read(), submission_id,
+                                                             file_name=os.path.basename(path)))
+                else:
+                    futures.append(await detector.submit(path, submission_id))
+                self.assertLessEqual(detector._ingest_queue.qsize(), 2)
+            
+            first = await futures[0]
+            await detector.aclose()
+            await reader
+            return first, results
+        
+        first, results = asyncio.run(run())
+        self.assertTrue(first['success'])
+        self.assertEqual([r['submission_id'] for r in results], list(serial.submissions))
+        self.assertEqual(self._edges(detector), self._edges(serial))
+        self.assertIsNone(detector.get_submission_metadata("simple_sum_17")['file_path'])
+        
+        with self.assertRaises(ValueError):
+            asyncio.run(detector.submit(b"x = 1", "no_name"))
+    
+    def test_incremental_rescan(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            corpus = os.path.join(temp_dir, "corpus")
+            shutil.copytree(TEST_FILES_DIR, corpus)
+            detector = PlagiarismDetector()
+            
+            first = detector.rescan_directory(corpus)
+            self.assertEqual(len(first['added']), len(detector.submissions))
+            ids = {Path(p).name: s['submission_id'] for p, s in detector._scan_state.items()}
+            
+            # Unchanged directory: nothing is reprocessed
+            metrics = detector.rabin_karp.get_performance_metrics()
+            self.assertEqual(detector.rescan_directory(corpus),
+                             {'added': [], 'modified': [], 'removed': [], 'failed': [],
+                              'unchanged': len(ids)})
+            self.assertEqual(detector.rabin_karp.get_performance_metrics(), metrics)
+            
+            shutil.copy(os.path.join(corpus, "simple_sum.py"), os.path.join(corpus, "late_copy.py"))
+            with open(os.path.join(corpus, "simple_sum_modified.py"), 'a') as f:
+                f.write("\nprint('changed')\n")
+            os.remove(os.path.join(corpus, "simple_sum_copy.py"))
+            os.utime(os.path.join(corpus, "simple_sum_reordered.py"))
+            
+            second = detector.rescan_directory(corpus)
+            self.assertEqual(second['modified'], [ids["simple_sum_modified.py"]])
+            self.assertEqual(second['removed'], [ids["simple_sum_copy.py"]])
+            self.assertEqual(len(second['added']), 1)
+            self.assertEqual(second['unchanged'], len(ids) - 2)
+            
+            late_id = second['added'][0]
+            self.assertNotIn(ids["simple_sum_copy.py"], detector.similarity_graph.graph)
+            self.assertIsNone(detector.metadata_store.search(ids["simple_sum_copy.py"]))
+            self.assertIn(ids["simple_sum.py"], dict(detector.similarity_graph.find_similar_files(late_id)))
+            
+            # IDs only depend on relative paths
+            other = PlagiarismDetector()
+            other.rescan_directory(corpus, jobs=2)
+            self.assertEqual(set(other.submissions), set(detector.submissions))
+        finally:
+            shutil.rmtree(temp_dir)
+    
+    def test_rescan_drops_submission_that_fails_to_reingest(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(temp_dir, "a.py")
+            shutil.copy(os.path.join(TEST_FILES_DIR, "simple_sum.py"), path)
+            detector = PlagiarismDetector()
+            submission_id = detector.rescan_directory(temp_dir)['added'][0]
+            
+            # Invalid UTF-8 cannot be parsed
+            with open(path, 'wb') as f:
+                f.write(b"def f():\n    return '\xff\xfe'\n")
+            self.assertEqual(detector.rescan_directory(temp_dir),
+                             {'added': [], 'modified': [], 'removed': [],
+                              'failed': [submission_id], 'unchanged': 0})
+            self.assertNotIn(submission_id, detector.submissions)
+            self.assertIsNone(detector.metadata_store.search(submission_id))
+            
+            # Retried on the next rescan, and never left behind once deleted
+            self.assertEqual(detector.rescan_directory(temp_dir)['failed'], [submission_id])
+            os.remove(path)
+            self.assertEqual(detector.rescan_directory(temp_dir),
+                             {'added': [], 'modified': [], 'removed': [], 'failed': [],
+                              'unchanged': 0})
+            self.assertEqual(detector.submissions, {})
+        finally:
+            shutil.rmtree(temp_dir)
+    
+    def _ingest_in_order(self, files, use_index=True):
+        detector = PlagiarismDetector(use_index=use_index)
+        for submission_id, path in files:
+            self.assertTrue(detector.add_submission(path, submission_id))
+        return detector
+    
+    def test_replace_submission_matches_rebuild(self):
+        reference = PlagiarismDetector()
+        paths = list(reference._iter_source_files(TEST_FILES_DIR))
+        files = [(reference._make_submission_id(path, i), path) for i, path in enumerate(paths)]
+        position = next(i for i, (submission_id, _) in enumerate(files) if submission_id.startswith("file_e_"))
+        replacement = os.path.join(TEST_FILES_DIR, "simple_sum.py")
+        
+        for use_index in (True, False):
+            detector = self._ingest_in_order(files, use_index)
+            self.assertTrue(detector.replace_submission(files[position][0], replacement))
+            
+            rebuilt_files = list(files)
+            rebuilt_files[position] = (files[position][0], replacement)
+            rebuilt = self._ingest_in_order(rebuilt_files, use_index)
+            
+            self.assertEqual(self._edges(detector), self._edges(rebuilt))
+            self.assertEqual({frozenset(c) for c in detector.similarity_graph.get_connected_components()},
+                             {frozenset(c) for c in rebuilt.similarity_graph.get_connected_components()})
+            self.assertEqual(len(detector.token_store), len(files))
+        
+        # The old version is kept when the new file cannot be parsed
+        self.assertFalse(detector.replace_submission(files[position][0], "missing.py"))
+        self.assertIn(files[position][0], detector.submissions)
+    
+    def test_remove_submission(self):
+        reference = PlagiarismDetector()
+        paths = list(reference._iter_source_files(TEST_FILES_DIR))
+        files = [(reference._make_submission_id(path, i), path) for i, path in enumerate(paths)]
+        detector = self._ingest_in_order(files)
+        
+        removed_id = next(submission_id for submission_id, _ in files if submission_id.startswith("file_f_"))
+        cluster = detector.get_submission_cluster(removed_id)
+        self.assertGreater(len(cluster), 1)
+        
+        self.assertTrue(detector.remove_submission(removed_id))
+        self.assertFalse(detector.remove_submission(removed_id))
+        
+        remaining = self._ingest_in_order([f for f in files if f[0] != removed_id])
+        self.assertEqual(self._edges(detector), self._edges(remaining))
+        self.assertNotIn(removed_id, detector.fingerprint_index)
+        self.assertIsNone(detector.metadata_store.search(removed_id))
+        self.assertIsNone(detector.get_tokens(removed_id))
+        self.assertEqual(detector.get_submission_cluster(removed_id), set())
+        for submission_id in cluster - {removed_id}:
+            self.assertEqual(detector.get_submission_cluster(submission_id),
+                             remaining.get_submission_cluster(submission_id))
+    
+    def test_lsh_candidates_and_recall_report(self):
+        exact = PlagiarismDetector()
+        approximate = PlagiarismDetector(use_lsh=True, lsh_bands=32, lsh_rows=4)
+        exact.process_directory(TEST_FILES_DIR)
+        approximate.process_directory(TEST_FILES_DIR)
+        
+        # Every edge found through LSH candidates is an exact edge
+        self.assertLessEqual(self._edges(approximate), self._edges(exact))
+        self.assertEqual(len(approximate.lsh), len(approximate.fingerprint_index))
+        
+        report = approximate.lsh_recall_report()
+        self.assertEqual((report['bands'], report['rows']), (32, 4))
+        self.assertEqual(report['submissions'], len(approximate.submissions))
+        self.assertGreater(report['matching_pairs'], 0)
+        self.assertEqual(report['recall'], report['found_pairs'] / report['matching_pairs'])
+        self.assertLessEqual(report['avg_candidates'], report['submissions'])
+        
+        removed_id = next(iter(approximate.lsh._signatures))
+        approximate.remove_submission(removed_id)
+        self.assertNotIn(removed_id, approximate.lsh)
+    
+    def test_gst_engine_finds_reordered_code(self):
+        indexed = PlagiarismDetector(engine='gst')
+        exhaustive = PlagiarismDetector(engine='gst', use_index=False)
+        indexed.process_directory(TEST_FILES_DIR)
+        exhaustive.process_directory(TEST_FILES_DIR)
+        self.assertEqual(self._edges(indexed), self._edges(exhaustive))
+        
+        reordered_id = next(s for s in indexed.submissions if s.startswith("simple_sum_reordered_"))
+        self.assertTrue(any(s.startswith("simple_sum_") and s != reordered_id
+                            for s in indexed.get_submission_cluster(reordered_id)))
+        self.assertEqual(PlagiarismDetector().process_directory(TEST_FILES_DIR),
+                         len(indexed.submissions))
+        with self.assertRaises(ValueError):
+            PlagiarismDetector(engine='unknown')
+    
+    def test_one_pass_batch_scoring(self):
+        detector = PlagiarismDetector()
+        detector.process_directory(TEST_FILES_DIR, one_pass=True)
+        
+        reordered_id = next(s for s in detector.submissions if s.startswith("simple_sum_reordered_"))
+        self.assertGreater(len(detector.get_submission_cluster(reordered_id)), 1)
+        pairwise = PlagiarismDetector()
+        pairwise.process_directory(TEST_FILES_DIR)
+        for cluster in pairwise.similarity_graph.find_clusters():
+            self.assertTrue(cluster <= detector.get_submission_cluster(next(iter(cluster))))
+        
+        fragments = list(detector.find_shared_fragments())
+        self.assertTrue(fragments)
+        for tokens, owners, occurrences in fragments:
+            self.assertGreaterEqual(len(tokens), detector.window_size)
+            self.assertGreater(len(owners), 1)
+            for owner, start in occurrences:
+                self.assertEqual(detector.get_tokens(owner)[start:start + len(tokens)].tolist(),
+                                 tokens.tolist())
+    
+    def test_similarity_matrix_outputs(self):
+        detector = PlagiarismDetector()
+        detector.process_directory(TEST_FILES_DIR)
+        
+        submission_ids, matrix = detector.get_similarity_matrix()
+        _, sparse_matrix = detector.get_similarity_matrix(output='sparse')
+        
+        # Same result as looking up every pair through find_similar_files
+        for i, id1 in enumerate(submission_ids):
+            similar = dict(detector.similarity_graph.find_similar_files(id1))
+            for j, id2 in enumerate(submission_ids):
+                expected = similar.get(id2, 0.0) if i != j else 0.0
+                self.assertEqual(matrix[i][j], expected)
+        self.assertEqual(sparse_matrix.toarray().tolist(), matrix)
+
+class TestBenchmarkSuite(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+    
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+    
+    def test_corpus_generator_is_reproducible(self):
+        from bench.corpus import generate_corpus, load_manifest
+        first, second = os.path.join(self.test_dir, "a"), os.path.join(self.test_dir, "b")
+        manifest = generate_corpus(first, files=60, clone_rate=0.5, seed=7)
+        self.assertEqual(generate_corpus(second, files=60, clone_rate=0.5, seed=7), manifest)
+        self.assertEqual(load_manifest(first), manifest)
+        
+        parser = CodeParser()
+        names = [entry['file'] for entry in manifest]
+        for index, entry in enumerate(manifest):
+            self.assertEqual(Path(first, entry['file']).read_text(),
+                             Path(second, entry['file']).read_text())
+            self.assertGreater(len(parser.parse_file(os.path.join(first, entry['file']))), 0)
+            if entry['source'] is not None:
+                # Clones come after their source and are in the same language
+                self.assertLess(names.index(entry['source']), index)
+                self.assertTrue(entry['source'].endswith(entry['language']))
+        self.assertTrue(any(entry['kind'] != 'original' for entry in manifest))
+    
+    def test_gst_benchmark_reports_scaling(self):
+        from bench.gst_benchmark import benchmark_gst
+        report = benchmark_gst([500, 2000], repeat=1)
+        self.assertEqual([run['tokens'] for run in report['runs']], [500, 2000])
+        for run in report['runs']:
+            self.assertGreater(run['coverage'], 0.9)
+        self.assertIsInstance(report['exponent'], float)
+    
+    def test_pipeline_benchmark_and_baseline_comparison(self):
+        from bench.pipeline_benchmark import STAGES, compare_with_baseline, run_benchmarks
+        results = run_benchmarks([10, 30], clone_rate=0.5, seed=1,
+                                 corpus_dir=os.path.join(self.test_dir, "corpus"))
+        self.assertEqual([run['files'] for run in results['runs']], [10, 30])
+        for run in results['runs']:
+            self.assertEqual(set(run['stages']), set(STAGES))
+            for stage, seconds in run['stages'].items():
+                self.assertTrue(seconds is not None or stage in run['skipped'])
+        self.assertEqual(results['runs'][1]['detection']['exact']['recall'], 1.0)
+        json.dumps(results)
+        
+        self.assertFalse(any(c['regression'] for c in compare_with_baseline(results, results)))
+        baseline = json.loads(json.dumps(results))
+        baseline['runs'][0]['stages']['parse'] = results['runs'][0]['stages']['parse'] / 2
+        regressions = [(c['files'], c['stage']) for c in
+                       compare_with_baseline(results, baseline, max_regression=50.0, min_seconds=0)
+                       if c['regression']]
+        self.assertEqual(regressions, [(10, 'parse')])
 
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -0,0 +1,177 @@
+from typing import Dict
+import logging
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class TokenStore:
+    def __init__(self, initial_capacity: int = 1 << 16):
+        """
+        Initialize a columnar arena holding the token arrays of all submissions.
+        
+        Tokens are appended to one contiguous uint32 buffer, and each stored
+        array is identified by an integer handle that indexes the offset
+        and length arrays. Metadata records only need to keep the handle.
+        
+        Args:
+            initial_capacity: Number of tokens the buffer holds before growing
+        """
+        self._buffer = np.empty(max(initial_capacity, 1), dtype=np.uint32)
+        self._used = 0
+        self._offsets = np.empty(1024, dtype=np.int64)
+        self._lengths = np.empty(1024, dtype=np.int64)
+        self._handle_count = 0
+        self._live = 0
+        self._dead_tokens = 0
+        self._performance_metrics = {
+            'appends': 0,
+            'removals': 0,
+            'compactions': 0
+        }
+    
+    def add(self, tokens: np.ndarray) -> int:
+        """
+        Append a token array to the arena.
+        
+        Args:
+            tokens: Token IDs to store
+        
+        Returns:
+            int: Handle of the stored array
+        """
+        tokens = np.asarray(tokens, dtype=np.uint32)
+        needed = self._used + len(tokens)
+        if needed > len(self._buffer):
+            # Grow geometrically so appends are amortized O(1) per token
+            self._buffer = np.resize(self._buffer, max(needed, 2 * len(self._buffer)))
+        self._buffer[self._used:needed] = tokens
+        
+        handle = self._handle_count
+        if handle == len(self._offsets):
+            self._offsets = np.resize(self._offsets, 2 * len(self._offsets))
+            self._lengths = np.resize(self._lengths, 2 * len(self._lengths))
+        self._offsets[handle] = self._used
+        self._lengths[handle] = len(tokens)
+        
+        self._used = needed
+        self._handle_count += 1
+        self._live += 1
+        self._performance_metrics['appends'] += 1
+        return handle
+    
+    def extend(self, handle: int, tokens: np.ndarray):
+        """
+        Append tokens to the most recently added array.
+        
+        Lets a token stream be stored block by block (e.g. while a large
+        file is tokenized) without concatenating the blocks first.
+        
+        Args:
+            handle: Handle returned by the last call to add
+            tokens: Token IDs to append
+        """
+        if handle != self._handle_count - 1 or self._lengths[handle] < 0:
+            raise ValueError("Only the most recently added array can be extended")
+        tokens = np.asarray(tokens, dtype=np.uint32)
+        needed = self._used + len(tokens)
+        if needed > len(self._buffer):
+            self._buffer = np.resize(self._buffer, max(needed, 2 * len(self._buffer)))
+        self._buffer[self._used:needed] = tokens
+        self._lengths[handle] += len(tokens)
+        self._used = needed
+    
+    def get(self, handle: int) -> np.ndarray:
+        """
+        Get the token array stored under a handle.
+        
+        Args:
+            handle: Handle returned by add
+        
+        Returns:
+            Read-only view of the token IDs in the arena
+        """
+        if not 0 <= handle < self._handle_count or self._lengths[handle] < 0:
+            raise KeyError(f"Unknown token handle {handle}")
+        start = self._offsets[handle]
+        view = self._buffer[start:start + self._lengths[handle]]
+        view.flags.writeable = False
+        return view
+    
+    def length(self, handle: int) -> int:
+        """Get the number of tokens stored under a handle."""
+        return int(self._lengths[handle])
+    
+    def remove(self, handle: int):
+        """
+        Release the tokens stored under a handle.
+        
+        The space is reclaimed by compacting the buffer once more than half
+        of it belongs to removed arrays.
+        
+        Args:
+            handle: Handle returned by add
+        """
+        if not 0 <= handle < self._handle_count or self._lengths[handle] < 0:
+            raise KeyError(f"Unknown token handle {handle}")
+        self._dead_tokens += int(self._lengths[handle])
+        self._lengths[handle] = -1
+        self._live -= 1
+        self._performance_metrics['removals'] += 1
+        
+        if self._dead_tokens > self._used // 2:
+            self.compact()
+    
+    def compact(self):
+        """Move live arrays together so removed tokens no longer use memory."""
+        live = np.flatnonzero(self._lengths[:self._handle_count] >= 0)
+        lengths = self._lengths[live]
+        buffer = np.empty(max(int(lengths.sum()), 1), dtype=np.uint32)
+        
+        position = 0
+        for handle, length in zip(live.tolist(), lengths.tolist()):
+            start = self._offsets[handle]
+            buffer[position:position + length] = self._buffer[start:start + length]
+            self._offsets[handle] = position
+            position += length
+        
+        # Views handed out earlier keep referencing the old buffer, so they
+        # stay valid
+        self._buffer = buffer
+        self._used = position
+        self._dead_tokens = 0
+        self._performance_metrics['compactions'] += 1
+    
+    def __len__(self) -> int:
+        return self._live
+    
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the token buffer and the offset arrays in bytes."""
+        return self._buffer.nbytes + self._offsets.nbytes + self._lengths.nbytes
+    
+    def get_performance_metrics(self) -> Dict:
+        """Get current performance metrics."""
+        return {
+            'arrays': self._live,
+            'tokens': self._used - self._dead_tokens,
+            'dead_tokens': self._dead_tokens,
+            'bytes': self.nbytes,
+            'appends': self._performance_metrics['appends'],
+            'removals': self._performance_metrics['removals'],
+            'compactions': self._performance_metrics['compactions']
+        }
+    
+    def clear(self):
+        """Remove all arrays and reset metrics."""
+        self._buffer = np.empty(len(self._buffer), dtype=np.uint32)
+        self._used = 0
+        self._handle_count = 0
+        self._live = 0
+        self._dead_tokens = 0
+        self._performance_metrics = {
+            'appends': 0,
+            'removals': 0,
+            'compactions': 0
+        }
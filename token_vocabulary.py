@@ -0,0 +1,103 @@
+from typing import List, Dict, Iterable, Optional
+import logging
+import threading
+import numpy as np
+from rabin_karp import stable_token_hash, DEFAULT_HASH_SEED
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class TokenVocabulary:
+    def __init__(self, seed: int = DEFAULT_HASH_SEED):
+        """
+        Initialize a shared vocabulary that interns tokens as integer IDs.
+        
+        IDs are assigned in order of first appearance and fit in uint32. The
+        stable 64-bit hash of every token is stored alongside its ID, so
+        token ID arrays can be turned into hash values with a single lookup.
+        
+        Args:
+            seed: Seed for the stable per-token hash
+        """
+        self.seed = seed
+        self._ids: Dict[str, int] = {}
+        self._tokens: List[str] = []
+        self._hashes = np.empty(1024, dtype=np.uint64)
+        self._lock = threading.Lock()
+    
+    def intern(self, token: str) -> int:
+        """
+        Get the ID of a token, assigning a new one if it was not seen before.
+        
+        Args:
+            token: Token to intern
+        
+        Returns:
+            int: ID of the token
+        """
+        token_id = self._ids.get(token)
+        if token_id is not None:
+            return token_id
+        
+        with self._lock:
+            token_id = self._ids.get(token)
+            if token_id is None:
+                token_id = len(self._tokens)
+                if token_id >= len(self._hashes):
+                    self._hashes = np.resize(self._hashes, 2 * len(self._hashes))
+                self._hashes[token_id] = stable_token_hash(token, self.seed)
+                self._tokens.append(token)
+                self._ids[token] = token_id
+        
+        return token_id
+    
+    def encode(self, tokens: Iterable[str]) -> np.ndarray:
+        """
+        Convert tokens to a compact array of token IDs.
+        
+        Args:
+            tokens: Tokens to encode
+        
+        Returns:
+            uint32 array of token IDs
+        """
+        ids = self._ids
+        intern = self.intern
+        return np.fromiter((ids[t] if t in ids else intern(t) for t in tokens), dtype=np.uint32)
+    
+    def decode(self, token_ids: Iterable[int]) -> List[str]:
+        """
+        Convert token IDs back to tokens.
+        
+        Args:
+            token_ids: Token IDs to decode
+        
+        Returns:
+            List of tokens
+        """
+        if isinstance(token_ids, np.ndarray):
+            token_ids = token_ids.tolist()
+        return [self._tokens[i] for i in token_ids]
+    
+    def lookup(self, token: str) -> Optional[int]:
+        """Get the ID of a token without interning it."""
+        return self._ids.get(token)
+    
+    def token_hashes(self, token_ids: np.ndarray) -> np.ndarray:
+        """
+        Map token IDs to their stable 64-bit hashes.
+        
+        Args:
+            token_ids: Integer array of token IDs
+        
+        Returns:
+            uint64 array with the hash of each token
+        """
+        return self._hashes[:len(self._tokens)][token_ids]
+    
+    def __contains__(self, token: str) -> bool:
+        return token in self._ids
+    
+    def __len__(self) -> int:
+        return len(self._tokens)
@@ -0,0 +1,132 @@
+from typing import Dict, Hashable, Iterable, List, Set
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class UnionFind:
+    def __init__(self):
+        """
+        Initialize a disjoint-set forest with union by size and path compression.
+        
+        Besides the parent pointers, the member set of every root is kept so
+        that the group of an element can be returned without a scan.
+        """
+        self._parent: Dict[Hashable, Hashable] = {}
+        self._members: Dict[Hashable, Set[Hashable]] = {}
+    
+    def add(self, item: Hashable):
+        """Add an item as a singleton group if it is not present."""
+        if item not in self._parent:
+            self._parent[item] = item
+            self._members[item] = {item}
+    
+    def find(self, item: Hashable) -> Hashable:
+        """
+        Find the representative of an item's group.
+        
+        Args:
+            item: Item to look up (added if not present)
+        
+        Returns:
+            The root item of the group
+        """
+        self.add(item)
+        root = item
+        while self._parent[root] != root:
+            root = self._parent[root]
+        
+        # Path compression
+        while self._parent[item] != root:
+            self._parent[item], item = root, self._parent[item]
+        
+        return root
+    
+    def union(self, item1: Hashable, item2: Hashable) -> bool:
+        """
+        Merge the groups of two items.
+        
+        Returns:
+            bool: True if the items were in different groups
+        """
+        root1 = self.find(item1)
+        root2 = self.find(item2)
+        if root1 == root2:
+            return False
+        
+        # Union by size: attach the smaller group below the larger one
+        if len(self._members[root1]) < len(self._members[root2]):
+            root1, root2 = root2, root1
+        
+        self._parent[root2] = root1
+        self._members[root1] |= self._members.pop(root2)
+        return True
+    
+    def connected(self, item1: Hashable, item2: Hashable) -> bool:
+        """Check whether two items are in the same group."""
+        return self.find(item1) == self.find(item2)
+    
+    def group(self, item: Hashable) -> Set[Hashable]:
+        """Get a copy of the group containing an item."""
+        if item not in self._parent:
+            return set()
+        return set(self._members[self.find(item)])
+    
+    def groups(self, order: Iterable[Hashable] = None) -> List[Set[Hashable]]:
+        """
+        Get all groups.
+        
+        Args:
+            order: Optional item order; groups are returned in order of their
+                first item in it
+        
+        Returns:
+            List of sets of items
+        """
+        if order is None:
+            return [set(members) for members in self._members.values()]
+        
+        result = []
+        seen = set()
+        for item in order:
+            if item not in self._parent:
+                continue
+            root = self.find(item)
+            if root not in seen:
+                seen.add(root)
+                result.append(set(self._members[root]))
+        return result
+    
+    def remove_group(self, item: Hashable) -> Set[Hashable]:
+        """
+        Remove the whole group containing an item.
+        
+        Union-find cannot split groups, so callers remove a group and
+        re-add the members that remain connected.
+        
+        Returns:
+            The removed members
+        """
+        if item not in self._parent:
+            return set()
+        
+        members = self._members.pop(self.find(item))
+        for member in members:
+            del self._parent[member]
+        return members
+    
+    def __contains__(self, item: Hashable) -> bool:
+        return item in self._parent
+    
+    def __len__(self) -> int:
+        return len(self._parent)
+    
+    def group_count(self) -> int:
+        """Get the number of groups."""
+        return len(self._members)
+    
+    def clear(self):
+        """Remove all items."""
+        self._parent.clear()
+        self._members.clear()